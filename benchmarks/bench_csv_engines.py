@@ -0,0 +1,103 @@
+"""
+Бенчмарк движков чтения CSV (csv_engine: 'c', 'pyarrow') на синтетических выгрузках разного размера
+(benchmarks/jira_csv_generator.py).
+
+Для каждого размера и движка:
+  чтение, с        - лучшее время csv_parser.load_csv_to_dataframe в уже запущенном процессе (без кэша, с проекцией
+                     колонок из config.json, как в отчете; --all-columns - все колонки);
+  холодный старт, с - отдельный процесс Python: импорт модулей движка и чтение (задержка разового запуска);
+  совпадает        - DataFrame совпадает с результатом движка 'c' (значения, типы, имена колонок).
+Движок 'pyarrow' пропускается, если пакет pyarrow не установлен.
+
+Запуск из корня проекта:
+    python benchmarks/bench_csv_engines.py [--rows 500 5000 50000] [--repeat 5] [--all-columns]
+        [параметры генератора, см. jira_csv_generator.py --help]
+"""
+import argparse
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+current_bench_dir = os.path.dirname(os.path.abspath(__file__))
+project_root_dir = os.path.dirname(current_bench_dir)
+if project_root_dir not in sys.path:
+    sys.path.insert(0, project_root_dir)
+
+from benchmarks import jira_csv_generator
+from src import config_loader
+from src import csv_parser
+from src import data_processor
+from src import report_pipeline
+
+
+def load_csv(csv_path: str, main_cfg: dict, usecols, engine: str):
+    return csv_parser.load_csv_to_dataframe(csv_path, encoding=main_cfg.get('csv_encoding', 'utf-8'),
+                                            delimiter=main_cfg.get('csv_delimiter', ','), usecols=usecols,
+                                            engine=engine)
+
+
+def cold_start_seconds(csv_path: str, engine: str, all_columns: bool) -> float:
+    """Время отдельного процесса, который импортирует модули и читает CSV один раз."""
+    command = [sys.executable, os.path.abspath(__file__), "--cold-run", engine, csv_path]
+    if all_columns: command.append("--all-columns")
+    started = time.perf_counter()
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs='+', default=[500, 5000, 50000],
+                        help="Размеры синтетических выгрузок (строк).")
+    parser.add_argument("--repeat", type=int, default=5, help="Количество повторов чтения (берется лучшее время).")
+    parser.add_argument("--all-columns", action="store_true", help="Читать все колонки (без проекции).")
+    parser.add_argument("--cold-run", nargs=2, metavar=("ENGINE", "CSV"), help=argparse.SUPPRESS)
+    jira_csv_generator.add_generator_arguments(parser)
+    args = parser.parse_args()
+
+    main_cfg, fields_cfg, _ = config_loader.get_all_configs()
+    if main_cfg is None: sys.exit(1)
+    usecols = None if args.all_columns else data_processor.build_csv_column_projection(
+        fields_cfg, report_pipeline.build_microservice_config(main_cfg))
+    if args.cold_run:
+        engine, csv_path = args.cold_run
+        sys.exit(0 if load_csv(csv_path, main_cfg, usecols, engine) is not None else 1)
+
+    csv_parser.logger.setLevel("WARNING")  # Логи чтения искажают замер
+    try:
+        generator_options = jira_csv_generator.generator_options(args, main_cfg)
+    except ValueError as e:
+        parser.error(str(e))
+    engines = [engine for engine in csv_parser.CSV_ENGINES
+               if engine != csv_parser.CSV_ENGINE_PYARROW or importlib.util.find_spec("pyarrow") is not None]
+    if csv_parser.CSV_ENGINE_PYARROW not in engines:
+        print("pyarrow не установлен: движок 'pyarrow' пропущен.")
+
+    print(f"Колонки: {'все' if args.all_columns else 'проекция config.json'}, повторов: {args.repeat}")
+    print(f"{'строк':>8} {'МБ':>6} {'движок':>8} {'чтение, с':>10} {'к c':>6} {'холодный старт, с':>18} "
+          f"{'совпадает':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for rows in args.rows:
+            csv_path = os.path.join(tmp_dir, f"jira_{rows}.csv")
+            generator_stats = jira_csv_generator.generate_jira_csv(csv_path, rows=rows, **generator_options)
+            baseline_df, baseline_seconds = None, None
+            for engine in engines:
+                best_seconds, df = None, None
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    df = load_csv(csv_path, main_cfg, usecols, engine)
+                    elapsed = time.perf_counter() - started
+                    best_seconds = elapsed if best_seconds is None else min(best_seconds, elapsed)
+                if baseline_df is None: baseline_df, baseline_seconds = df, best_seconds
+                same = df is not None and df.equals(baseline_df) and list(df.columns) == list(baseline_df.columns) \
+                    and df.dtypes.equals(baseline_df.dtypes)
+                print(f"{rows:>8} {generator_stats['bytes'] / 1024 / 1024:>6.1f} {engine:>8} {best_seconds:>10.4f} "
+                      f"{best_seconds / baseline_seconds:>6.2f} "
+                      f"{cold_start_seconds(csv_path, engine, args.all_columns):>18.3f} {'да' if same else 'НЕТ':>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Бенчмарк бэкендов записи DOCX ('docx_backend'): python-docx против streaming.
+Каждый замер выполняется в отдельном процессе, чтобы пиковый RSS (включая память lxml) не смешивался.
+
+Запуск из корня проекта:
+    python benchmarks/bench_docx_backends.py [--tasks 5000 20000] [--microservices 20]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+current_bench_dir = os.path.dirname(os.path.abspath(__file__))
+project_root_dir = os.path.dirname(current_bench_dir)
+if project_root_dir not in sys.path:
+    sys.path.insert(0, project_root_dir)
+
+BACKENDS = ("python-docx", "streaming")
+
+
+def run_single(backend: str, tasks_count: int, microservices_count: int):
+    """Генерирует отчет одним бэкендом и печатает JSON с временем и пиковым RSS процесса."""
+    from benchmarks.bench_docx_named_styles import make_synthetic_grouped_tasks
+    from src import config_loader
+    from src import docx_stream_writer
+    from src import report_generator
+
+    main_cfg, fields_cfg, styles_cfg = config_loader.get_all_configs()
+    for module in (report_generator, docx_stream_writer):
+        module.logger.setLevel("WARNING")
+    grouped_changes, grouped_setup = make_synthetic_grouped_tasks(tasks_count, microservices_count, fields_cfg)
+    baseline_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    generator = docx_stream_writer if backend == "streaming" else report_generator
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_path = os.path.join(tmp_dir, "report.docx")
+        started = time.perf_counter()
+        generator.generate_report_docx(output_path, "Бенчмарк", None, [], styles_cfg, grouped_changes, grouped_setup,
+                                       main_cfg, fields_cfg)
+        elapsed = time.perf_counter() - started
+        docx_size = os.path.getsize(output_path)
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"seconds": elapsed, "peak_rss_mb": peak_rss_kb / 1024,
+                      "render_rss_mb": (peak_rss_kb - baseline_rss_kb) / 1024, "docx_kb": docx_size / 1024}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, nargs="+", default=[5000, 20000], help="Количество задач в отчете.")
+    parser.add_argument("--microservices", type=int, default=20, help="Количество микросервисов.")
+    parser.add_argument("--run-backend", choices=BACKENDS, help=argparse.SUPPRESS)  # Замер в дочернем процессе
+    args = parser.parse_args()
+
+    if args.run_backend:
+        run_single(args.run_backend, args.tasks[0], args.microservices)
+        return
+
+    print(f"{'задач':>8} {'бэкенд':>12} {'время, с':>9} {'прирост RSS, МБ':>16} {'DOCX, КБ':>9}")
+    for tasks_count in args.tasks:
+        for backend in BACKENDS:
+            completed = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--run-backend", backend, "--tasks", str(tasks_count),
+                 "--microservices", str(args.microservices)],
+                capture_output=True, text=True, check=True, cwd=project_root_dir)
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            print(f"{tasks_count:>8} {backend:>12} {result['seconds']:>9.2f} {result['render_rss_mb']:>16.1f} "
+                  f"{result['docx_kb']:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Бенчмарк генерации DOCX: прямое форматирование каждого run (set_run_font) против именованных стилей Word
+('use_named_styles' в word_styles.json). Замеряются время построения разделов, время doc.save и размер файла.
+
+Запуск из корня проекта:
+    python benchmarks/bench_docx_named_styles.py [--tasks 5000] [--microservices 20]
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+import zipfile
+from collections import OrderedDict
+
+current_bench_dir = os.path.dirname(os.path.abspath(__file__))
+project_root_dir = os.path.dirname(current_bench_dir)
+if project_root_dir not in sys.path:
+    sys.path.insert(0, project_root_dir)
+
+from docx import Document
+
+from src import config_loader
+from src import report_generator
+
+
+def make_synthetic_grouped_tasks(tasks_count: int, microservices_count: int, field_names, seed: int = 42):
+    """Синтетические данные для разделов 'Перечень изменений' и 'Настройки системы' (~20% задач с инструкциями)."""
+    rnd = random.Random(seed)
+    issue_types = ["Ошибка", "Задача", "История", "Улучшение"]
+    grouped_changes = OrderedDict((f"ms-{i}", OrderedDict((t, []) for t in issue_types))
+                                  for i in range(microservices_count))
+    grouped_setup = OrderedDict()
+    for task_num in range(tasks_count):
+        ms_name = f"ms-{rnd.randrange(microservices_count)}"
+        task = {
+            field_names.key: f"PHB-{task_num}",
+            field_names.summary: f"Изменение номер {task_num}",
+            'task_report_text': f"Описание изменения {task_num} для клиента (реализовано в рамках: PHB-{task_num + 1})",
+            'fix_versions_combined_display': f"{ms_name}-1.{task_num % 50}.0",
+        }
+        grouped_changes[ms_name][rnd.choice(issue_types)].append(task)
+        if rnd.random() < 0.2:
+            grouped_setup.setdefault(ms_name, []).append(dict(
+                task, **{field_names.setup_instructions: "Шаг 1: обновить конфигурацию\nШаг 2: перезапустить сервис"}))
+    return grouped_changes, grouped_setup
+
+
+def render_report(styles_cfg, fields_cfg, main_cfg, grouped_changes, grouped_setup):
+    """Возвращает (время разделов, время doc.save, размер DOCX, размер word/document.xml) в секундах и байтах."""
+    started = time.perf_counter()
+    doc = Document()
+    style_registry = report_generator.NamedStyleRegistry(doc) if styles_cfg.get('use_named_styles') else None
+    report_generator.create_changes_section(doc, grouped_changes, styles_cfg, fields_cfg, main_cfg, style_registry)
+    report_generator.create_setup_section(doc, grouped_setup, styles_cfg, fields_cfg, main_cfg, style_registry)
+    rendered = time.perf_counter()
+    output = io.BytesIO()
+    doc.save(output)
+    saved = time.perf_counter()
+    with zipfile.ZipFile(output) as docx_zip:
+        document_xml_size = docx_zip.getinfo('word/document.xml').file_size
+    return rendered - started, saved - rendered, output.tell(), document_xml_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=5000, help="Количество задач в отчете.")
+    parser.add_argument("--microservices", type=int, default=20, help="Количество микросервисов.")
+    args = parser.parse_args()
+
+    main_cfg, fields_cfg, styles_cfg = config_loader.get_all_configs()
+    report_generator.logger.setLevel("WARNING")  # Логи построения разделов искажают замер
+    grouped_changes, grouped_setup = make_synthetic_grouped_tasks(args.tasks, args.microservices, fields_cfg)
+
+    print(f"Задач: {args.tasks}, МС: {args.microservices}")
+    for mode_name, use_named_styles in (("прямое форматирование", False), ("именованные стили", True)):
+        mode_styles_cfg = dict(styles_cfg, use_named_styles=use_named_styles)
+        render_time, save_time, docx_size, document_xml_size = render_report(
+            mode_styles_cfg, fields_cfg, main_cfg, grouped_changes, grouped_setup)
+        print(f"{mode_name:22}: разделы {render_time:.2f} с, save {save_time:.2f} с, DOCX {docx_size / 1024:.0f} КБ, "
+              f"document.xml {document_xml_size / 1024:.0f} КБ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Бенчмарк накладных расходов логирования на горячих путях: разбор ячеек версий (PrefixMatcher, сообщения
+[extract_ms_ver]) и set_run_font (сообщения [set_run_font]).
+
+Режимы:
+  синхронно, DEBUG - FileHandler пишет каждую запись в вызывающем потоке (схема до очереди логов);
+  очередь, DEBUG   - logger_config.ProcessAwareQueueHandler, запись на диск в фоновом потоке;
+  очередь, INFO    - DEBUG для модулей выключен;
+  по умолчанию     - очередь и уровни модулей из "log_levels" в config.json (поставляемая конфигурация: INFO для
+                     src.data_processor и src.report_generator).
+Для режимов с очередью отдельно показано время дозаписи очереди после замера (listener.stop).
+Дополнительно: стоимость выключенного logger.debug с f-строкой против ленивых аргументов.
+
+Запуск из корня проекта:
+    python benchmarks/bench_logging_overhead.py [--values 50000] [--runs 50000]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+current_bench_dir = os.path.dirname(os.path.abspath(__file__))
+project_root_dir = os.path.dirname(current_bench_dir)
+if project_root_dir not in sys.path:
+    sys.path.insert(0, project_root_dir)
+
+from docx import Document
+
+from src import config_loader
+from src import data_processor
+from src import logger_config
+from src import report_generator
+
+
+def make_version_values(values_count: int, prefix_mapping: dict) -> list:
+    """Уникальные значения ячеек версий (каждое - промах кэша PrefixMatcher, т.е. полный путь с логированием)."""
+    prefixes = list(prefix_mapping) + ["XX"]
+    return [f"{prefixes[i % len(prefixes)]} {i // 1000}.{i % 1000}.{i % 7}" for i in range(values_count)]
+
+
+def run_workload(version_values: list, prefix_mapping: dict, runs_count: int) -> float:
+    """Горячие пути с логированием. Возвращает время в секундах."""
+    paragraph = Document().add_paragraph()
+    runs = [paragraph.add_run(f"Текст {i}") for i in range(runs_count)]
+    started = time.perf_counter()
+    matcher = data_processor.PrefixMatcher(prefix_mapping)
+    for value in version_values:
+        matcher.match(value)
+    for run in runs:
+        report_generator.set_run_font(run, size_pt_val=10)
+    return time.perf_counter() - started
+
+
+def configure_hot_loggers(handler, level, log_levels: dict = None):
+    """Направляет логгеры горячих путей в handler. log_levels (как в config.json) переопределяет level по модулям."""
+    for module in (data_processor, report_generator):
+        module.logger.handlers.clear()
+        module.logger.addHandler(handler)
+        module.logger.setLevel(str((log_levels or {}).get(module.logger.name, logging.getLevelName(level))).upper())
+
+
+def measure_disabled_debug_call(calls_count: int) -> tuple:
+    """Время calls_count выключенных logger.debug: (f-строка, ленивые аргументы) в секундах."""
+    bench_logger = logging.getLogger("bench_logging_overhead.disabled")
+    bench_logger.setLevel(logging.INFO)
+    value, size = "IN 1.2.3", 10
+    started = time.perf_counter()
+    for _ in range(calls_count):
+        bench_logger.debug(f"  [extract_ms_ver] Префикс для '{value}' -> размер: '{size}'")
+    eager_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(calls_count):
+        bench_logger.debug("  [extract_ms_ver] Префикс для '%s' -> размер: '%s'", value, size)
+    return eager_seconds, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--values", type=int, default=50000, help="Уникальных значений ячеек версий.")
+    parser.add_argument("--runs", type=int, default=50000, help="Вызовов set_run_font.")
+    args = parser.parse_args()
+
+    main_cfg, _, _ = config_loader.get_all_configs()
+    prefix_mapping = main_cfg.get('microservice_prefix_mapping', {})
+    version_values = make_version_values(args.values, prefix_mapping)
+    formatter = logging.Formatter(logger_config.LOG_FORMAT, datefmt=logger_config.LOG_DATE_FORMAT)
+
+    print(f"Значений версий: {args.values}, вызовов set_run_font: {args.runs}")
+    print(f"{'режим':>18} {'горячий путь, с':>16} {'дозапись, с':>12} {'лог, МБ':>8}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for mode_name, use_queue, level, log_levels in (
+                ("синхронно, DEBUG", False, logging.DEBUG, None),
+                ("очередь, DEBUG", True, logging.DEBUG, None),
+                ("очередь, INFO", True, logging.INFO, None),
+                ("по умолчанию", True, logger_config.LOG_LEVEL_FILE, main_cfg.get('log_levels', {}))):
+            log_path = os.path.join(tmp_dir, f"{len(os.listdir(tmp_dir))}.log")
+            file_handler = logger_config.QueuedFileHandler(log_path, encoding='utf-8') if use_queue else \
+                logging.FileHandler(log_path, encoding='utf-8')
+            file_handler.setFormatter(formatter)
+            handler = logger_config.create_queue_handler([file_handler]) if use_queue else file_handler
+            configure_hot_loggers(handler, level, log_levels)
+            workload_seconds = run_workload(version_values, prefix_mapping, args.runs)
+            started = time.perf_counter()
+            if use_queue: handler.listener.stop()
+            drain_seconds = time.perf_counter() - started
+            file_handler.close()
+            print(f"{mode_name:>18} {workload_seconds:>16.3f} {drain_seconds:>12.3f} "
+                  f"{os.path.getsize(log_path) / 1024 / 1024:>8.1f}")
+
+    calls_count = 1_000_000
+    eager_seconds, lazy_seconds = measure_disabled_debug_call(calls_count)
+    print(f"Выключенный logger.debug, {calls_count} вызовов: f-строка {eager_seconds:.3f} с, "
+          f"ленивые аргументы {lazy_seconds:.3f} с")
+
+
+if __name__ == "__main__":
+    main()
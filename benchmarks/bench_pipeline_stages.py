@@ -0,0 +1,192 @@
+"""
+Бенчмарк конвейера по этапам на синтетических выгрузках JIRA (benchmarks/jira_csv_generator.py).
+
+Этапы замеряются по отдельности, в том же порядке и с теми же вызовами, что в report_pipeline:
+  csv_load             - чтение CSV (csv_parser.load_csv_to_dataframe, без кэша, с проекцией колонок и csv_engine
+                         из config.json);
+  version_detection    - индекс версий, глобальная версия и версии компонентов;
+  process_initial_data - подготовка задач (data_processor.process_initial_data);
+  grouping             - группировка и сортировка (build_task_grouping + 'Перечень изменений');
+  setup_prep           - данные 'Настроек системы' (индекс строится на этапе grouping, здесь - представление);
+  render               - построение DOCX в памяти (python-docx: титул, таблица версий, разделы);
+  save                 - doc.save.
+Результат - JSON (параметры, окружение и время этапов по каждому размеру), чтобы сравнивать запуски.
+
+Запуск из корня проекта:
+    python benchmarks/bench_pipeline_stages.py [--rows 1000 10000 50000] [--repeat 3] [--output stages.json]
+        [--csv data/jira_export.csv] [параметры генератора, см. jira_csv_generator.py --help]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+current_bench_dir = os.path.dirname(os.path.abspath(__file__))
+project_root_dir = os.path.dirname(current_bench_dir)
+if project_root_dir not in sys.path:
+    sys.path.insert(0, project_root_dir)
+
+import docx
+import pandas as pd
+
+from benchmarks import jira_csv_generator
+from src import config_loader
+from src import csv_parser
+from src import data_processor
+from src import field_schema
+from src import report_generator
+from src import report_pipeline
+
+STAGES = ("csv_load", "version_detection", "process_initial_data", "grouping", "setup_prep", "render", "save")
+
+
+def run_pipeline_once(csv_path: str, main_cfg: dict, fields_cfg, styles_cfg: dict, output_dir: str):
+    """Один проход конвейера. Возвращает ({этап: секунды}, счетчики результата)."""
+    microservice_config = report_pipeline.build_microservice_config(main_cfg)
+    timings = {}
+
+    started = time.perf_counter()
+    usecols = data_processor.build_csv_column_projection(fields_cfg, microservice_config) \
+        if main_cfg.get('csv_read_only_used_columns', True) else None
+    raw_df = csv_parser.load_csv_to_dataframe(csv_path, encoding=main_cfg.get('csv_encoding', 'utf-8'),
+                                              delimiter=main_cfg.get('csv_delimiter', ','), usecols=usecols,
+                                              engine=main_cfg.get('csv_engine', csv_parser.CSV_ENGINE_C))
+    timings['csv_load'] = time.perf_counter() - started
+    if raw_df is None or raw_df.empty:
+        raise RuntimeError(f"Не удалось прочитать {csv_path}")
+
+    started = time.perf_counter()
+    version_index = data_processor.build_version_index(raw_df, microservice_config)
+    global_version = data_processor.detect_global_release_version(raw_df, microservice_config,
+                                                                  version_index=version_index)
+    component_versions = data_processor.detect_component_versions_from_data(raw_df, microservice_config,
+                                                                            version_index=version_index)
+    timings['version_detection'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    processed_df = data_processor.process_initial_data(raw_df, fields_mapping_config=fields_cfg,
+                                                       microservice_config=microservice_config,
+                                                       main_app_config=main_cfg, version_index=version_index)
+    timings['process_initial_data'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    task_grouping = data_processor.build_task_grouping(processed_df, report_pipeline.build_sort_config(main_cfg),
+                                                       fields_cfg)
+    grouped_changes = task_grouping.changes_view()
+    timings['grouping'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    grouped_setup = task_grouping.setup_view()
+    timings['setup_prep'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    doc = docx.Document()
+    style_registry = report_generator.NamedStyleRegistry(doc) if styles_cfg.get('use_named_styles', False) else None
+    report_generator.create_title_section(doc, f"Отчет по релизу версия {global_version}", None, styles_cfg)
+    report_generator.create_microservices_version_table(doc, component_versions, styles_cfg, style_registry)
+    render_plan = report_generator.RenderPlan(doc, styles_cfg, fields_cfg, style_registry)
+    report_generator.create_changes_section(doc, grouped_changes, styles_cfg, fields_cfg, main_cfg, style_registry,
+                                            render_plan)
+    report_generator.create_setup_section(doc, grouped_setup, styles_cfg, fields_cfg, main_cfg, style_registry,
+                                          render_plan)
+    timings['render'] = time.perf_counter() - started
+
+    output_path = os.path.join(output_dir, "report.docx")
+    started = time.perf_counter()
+    doc.save(output_path)
+    timings['save'] = time.perf_counter() - started
+
+    counters = {
+        'tasks': len(processed_df),
+        'microservices': len(grouped_changes),
+        'setup_microservices': len(grouped_setup),
+        'docx_bytes': os.path.getsize(output_path),
+    }
+    return timings, counters
+
+
+def summarize_timings(runs: list) -> dict:
+    """{этап: {min, median, runs}} по списку результатов run_pipeline_once."""
+    summary = {}
+    for stage in STAGES:
+        stage_seconds = [timings[stage] for timings in runs]
+        summary[stage] = {'min': round(min(stage_seconds), 6), 'median': round(statistics.median(stage_seconds), 6),
+                          'runs': [round(seconds, 6) for seconds in stage_seconds]}
+    return summary
+
+
+def environment_info() -> dict:
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+            'pandas': pd.__version__, 'python_docx': getattr(docx, '__version__', 'unknown')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs='+', default=[1000, 10000],
+                        help="Размеры синтетических выгрузок (строк), замеряются по очереди.")
+    parser.add_argument("--csv", help="Замерить готовый CSV вместо синтетического (--rows и генератор не используются).")
+    parser.add_argument("--repeat", type=int, default=3, help="Количество повторов каждого размера.")
+    parser.add_argument("--output", help="Файл для JSON-результата (по умолчанию - вывод в stdout).")
+    jira_csv_generator.add_generator_arguments(parser)
+    args = parser.parse_args()
+
+    main_cfg, fields_cfg, styles_cfg = config_loader.get_all_configs()
+    if main_cfg is None: sys.exit(1)
+    for module in (csv_parser, data_processor, field_schema, report_generator):
+        module.logger.setLevel("WARNING")  # Логи этапов искажают замер
+    try:
+        generator_options = jira_csv_generator.generator_options(args, main_cfg)
+    except ValueError as e:
+        parser.error(str(e))
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for rows in ([None] if args.csv else args.rows):
+            if args.csv:
+                csv_path, dataset = args.csv, {'csv': args.csv, 'csv_bytes': os.path.getsize(args.csv)}
+            else:
+                csv_path = os.path.join(tmp_dir, f"jira_{rows}.csv")
+                generator_stats = jira_csv_generator.generate_jira_csv(csv_path, rows=rows, **generator_options)
+                dataset = {'rows': rows, 'csv_bytes': generator_stats['bytes'],
+                           'global_rows': generator_stats['global_rows'], 'setup_rows': generator_stats['setup_rows']}
+            runs = []
+            for _ in range(args.repeat):
+                timings, counters = run_pipeline_once(csv_path, main_cfg, fields_cfg, styles_cfg, tmp_dir)
+                runs.append(timings)
+            stages = summarize_timings(runs)
+            total_seconds = sum(stage['min'] for stage in stages.values())
+            results.append({'dataset': dataset, 'counters': counters, 'stages': stages,
+                            'total_min_seconds': round(total_seconds, 6)})
+            print(f"{dataset.get('rows', csv_path)}: " + ", ".join(
+                f"{stage} {stages[stage]['min']:.3f}" for stage in STAGES) + f" (всего {total_seconds:.2f} с)",
+                  file=sys.stderr)
+
+    report = {
+        'benchmark': 'pipeline_stages',
+        'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'environment': environment_info(),
+        'parameters': {'repeat': args.repeat, 'docx_backend': 'python-docx',
+                       'csv_engine': main_cfg.get('csv_engine', csv_parser.CSV_ENGINE_C),
+                       'use_named_styles': bool(styles_cfg.get('use_named_styles', False)),
+                       'generator': None if args.csv else dict(generator_options,
+                                                               summary_words=list(args.summary_words),
+                                                               description_words=list(args.description_words),
+                                                               setup_lines=list(args.setup_lines))},
+        'results': results,
+    }
+    report_json = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report_json + "\n")
+        print(f"Результат сохранен: {args.output}", file=sys.stderr)
+    else:
+        print(report_json)
+
+
+if __name__ == "__main__":
+    main()
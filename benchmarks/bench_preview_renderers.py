@@ -0,0 +1,66 @@
+"""
+Бенчмарк предпросмотра отчета (generate_html / generate_markdown) против полной генерации DOCX
+(docx_backend 'python-docx' и 'streaming') на одних и тех же сгруппированных задачах.
+
+Запуск из корня проекта:
+    python benchmarks/bench_preview_renderers.py [--tasks 20000] [--microservices 20]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+current_bench_dir = os.path.dirname(os.path.abspath(__file__))
+project_root_dir = os.path.dirname(current_bench_dir)
+if project_root_dir not in sys.path:
+    sys.path.insert(0, project_root_dir)
+
+from benchmarks.bench_docx_named_styles import make_synthetic_grouped_tasks
+from src import config_loader
+from src import docx_stream_writer
+from src import preview_renderer
+from src import report_generator
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=20000, help="Количество задач в отчете.")
+    parser.add_argument("--microservices", type=int, default=20, help="Количество микросервисов.")
+    args = parser.parse_args()
+
+    main_cfg, fields_cfg, styles_cfg = config_loader.get_all_configs()
+    for module in (report_generator, docx_stream_writer, preview_renderer):
+        module.logger.setLevel("WARNING")  # Логи построения разделов искажают замер
+    grouped_changes, grouped_setup = make_synthetic_grouped_tasks(args.tasks, args.microservices, fields_cfg)
+    versions = [{'microservice': ms_name, 'version': "1.0.0"} for ms_name in grouped_changes]
+
+    outputs = [
+        ("DOCX (python-docx)", "report.docx", lambda path: report_generator.generate_report_docx(
+            path, "Бенчмарк", None, versions, styles_cfg, grouped_changes, grouped_setup, main_cfg, fields_cfg)),
+        ("DOCX (streaming)", "report_stream.docx", lambda path: docx_stream_writer.generate_report_docx(
+            path, "Бенчмарк", None, versions, styles_cfg, grouped_changes, grouped_setup, main_cfg, fields_cfg)),
+    ]
+    for preview_format, file_name in ((preview_renderer.PREVIEW_HTML, "report.html"),
+                                      (preview_renderer.PREVIEW_MARKDOWN, "report.md")):
+        outputs.append((f"Предпросмотр ({preview_format})", file_name,
+                        lambda path, preview_format=preview_format: preview_renderer.generate_report_preview(
+                            path, preview_format, "Бенчмарк", versions, grouped_changes, grouped_setup, main_cfg,
+                            fields_cfg)))
+
+    print(f"Задач: {args.tasks}, МС: {args.microservices}")
+    print(f"{'формат':>24} {'время, с':>9} {'доля DOCX':>10} {'файл, КБ':>9}")
+    baseline_seconds = None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for output_name, file_name, generate in outputs:
+            output_path = os.path.join(tmp_dir, file_name)
+            started = time.perf_counter()
+            generate(output_path)
+            elapsed = time.perf_counter() - started
+            if baseline_seconds is None: baseline_seconds = elapsed
+            print(f"{output_name:>24} {elapsed:>9.2f} {elapsed / baseline_seconds:>9.1%} "
+                  f"{os.path.getsize(output_path) / 1024:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
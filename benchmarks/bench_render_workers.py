@@ -0,0 +1,77 @@
+"""
+Бенчмарк параллельной отрисовки разделов ('render_workers') потокового бэкенда DOCX.
+Для каждого количества процессов отчет генерируется несколько раз, берется лучшее время; выводится ускорение
+относительно одного процесса и проверяется, что word/document.xml не зависит от количества процессов.
+Ускорение заметно на многоядерных машинах и при числе микросервисов не меньше числа процессов.
+
+Запуск из корня проекта:
+    python benchmarks/bench_render_workers.py [--tasks 50000] [--microservices 64] [--workers 1 2 4 8]
+"""
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+current_bench_dir = os.path.dirname(os.path.abspath(__file__))
+project_root_dir = os.path.dirname(current_bench_dir)
+if project_root_dir not in sys.path:
+    sys.path.insert(0, project_root_dir)
+
+from benchmarks.bench_docx_named_styles import make_synthetic_grouped_tasks
+from src import config_loader
+from src import docx_stream_writer
+from src import report_generator
+
+
+def run_once(render_workers: int, styles_cfg, main_cfg, fields_cfg, grouped_changes, grouped_setup):
+    """Возвращает (время генерации в секундах, SHA-256 word/document.xml)."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_path = os.path.join(tmp_dir, "report.docx")
+        started = time.perf_counter()
+        docx_stream_writer.generate_report_docx(output_path, "Бенчмарк", None, [], styles_cfg, grouped_changes,
+                                                grouped_setup, main_cfg, fields_cfg, render_workers=render_workers)
+        elapsed = time.perf_counter() - started
+        with zipfile.ZipFile(output_path) as docx_zip:
+            document_hash = hashlib.sha256(docx_zip.read(docx_stream_writer.DOCUMENT_PART_NAME)).hexdigest()
+    return elapsed, document_hash
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=50000, help="Количество задач в отчете.")
+    parser.add_argument("--microservices", type=int, default=64, help="Количество микросервисов.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="Значения render_workers для замера (0 - по числу ядер).")
+    parser.add_argument("--repeat", type=int, default=3, help="Количество повторов (берется лучшее время).")
+    args = parser.parse_args()
+
+    main_cfg, fields_cfg, styles_cfg = config_loader.get_all_configs()
+    for module in (report_generator, docx_stream_writer):
+        module.logger.setLevel("WARNING")
+    grouped_changes, grouped_setup = make_synthetic_grouped_tasks(args.tasks, args.microservices, fields_cfg)
+
+    print(f"Задач: {args.tasks}, микросервисов: {args.microservices}, ядер: {os.cpu_count()}")
+    print(f"{'процессов':>10} {'время, с':>9} {'ускорение':>10}")
+    baseline_seconds = None
+    baseline_hash = None
+    for render_workers in args.workers:
+        timings = []
+        for _ in range(args.repeat):
+            elapsed, document_hash = run_once(render_workers, styles_cfg, main_cfg, fields_cfg, grouped_changes,
+                                              grouped_setup)
+            timings.append(elapsed)
+            if baseline_hash is None: baseline_hash = document_hash
+            if document_hash != baseline_hash:
+                print(f"ОШИБКА: document.xml при render_workers={render_workers} отличается от первого замера.")
+                sys.exit(1)
+        best_seconds = min(timings)
+        if baseline_seconds is None: baseline_seconds = best_seconds
+        print(f"{docx_stream_writer.resolve_render_workers(render_workers):>10} {best_seconds:>9.2f} "
+              f"{baseline_seconds / best_seconds:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
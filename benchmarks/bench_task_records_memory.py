@@ -0,0 +1,87 @@
+"""
+Бенчмарк памяти группировки задач: копия словаря задачи на каждый МС (как было) против TaskRecord,
+общих для всех групп МС.
+
+Запуск из корня проекта:
+    python benchmarks/bench_task_records_memory.py [--rows 100000] [--ms-per-task 3]
+"""
+import argparse
+import os
+import random
+import sys
+import tracemalloc
+
+current_bench_dir = os.path.dirname(os.path.abspath(__file__))
+project_root_dir = os.path.dirname(current_bench_dir)
+if project_root_dir not in sys.path:
+    sys.path.insert(0, project_root_dir)
+
+import pandas as pd
+
+from src import config_loader
+from src import data_processor
+
+
+def make_synthetic_processed_tasks(rows_count: int, ms_per_task: int, fields_cfg, seed: int = 42):
+    """Синтетический результат process_initial_data: все колонки из fields_mapping + служебные колонки."""
+    rnd = random.Random(seed)
+    microservices = [f"ms-{i}" for i in range(20)]
+    issue_types = ["Ошибка", "Задача", "История", "Улучшение"]
+    columns = {}
+    for spec in fields_cfg:
+        internal_name = spec.get('internal_name')
+        if internal_name and internal_name not in columns:
+            columns[internal_name] = [f"{internal_name}-{rnd.randint(0, 10 ** 6)}" for _ in range(rows_count)]
+    columns[fields_cfg.key] = [f"PHB-{i}" for i in range(rows_count)]
+    columns[fields_cfg.issue_type] = [rnd.choice(issue_types) for _ in range(rows_count)]
+    columns['identified_microservices'] = [rnd.sample(microservices, ms_per_task) for _ in range(rows_count)]
+    columns['task_report_text'] = [f"Текст задачи {i}" for i in range(rows_count)]
+    return pd.DataFrame(columns)
+
+
+def legacy_grouping(processed_df: pd.DataFrame):
+    """Исходная схема: dict строки и его копия для каждого МС задачи."""
+    grouped = {}
+    for task in processed_df.to_dict('records'):
+        for ms_name in task['identified_microservices']:
+            grouped.setdefault(ms_name, []).append(task.copy())
+    return grouped
+
+
+def measure_peak(func):
+    """Возвращает (результат, память результата в МБ, пик в МБ)."""
+    tracemalloc.start()
+    result = func()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current / 1024 / 1024, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="Количество задач.")
+    parser.add_argument("--ms-per-task", type=int, default=3, help="Количество МС в каждой задаче.")
+    args = parser.parse_args()
+
+    main_cfg, fields_cfg, _ = config_loader.get_all_configs()
+    processed_df = make_synthetic_processed_tasks(args.rows, args.ms_per_task, fields_cfg)
+    sort_config = {
+        "sort_microservices_by": main_cfg.get('sort_microservices_by', "name_asc"),
+        "sort_issue_types_order": main_cfg.get('sort_issue_types_order', []),
+        "sort_tasks_within_group_by": main_cfg.get('sort_tasks_within_group_by', "issue_key"),
+        "priority_order": main_cfg.get('priority_order', [])
+    }
+
+    _, legacy_current, legacy_peak = measure_peak(lambda: legacy_grouping(processed_df))
+    grouping, records_current, records_peak = measure_peak(
+        lambda: data_processor.build_task_grouping(processed_df, sort_config, fields_cfg))
+    grouping.changes_view()
+
+    print(f"Задач: {args.rows}, МС на задачу: {args.ms_per_task}")
+    print(f"dict на каждый МС: удерживается {legacy_current:8.1f} МБ, пик {legacy_peak:8.1f} МБ")
+    print(f"TaskRecord:        удерживается {records_current:8.1f} МБ, пик {records_peak:8.1f} МБ")
+    print(f"Экономия удерживаемой памяти: x{legacy_current / max(records_current, 1e-9):.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Бенчмарк подготовки task_report_text: построчный DataFrame.apply (legacy) против векторной версии.
+
+Запуск из корня проекта:
+    python benchmarks/bench_task_report_text.py [--rows 100000] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+current_bench_dir = os.path.dirname(os.path.abspath(__file__))
+project_root_dir = os.path.dirname(current_bench_dir)
+if project_root_dir not in sys.path:
+    sys.path.insert(0, project_root_dir)
+
+import pandas as pd
+
+from src import config_loader
+from src import data_processor
+
+
+def make_synthetic_tasks(rows_count: int, field_names, seed: int = 42) -> pd.DataFrame:
+    """Синтетические задачи после отбора колонок: ~40% с описанием для клиента, ~30% со ссылками."""
+    rnd = random.Random(seed)
+    words = ["сервис", "отчет", "ошибка", "интеграция", "настройка", "профиль", "скоринг", "запрос", "kafka", "api"]
+
+    def phrase(min_words, max_words):
+        return " ".join(rnd.choice(words) for _ in range(rnd.randint(min_words, max_words)))
+
+    return pd.DataFrame({
+        field_names.key: [f"PHB-{i}" for i in range(rows_count)],
+        field_names.summary: [phrase(3, 12) if rnd.random() > 0.05 else "" for _ in range(rows_count)],
+        field_names.customer_desc: [phrase(10, 40) if rnd.random() < 0.4 else "" for _ in range(rows_count)],
+        field_names.links: [f"PHB-{rnd.randint(1, rows_count)}" if rnd.random() < 0.3 else "" for _ in
+                            range(rows_count)],
+        'identified_microservices': [["phobos-front"] for _ in range(rows_count)],
+    })
+
+
+def best_time(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="Количество строк синтетической выгрузки.")
+    parser.add_argument("--repeat", type=int, default=3, help="Количество повторов (берется лучшее время).")
+    args = parser.parse_args()
+
+    _, field_names, _ = config_loader.get_all_configs()
+    tasks_df = make_synthetic_tasks(args.rows, field_names)
+    links_label = "реализовано в рамках"
+
+    legacy_result = tasks_df.apply(
+        lambda row: data_processor.prepare_task_description_text(row, field_names, links_label=links_label), axis=1)
+    vectorized_result = data_processor.build_task_report_texts(tasks_df, field_names, links_label=links_label)
+    if legacy_result.tolist() != vectorized_result.tolist():
+        print("ОШИБКА: результаты legacy и vectorized различаются.")
+        sys.exit(1)
+
+    legacy_time = best_time(lambda: tasks_df.apply(
+        lambda row: data_processor.prepare_task_description_text(row, field_names, links_label=links_label), axis=1),
+                            args.repeat)
+    vectorized_time = best_time(
+        lambda: data_processor.build_task_report_texts(tasks_df, field_names, links_label=links_label), args.repeat)
+
+    print(f"Строк: {args.rows}")
+    print(f"legacy (DataFrame.apply): {legacy_time:.3f} с")
+    print(f"vectorized:               {vectorized_time:.3f} с")
+    print(f"Ускорение:                x{legacy_time / vectorized_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Детерминированный генератор синтетических выгрузок JIRA (CSV) для бенчмарков.
+
+Структура файла повторяет реальную выгрузку под конфигурации из configs/: колонки fields_mapping.json,
+несколько одноименных колонок 'Fix Version/s', многострочные инструкции по установке и лишние колонки,
+которые отчет не использует. При одинаковых параметрах и seed файл побайтно совпадает.
+
+Запуск из корня проекта:
+    python benchmarks/jira_csv_generator.py output.csv [--rows 10000] [--fix-version-columns 3]
+        [--prefix-mix IN=5,FR=1] [--global-ratio 0.05] [--setup-ratio 0.2] [--summary-words 4-12] ...
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+
+current_bench_dir = os.path.dirname(os.path.abspath(__file__))
+project_root_dir = os.path.dirname(current_bench_dir)
+if project_root_dir not in sys.path:
+    sys.path.insert(0, project_root_dir)
+
+from src import config_loader
+
+FIX_VERSIONS_HEADER = "Fix Version/s"
+LEADING_HEADERS = ("Summary", "Issue key", "Issue id", "Issue Type", "Status", "Priority")
+TRAILING_HEADERS = ("Custom field (Description for the customer)", "Custom field (Инструкция по установке)",
+                    "Inward issue link (Relates)")
+ISSUE_TYPES = ("Bug", "Story", "Task", "Improvement", "Epic")
+ISSUE_TYPE_WEIGHTS = (40, 25, 20, 10, 5)
+PRIORITIES = ("Highest", "High", "Medium", "Low", "Lowest")
+PRIORITY_WEIGHTS = (5, 20, 50, 20, 5)
+STATUSES = ("Done", "Closed", "Resolved")
+UNKNOWN_PREFIXES = ("XX", "TMP", "OLD")
+WORDS = ("исправлена", "ошибка", "добавлена", "проверка", "отчет", "клиента", "запрос", "профиль", "скоринг",
+         "интеграция", "очередь", "сообщение", "таймаут", "кэш", "настройка", "параметр", "обработка", "платеж",
+         "уведомление", "шаблон", "журнал", "фильтр", "поиск", "сервис", "данных", "при", "для", "в", "не", "и",
+         "request", "timeout", "retry", "payload", "schema", "endpoint", "kafka", "topic", "limit", "cache")
+SETUP_STEPS = ("обновить конфигурацию {service}", "перезапустить {service}", "выполнить миграцию БД {service}",
+               "добавить параметр {param} = {value}", "очистить кэш {service}", "проверить доступность {service}")
+
+
+def parse_range(range_text: str) -> tuple:
+    """'4-12' -> (4, 12), '7' -> (7, 7)."""
+    low, _, high = range_text.partition('-')
+    low = int(low)
+    high = int(high) if high else low
+    if low < 0 or high < low:
+        raise ValueError(f"Некорректный диапазон '{range_text}'")
+    return low, high
+
+
+def parse_prefix_mix(prefix_mix_text: str, prefix_mapping: dict) -> dict:
+    """'IN=5,FR=1' -> {'IN': 5.0, 'FR': 1.0}. Пустая строка - все префиксы prefix_mapping с равными весами."""
+    if not prefix_mix_text:
+        return {prefix: 1.0 for prefix in prefix_mapping}
+    prefix_weights = {}
+    for item in prefix_mix_text.split(','):
+        prefix, _, weight = item.strip().partition('=')
+        if prefix not in prefix_mapping:
+            raise ValueError(f"Префикс '{prefix}' отсутствует в microservice_prefix_mapping")
+        prefix_weights[prefix] = float(weight) if weight else 1.0
+    return prefix_weights
+
+
+def _words(rnd: random.Random, words_range: tuple) -> str:
+    return " ".join(rnd.choices(WORDS, k=rnd.randint(*words_range))).capitalize()
+
+
+def generate_jira_csv(output_path: str, rows: int = 10000, fix_version_columns: int = 3, prefix_weights: dict = None,
+                      global_ratio: float = 0.05, unknown_prefix_ratio: float = 0.02, version_fill_ratio: float = 0.4,
+                      setup_ratio: float = 0.2, description_ratio: float = 0.7, links_ratio: float = 0.3,
+                      summary_words: tuple = (4, 12), description_words: tuple = (10, 60), setup_lines: tuple = (1, 4),
+                      extra_columns: int = 5, global_version: str = "2.3.1", delimiter: str = ',',
+                      encoding: str = 'utf-8', seed: int = 42) -> dict:
+    """
+    Записывает синтетическую выгрузку JIRA.
+
+    :param fix_version_columns: Количество колонок 'Fix Version/s' (в pandas: 'Fix Version/s', '.1', '.2', ...).
+    :param prefix_weights: Префикс МС -> вес в выборке (префиксы из microservice_prefix_mapping).
+    :param global_ratio: Доля задач с меткой 'X.Y.Z (GLOBAL)' в одной из колонок версий.
+    :param unknown_prefix_ratio: Доля ячеек версий с префиксом, которого нет в маппинге.
+    :param version_fill_ratio: Вероятность заполнения каждой колонки версий после первой.
+    :param setup_ratio: Доля задач с инструкцией по установке.
+    :param summary_words: Диапазон количества слов в Summary (описание для клиента - description_words,
+                          строки инструкции - setup_lines).
+    :param extra_columns: Количество колонок, не используемых отчетом (как в полной выгрузке JIRA).
+    :return: Статистика: строк, колонок, байт, задач с GLOBAL и с инструкциями.
+    """
+    rnd = random.Random(seed)
+    prefixes = list(prefix_weights)
+    weights = [prefix_weights[prefix] for prefix in prefixes]
+    # Небольшой набор версий на МС, как в реальном релизе (значения ячеек повторяются)
+    prefix_versions = {prefix: [f"{rnd.randint(0, 5)}.{rnd.randint(0, 20)}.{patch}" for patch in range(8)]
+                       for prefix in prefixes}
+    extra_headers = [f"Custom field (Unused {pos})" for pos in range(extra_columns)]
+    header = [*LEADING_HEADERS, *[FIX_VERSIONS_HEADER] * fix_version_columns, *TRAILING_HEADERS, *extra_headers]
+    stats = {'rows': rows, 'columns': len(header), 'global_rows': 0, 'setup_rows': 0}
+
+    output_dir = os.path.dirname(output_path)
+    if output_dir: os.makedirs(output_dir, exist_ok=True)
+    with open(output_path, 'w', encoding=encoding, newline='') as f:
+        writer = csv.writer(f, delimiter=delimiter)
+        writer.writerow(header)
+        for row_num in range(rows):
+            task_prefixes = []
+            version_cells = []
+            for column_pos in range(fix_version_columns):
+                if column_pos and rnd.random() >= version_fill_ratio:
+                    version_cells.append("")
+                    continue
+                if rnd.random() < unknown_prefix_ratio:
+                    version_cells.append(f"{rnd.choice(UNKNOWN_PREFIXES)} 1.0.{rnd.randint(0, 9)}")
+                    continue
+                prefix = rnd.choices(prefixes, weights)[0]
+                task_prefixes.append(prefix)
+                version_cells.append(f"{prefix} {rnd.choice(prefix_versions[prefix])}")
+            if fix_version_columns and rnd.random() < global_ratio:
+                version_cells[rnd.randrange(fix_version_columns)] = f"{global_version} (GLOBAL)"
+                stats['global_rows'] += 1
+
+            setup_text = ""
+            if rnd.random() < setup_ratio:
+                service = task_prefixes[0] if task_prefixes else "сервис"
+                setup_text = "\n".join(
+                    f"Шаг {step}: " + rnd.choice(SETUP_STEPS).format(service=service, param=f"param_{rnd.randint(1, 99)}",
+                                                                      value=rnd.randint(1, 1000))
+                    for step in range(1, rnd.randint(*setup_lines) + 1))
+                stats['setup_rows'] += 1
+            links = ", ".join(f"PHB-{rnd.randint(1, rows)}" for _ in range(rnd.randint(1, 3))) \
+                if rnd.random() < links_ratio else ""
+
+            writer.writerow([
+                _words(rnd, summary_words), f"PHB-{row_num + 1}", str(100000 + row_num),
+                rnd.choices(ISSUE_TYPES, ISSUE_TYPE_WEIGHTS)[0], rnd.choice(STATUSES),
+                rnd.choices(PRIORITIES, PRIORITY_WEIGHTS)[0],
+                *version_cells,
+                _words(rnd, description_words) if rnd.random() < description_ratio else "",
+                setup_text, links,
+                *[_words(rnd, (1, 6)) for _ in extra_headers],
+            ])
+    stats['bytes'] = os.path.getsize(output_path)
+    return stats
+
+
+def add_generator_arguments(parser: argparse.ArgumentParser):
+    """Параметры генератора (общие для генератора и бенчмарков, которые создают CSV сами)."""
+    parser.add_argument("--fix-version-columns", type=int, default=3, help="Количество колонок 'Fix Version/s'.")
+    parser.add_argument("--prefix-mix", default="",
+                        help="Веса префиксов МС, например 'IN=5,FR=1' (по умолчанию все префиксы config.json поровну).")
+    parser.add_argument("--global-ratio", type=float, default=0.05, help="Доля задач с меткой '(GLOBAL)'.")
+    parser.add_argument("--unknown-prefix-ratio", type=float, default=0.02,
+                        help="Доля ячеек версий с неизвестным префиксом.")
+    parser.add_argument("--version-fill-ratio", type=float, default=0.4,
+                        help="Вероятность заполнения каждой колонки версий после первой.")
+    parser.add_argument("--setup-ratio", type=float, default=0.2, help="Доля задач с инструкцией по установке.")
+    parser.add_argument("--description-ratio", type=float, default=0.7, help="Доля задач с описанием для клиента.")
+    parser.add_argument("--summary-words", type=parse_range, default=(4, 12), help="Слов в Summary, диапазон 'A-B'.")
+    parser.add_argument("--description-words", type=parse_range, default=(10, 60),
+                        help="Слов в описании для клиента, диапазон 'A-B'.")
+    parser.add_argument("--setup-lines", type=parse_range, default=(1, 4), help="Строк в инструкции, диапазон 'A-B'.")
+    parser.add_argument("--extra-columns", type=int, default=5, help="Колонок, не используемых отчетом.")
+    parser.add_argument("--seed", type=int, default=42, help="Seed генератора (одинаковый seed - одинаковый файл).")
+
+
+def generator_options(args, main_cfg: dict) -> dict:
+    """Аргументы generate_jira_csv из разобранных параметров add_generator_arguments."""
+    return {
+        'fix_version_columns': args.fix_version_columns,
+        'prefix_weights': parse_prefix_mix(args.prefix_mix, main_cfg.get('microservice_prefix_mapping', {})),
+        'global_ratio': args.global_ratio, 'unknown_prefix_ratio': args.unknown_prefix_ratio,
+        'version_fill_ratio': args.version_fill_ratio, 'setup_ratio': args.setup_ratio,
+        'description_ratio': args.description_ratio, 'summary_words': args.summary_words,
+        'description_words': args.description_words, 'setup_lines': args.setup_lines,
+        'extra_columns': args.extra_columns, 'delimiter': main_cfg.get('csv_delimiter', ','),
+        'encoding': main_cfg.get('csv_encoding', 'utf-8'), 'seed': args.seed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output", help="Путь к создаваемому CSV.")
+    parser.add_argument("--rows", type=int, default=10000, help="Количество задач.")
+    add_generator_arguments(parser)
+    args = parser.parse_args()
+
+    main_cfg, _, _ = config_loader.get_all_configs()
+    if main_cfg is None: sys.exit(1)
+    try:
+        options = generator_options(args, main_cfg)
+    except ValueError as e:
+        parser.error(str(e))
+    stats = generate_jira_csv(args.output, rows=args.rows, **options)
+    print(f"Создан {args.output}: строк {stats['rows']}, колонок {stats['columns']}, "
+          f"{stats['bytes'] / 1024 / 1024:.1f} МБ; задач с GLOBAL {stats['global_rows']}, "
+          f"с инструкциями {stats['setup_rows']}")
+
+
+if __name__ == "__main__":
+    main()
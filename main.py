@@ -1,7 +1,13 @@
+import time
+
+_startup_started = time.perf_counter()
+
+import argparse
+import datetime
+import importlib
 import os
 import sys
 import json
-from collections import OrderedDict
 
 # --- Настройка sys.path и импорты ---
 current_main_dir = os.path.dirname(os.path.abspath(__file__))
@@ -14,9 +20,29 @@ from src import logger_config
 logger = logger_config.setup_logger(__name__)
 
 from src import config_loader
-from src import csv_parser
-from src import data_processor
-from src import report_generator
+from src import stage_metrics
+
+# Модули конвейера (pandas, python-docx) импортируются при первой необходимости через import_stage_module:
+# --help и --validate их не загружают
+DEFAULT_PROFILE_DIR = "output/profile"
+HEAVY_MODULES = ("pandas", "numpy", "packaging", "docx", "lxml")
+# (модуль, время импорта в секундах)
+import_timings = [("main (стартовые импорты)", time.perf_counter() - _startup_started)]
+
+
+def import_stage_module(module_name: str):
+    """Импортирует модуль конвейера и записывает время импорта в import_timings."""
+    started = time.perf_counter()
+    module = importlib.import_module(module_name)
+    import_timings.append((module_name, time.perf_counter() - started))
+    return module
+
+
+def log_import_timings(log_method):
+    for module_name, seconds in import_timings:
+        log_method(f"Импорт {module_name}: {seconds:.3f} с")
+    not_loaded = [module_name for module_name in HEAVY_MODULES if module_name not in sys.modules]
+    log_method(f"Не загружены: {', '.join(not_loaded) or 'нет'}")
 
 
 def pretty_print_json_for_debug(data, indent=2, ensure_ascii=False):
@@ -26,124 +52,95 @@ def pretty_print_json_for_debug(data, indent=2, ensure_ascii=False):
         logger.debug("Нет данных JSON для вывода.")
 
 
-if __name__ == "__main__":
-    logger.info("--- Запуск JiraCsvReleaseNotesGenerator ---")
-    project_root = os.path.dirname(os.path.abspath(__file__))
-    config_directory_name = "configs"
+def run_single_report(project_root: str, config_directory_name: str = "configs", profile_dir: str = None) -> int:
+    """
+    Один отчет по configs/*.json. Возвращает код завершения процесса.
 
+    :param profile_dir: Директория профилей cProfile по этапам (режим --profile). None - без профилирования.
+    """
+    # Отбрасывается после загрузки конфигураций, если collect_metrics выключен и профилирование не запрошено
+    metrics = stage_metrics.PipelineMetrics(profile_dir=profile_dir)
     logger.info("--- Этап 1: Загрузка конфигураций ---")
-    main_cfg, fields_cfg, styles_cfg = config_loader.get_all_configs(config_dir_name=config_directory_name)
+    with metrics.stage("config_load"):
+        main_cfg, fields_cfg, styles_cfg = config_loader.get_all_configs(config_dir_name=config_directory_name)
     if not (main_cfg and fields_cfg and styles_cfg):
-        logger.critical("--- Ошибка загрузки конфигураций. Завершение работы. ---");
-        exit(1)
+        logger.critical("--- Ошибка загрузки конфигураций. Завершение работы. ---")
+        return 1
     logger.info("Все конфигурационные файлы успешно загружены.")
+    logger_config.apply_log_levels(main_cfg.get('log_levels', {}))
+    if not main_cfg.get('collect_metrics', True) and not profile_dir:
+        metrics = None
+    elif main_cfg.get('metrics_trace_memory', False):
+        metrics.start_memory_tracing()
 
     logger.info("--- Этап 2: Чтение CSV-файла ---")
-    input_csv_relative_path = main_cfg.get('input_csv_file')
-    if not input_csv_relative_path:
-        logger.critical("Путь к CSV не указан в config.json. Завершение.");
-        exit(1)
-    csv_full_path = os.path.join(project_root, input_csv_relative_path)
-    # ... (остальной код чтения CSV как был) ...
-    jira_dataframe_raw = csv_parser.load_csv_to_dataframe(file_path=csv_full_path,
-                                                          encoding=main_cfg.get('csv_encoding', 'utf-8'),
-                                                          delimiter=main_cfg.get('csv_delimiter', ','))
-    if jira_dataframe_raw is None or jira_dataframe_raw.empty: logger.critical("Ошибка CSV. Завершение."); exit(1)
-    logger.info(f"CSV успешно загружен. Строк: {len(jira_dataframe_raw)}")
-
-    data_proc_shared_config = {
-        "microservice_source_field_csv": main_cfg.get('microservice_source_field_csv'),
-        "microservice_prefix_mapping": main_cfg.get('microservice_prefix_mapping', {})
-    }
-
-    global_release_ver = main_cfg.get('global_release_version', "N/A")
-    if main_cfg.get("auto_detect_global_version", False):
-        logger.info("--- Авто-определение глобальной версии ---")
-        detected_gv = data_processor.detect_global_release_version(jira_dataframe_raw.copy(), {
-            "microservice_source_field_csv": data_proc_shared_config["microservice_source_field_csv"]})
-        if detected_gv:
-            global_release_ver = detected_gv
-        else:
-            logger.warning(f"Не удалось авто-определить глоб.версию. Используется: '{global_release_ver}'")
-    else:
-        logger.info(f"Используется глоб.версия из config: '{global_release_ver}'")
+    report_pipeline = import_stage_module("src.report_pipeline")
+    task_data = report_pipeline.load_task_data(main_cfg, fields_cfg, project_root, metrics=metrics)
+    if task_data is None:
+        logger.critical("--- Ошибка чтения CSV. Завершение работы. ---")
+        return 1
+
+    processed_df = report_pipeline.process_tasks(main_cfg, fields_cfg, task_data, metrics)
+    task_data.raw_df = None  # Исходные данные дальше не нужны (все нужное - в processed_df и version_index)
+
+    output_paths = report_pipeline.generate_report(main_cfg, fields_cfg, styles_cfg, task_data, project_root,
+                                                   processed_df=processed_df, metrics=metrics)
+    if metrics is not None: metrics.stop_memory_tracing()
+    if output_paths is None:
+        logger.critical("--- Ошибка генерации отчета. Завершение работы. ---")
+        return 1
+    logger.info(f"--- Генерация контента завершена. Файлы: {', '.join(output_paths) or 'нет'} ---")
+    log_import_timings(logger.debug)
+    return 0
+
+
+def run_validation(project_root: str, csv_path: str = None, config_directory_name: str = "configs") -> int:
+    """
+    Режим --validate: конфигурации, маппинг полей и префиксов против строки заголовков CSV, без генерации отчета.
+    Возвращает код завершения процесса (0 - ошибок нет, предупреждения допустимы).
+    """
+    logger.info("--- Проверка конфигураций и заголовков CSV ---")
+    config_validator = import_stage_module("src.config_validator")
+    result = config_validator.validate_project(project_root, config_directory_name, csv_path=csv_path)
+    log_import_timings(logger.info)
+    if not result.ok:
+        logger.critical(f"--- Проверка не пройдена: ошибок {len(result.errors)}, "
+                        f"предупреждений {len(result.warnings)} ---")
+        return 1
+    logger.info(f"--- Проверка пройдена. Предупреждений: {len(result.warnings)} ---")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Генерация Release Notes (.docx) из CSV-выгрузки JIRA.")
+    parser.add_argument("--batch", metavar="MANIFEST",
+                        help="Пакетный режим: JSON-манифест вариантов отчета (путь относительно корня проекта). "
+                             "CSV читается один раз, варианты генерируются параллельно.")
+    parser.add_argument("--profile", nargs="?", const=DEFAULT_PROFILE_DIR, metavar="DIR",
+                        help="Профилировать каждый этап через cProfile: .pstats и collapsed stacks (для flamegraph) "
+                             f"в подкаталоге запуска DIR (по умолчанию {DEFAULT_PROFILE_DIR}).")
+    parser.add_argument("--validate", nargs="?", const="", metavar="CSV",
+                        help="Только проверить configs/*.json и соответствие маппинга полей строке заголовков CSV "
+                             "(input_csv_file или CSV), без чтения данных и генерации отчета.")
+    args = parser.parse_args()
+    if args.validate is not None and (args.batch or args.profile):
+        parser.error("--validate не совмещается с --batch и --profile")
 
-    microservice_versions_for_table_data = []
-    if main_cfg.get("auto_detect_component_versions", False):
-        logger.info("--- Авто-определение версий компонентов ---")
-        microservice_versions_for_table_data = data_processor.detect_component_versions_from_data(
-            jira_dataframe_raw.copy(), data_proc_shared_config)
-    else:
-        microservice_versions_for_table_data = main_cfg.get('microservices_versions_for_table', [])
-        logger.info("Используются версии компонентов из config.")
-
-    logger.info("--- Этапы 3, 4: Обработка данных задач ---")
-    processed_df_before_grouping = data_processor.process_initial_data(
-        df_raw=jira_dataframe_raw.copy(),
-        fields_mapping_config=fields_cfg,
-        microservice_config=data_proc_shared_config,
-        main_app_config=main_cfg  # <--- ПЕРЕДАЕМ main_cfg СЮДА
-    )
-    if processed_df_before_grouping.empty:
-        logger.critical("Ошибка process_initial_data. Завершение.");
-        exit(1)
-    logger.info(f"Данные после process_initial_data. Задач: {len(processed_df_before_grouping)}")
-
-    logger.info("--- Этап 5: Группировка для 'Перечня изменений' ---")
-    sort_options_config = {  # ... (как было) ...
-        "sort_microservices_by": main_cfg.get('sort_microservices_by', "name_asc"),
-        "sort_issue_types_order": main_cfg.get('sort_issue_types_order', []),
-        "sort_tasks_within_group_by": main_cfg.get('sort_tasks_within_group_by', "issue_key"),
-        "priority_order": main_cfg.get('priority_order', [])
-    }
-    grouped_and_sorted_tasks_for_changes = data_processor.group_and_sort_tasks(
-        processed_df=processed_df_before_grouping.copy(), sort_config=sort_options_config,
-        fields_mapping_config=fields_cfg
-    )
-    if not grouped_and_sorted_tasks_for_changes:
-        logger.warning("Нет данных для 'Перечня изменений'.")
-        grouped_and_sorted_tasks_for_changes = OrderedDict()
-    else:
-        logger.info("Группировка для 'Перечня изменений' завершена.")
-
-    logger.info("--- Этап 8: Подготовка для 'Настроек системы' ---")
-    grouped_tasks_for_setup_section = data_processor.prepare_setup_instructions_data(
-        processed_df_with_tasks=processed_df_before_grouping.copy(), fields_mapping_config=fields_cfg,
-        sort_config=sort_options_config
-    )
-    if not grouped_tasks_for_setup_section:
-        logger.warning("Нет данных для 'Настроек системы'.")
-        grouped_tasks_for_setup_section = OrderedDict()
-    else:
-        logger.info("Подготовка для 'Настроек системы' завершена.")
-
-    logger.info("--- Этапы 6, 7, 8: Генерация Word-документа ---")
-    report_title_template = main_cfg.get('report_title_template',
-                                         "Отчет по релизу версия {global_release_version}")  # ... (как было)
-    report_title = report_title_template.format(global_release_version=global_release_ver)
-    # ... (остальной код генерации отчета как был, он уже использует logger) ...
-    logo_relative_path = main_cfg.get('logo_path')
-    logo_full_abs_path = None
-    if logo_relative_path:
-        logo_full_abs_path = os.path.join(project_root, logo_relative_path)
-        if not os.path.exists(logo_full_abs_path):
-            logger.warning(f"Файл логотипа не найден: {logo_full_abs_path}");
-            logo_full_abs_path = None
-
-    output_file_template = main_cfg.get('output_report_file_docx', "output/ReleaseNotes_default.docx")
-    safe_gv_filename = str(global_release_ver).replace("/", "-").replace("\\", "-").replace(":", "-").replace("*",
-                                                                                                              "-").replace(
-        "?", "-").replace("\"", "").replace("<", "").replace(">", "").replace("|", "").strip()
-    if not safe_gv_filename: safe_gv_filename = "UNKNOWN_VERSION"; logger.warning(
-        f"Глоб.версия ('{global_release_ver}') пустая. Имя файла: '{safe_gv_filename}'.")
-    output_filename_docx = output_file_template.format(global_release_version=safe_gv_filename)
-    output_full_path_docx = os.path.join(project_root, output_filename_docx)
-
-    report_generator.generate_report_docx(
-        output_filename=output_full_path_docx, report_title_text=report_title,
-        logo_full_path=logo_full_abs_path, microservice_versions_list=microservice_versions_for_table_data,
-        word_styles_config=styles_cfg, grouped_data_for_changes=grouped_and_sorted_tasks_for_changes,
-        grouped_data_for_setup=grouped_tasks_for_setup_section, main_config_for_titles=main_cfg,
-        fields_mapping_for_details=fields_cfg
-    )
-    logger.info(f"--- Генерация контента завершена. Документ: {output_full_path_docx} ---")
\ No newline at end of file
+    logger.info("--- Запуск JiraCsvReleaseNotesGenerator ---")
+    project_root = os.path.dirname(os.path.abspath(__file__))
+    if args.validate is not None:
+        return run_validation(project_root, csv_path=args.validate or None)
+    profile_dir = None
+    if args.profile:
+        # Подкаталог на каждый запуск, чтобы профили разных запусков можно было сравнить
+        profile_dir = os.path.join(project_root, args.profile, datetime.datetime.now().strftime("%Y%m%d_%H%M%S"))
+        logger.info(f"Режим профилирования: профили этапов сохраняются в {profile_dir}. "
+                    f"Время этапов под профилировщиком завышено.")
+    if args.batch:
+        batch_runner = import_stage_module("src.batch_runner")
+        return batch_runner.run_batch(os.path.join(project_root, args.batch), project_root, profile_dir=profile_dir)
+    return run_single_report(project_root, profile_dir=profile_dir)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from . import config_loader
+from . import csv_parser
+from . import data_processor
+from . import field_schema
+from . import report_pipeline
+from . import stage_metrics
+from . import logger_config  # Относительный импорт
+
+logger = logger_config.setup_logger(__name__)
+
+# Настройки чтения CSV и извлечения МС: выгрузка читается один раз, поэтому у всех вариантов они должны совпадать
+SHARED_CSV_CONFIG_KEYS = ('input_csv_file', 'csv_encoding', 'csv_delimiter', 'csv_engine',
+                          'csv_read_only_used_columns', 'csv_cache_dir', 'csv_cache_max_size_mb',
+                          'microservice_source_field_csv', 'microservice_prefix_mapping')
+# Настройки процесса: действуют на все варианты сразу
+SHARED_PROCESS_CONFIG_KEYS = ('log_levels',)
+# Настройки config.json, от которых зависит результат process_initial_data (вместе с набором полей)
+PROCESSING_CONFIG_KEYS = ('links_label_text', 'task_text_engine')
+# Настройки глобальной версии: вариант "по глобальной версии" отбирает задачи фильтром 'global_versions', иначе
+# в отчет попали бы все задачи выгрузки под заголовком другой версии
+GLOBAL_VERSION_CONFIG_KEYS = ('global_release_version', 'auto_detect_global_version')
+VARIANT_KEYS = ('name', 'config', 'fields_mapping', 'word_styles', 'microservices', 'global_versions')
+
+
+class ReportVariant:
+    """Вариант отчета из манифеста пакетного режима с уже собранными конфигурациями."""
+    __slots__ = ('name', 'main_config', 'fields_mapping_file', 'fields_schema', 'word_styles', 'microservices',
+                 'global_versions')
+
+    def __init__(self, name: str, main_config: dict, fields_mapping_file: str, fields_schema, word_styles: dict,
+                 microservices=None, global_versions=None):
+        self.name = name
+        self.main_config = main_config
+        self.fields_mapping_file = fields_mapping_file
+        self.fields_schema = fields_schema
+        self.word_styles = word_styles
+        self.microservices = frozenset(microservices) if microservices is not None else None
+        self.global_versions = frozenset(version.strip() for version in global_versions) \
+            if global_versions is not None else None
+
+    def processing_key(self) -> str:
+        """Ключ подготовки задач: варианты с одинаковым ключом используют один processed_df."""
+        return json.dumps([self.fields_mapping_file] + [self.main_config.get(key) for key in PROCESSING_CONFIG_KEYS],
+                          sort_keys=True, ensure_ascii=False)
+
+
+def _load_config_file(config_dir: str, file_name: str, loaded_files: dict):
+    """JSON из директории конфигураций (каждый файл читается один раз на манифест)."""
+    if file_name not in loaded_files:
+        loaded_files[file_name] = config_loader.load_json_config(os.path.join(config_dir, file_name))
+    return loaded_files[file_name]
+
+
+def load_batch_manifest(manifest_path: str, config_dir_name: str = "configs"):
+    """
+    Загружает манифест пакетного режима и собирает конфигурации вариантов.
+
+    Конфигурация варианта: config.json, поверх него - "config" манифеста (общие настройки), поверх - "config"
+    варианта. "fields_mapping" и "word_styles" варианта - имена файлов в директории конфигураций
+    (по умолчанию fields_mapping.json и word_styles.json), "microservices" - список МС, попадающих в отчет,
+    "global_versions" - список глобальных версий: в отчет попадают только задачи с меткой '<версия> (GLOBAL)'.
+
+    :return: Кортеж (количество процессов из "workers", список ReportVariant) или None в случае ошибки.
+    """
+    manifest = config_loader.load_json_config(manifest_path)
+    if manifest is None: return None
+    variant_specs = manifest.get('variants') if isinstance(manifest, dict) else None
+    if not isinstance(variant_specs, list) or not variant_specs:
+        logger.error(f"Манифест {manifest_path}: ожидается непустой список 'variants'.")
+        return None
+
+    base_main_config, _, _ = config_loader.get_all_configs(config_dir_name=config_dir_name)
+    if base_main_config is None: return None
+    config_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), config_dir_name)
+    shared_config = dict(base_main_config, **manifest.get('config', {}))
+
+    loaded_files = {}
+    variants = []
+    errors = []
+    for pos, spec in enumerate(variant_specs):
+        if not isinstance(spec, dict) or not spec.get('name'):
+            errors.append(f"Вариант #{pos}: ожидается объект с непустым 'name'")
+            continue
+        name = str(spec['name'])
+        unknown_keys = sorted(set(spec) - set(VARIANT_KEYS))
+        if unknown_keys:
+            logger.warning(f"Вариант '{name}': неизвестные ключи {unknown_keys} игнорируются.")
+        variant_config = spec.get('config', {})
+        changed_shared_keys = [key for key in SHARED_CSV_CONFIG_KEYS if key in variant_config and
+                               variant_config[key] != shared_config.get(key)]
+        if changed_shared_keys:
+            errors.append(f"Вариант '{name}': настройки чтения CSV {changed_shared_keys} задаются только в общем "
+                          f"'config' манифеста (CSV читается один раз)")
+            continue
+        changed_process_keys = [key for key in SHARED_PROCESS_CONFIG_KEYS if key in variant_config and
+                                variant_config[key] != shared_config.get(key)]
+        if changed_process_keys:
+            errors.append(f"Вариант '{name}': настройки {changed_process_keys} задаются только в общем "
+                          f"'config' манифеста (общие для всех вариантов)")
+            continue
+
+        fields_mapping_file = spec.get('fields_mapping', "fields_mapping.json")
+        fields_mapping = _load_config_file(config_dir, fields_mapping_file, loaded_files)
+        word_styles = _load_config_file(config_dir, spec.get('word_styles', "word_styles.json"), loaded_files)
+        fields_schema = field_schema.build_field_schema(fields_mapping) if fields_mapping is not None else None
+        if fields_schema is None or word_styles is None:
+            errors.append(f"Вариант '{name}': не удалось загрузить fields_mapping или word_styles")
+            continue
+        microservices = spec.get('microservices')
+        if microservices is not None and not isinstance(microservices, list):
+            errors.append(f"Вариант '{name}': 'microservices' должен быть списком имен МС")
+            continue
+        global_versions = spec.get('global_versions')
+        if global_versions is not None and (not isinstance(global_versions, list) or not global_versions or
+                                            not all(isinstance(version, str) and version.strip()
+                                                    for version in global_versions)):
+            errors.append(f"Вариант '{name}': 'global_versions' должен быть непустым списком глобальных версий")
+            continue
+        changed_global_version_keys = [key for key in GLOBAL_VERSION_CONFIG_KEYS if key in variant_config and
+                                       variant_config[key] != shared_config.get(key)]
+        if changed_global_version_keys and global_versions is None:
+            errors.append(f"Вариант '{name}': {changed_global_version_keys} меняют глобальную версию отчета, но "
+                          f"задачи не отобраны. Задайте 'global_versions' варианта")
+            continue
+        variants.append(ReportVariant(name, dict(shared_config, **variant_config), fields_mapping_file,
+                                      fields_schema, word_styles, microservices, global_versions))
+
+    variant_names = [variant.name for variant in variants]
+    duplicate_names = sorted({name for name in variant_names if variant_names.count(name) > 1})
+    if duplicate_names:
+        errors.append(f"Повторяющиеся имена вариантов: {duplicate_names}")
+    output_files = [('generate_docx', True, 'output_report_file_docx', report_pipeline.DEFAULT_DOCX_FILE),
+                    ('collect_metrics', True, 'metrics_file', report_pipeline.DEFAULT_METRICS_FILE)]
+    output_files += [(enabled_key, False, file_template_key, default_file_template) for
+                     enabled_key, file_template_key, default_file_template in report_pipeline.PREVIEW_OUTPUTS.values()]
+    for enabled_key, enabled_default, template_key, default_template in output_files:
+        output_templates = [variant.main_config.get(template_key, default_template) for variant in variants
+                            if variant.main_config.get(enabled_key, enabled_default)]
+        shared_templates = sorted({template for template in output_templates
+                                   if output_templates.count(template) > 1 and "{variant}" not in template})
+        if shared_templates:
+            errors.append(f"Несколько вариантов пишут в один файл {shared_templates}: добавьте в {template_key} "
+                          f"плейсхолдер {{variant}} или задайте разные имена файлов")
+    if errors:
+        for error in errors:
+            logger.error(f"Ошибка в манифесте {manifest_path}: {error}")
+        return None
+
+    workers = manifest.get('workers', 0)
+    logger.info(f"Манифест пакетного режима загружен: вариантов {len(variants)}.")
+    return workers, variants
+
+
+def _combined_column_projection(variants: list):
+    """Проекция колонок CSV, покрывающая наборы полей всех вариантов (None - читать все колонки)."""
+    if not variants[0].main_config.get('csv_read_only_used_columns', True): return None
+    headers, prefixes = set(), set()
+    for variant in variants:
+        projection = data_processor.build_csv_column_projection(
+            variant.fields_schema, report_pipeline.build_microservice_config(variant.main_config))
+        headers |= projection.headers
+        prefixes.update(projection.prefixes)
+    return csv_parser.ColumnProjection(headers, prefixes)
+
+
+# Состояние процесса пакетного режима: (LoadedTaskData, {ключ подготовки: processed_df}, варианты, корень проекта,
+# директория профилей или None)
+_batch_state = None
+
+
+def _init_batch_worker(task_data, processed_frames: dict, variants: list, project_root: str, profile_dir: str = None):
+    global _batch_state
+    _batch_state = (task_data, processed_frames, variants, project_root, profile_dir)
+
+
+def _generate_variant(variant_pos: int) -> tuple:
+    """Генерирует отчет одного варианта. Возвращает (имя варианта, список файлов или None, время в секундах)."""
+    task_data, processed_frames, variants, project_root, profile_dir = _batch_state
+    variant = variants[variant_pos]
+    started = time.perf_counter()
+    logger.info(f"--- Вариант '{variant.name}': генерация отчета ---")
+    # Метрики варианта - только его этапы (чтение CSV и подготовка задач общие для всех вариантов)
+    metrics = None
+    if variant.main_config.get('collect_metrics', True) or profile_dir:
+        metrics = stage_metrics.PipelineMetrics(
+            trace_memory=variant.main_config.get('metrics_trace_memory', False),
+            profile_dir=os.path.join(profile_dir, report_pipeline.safe_file_name_part(variant.name))
+            if profile_dir else None)
+    try:
+        output_paths = report_pipeline.generate_report(
+            variant.main_config, variant.fields_schema, variant.word_styles, task_data, project_root,
+            processed_df=processed_frames[variant.processing_key()], microservices=variant.microservices,
+            global_versions=variant.global_versions, variant_name=variant.name, metrics=metrics)
+    except Exception as e:
+        logger.error(f"Вариант '{variant.name}': ошибка генерации отчета: {e}", exc_info=True)
+        output_paths = None
+    if metrics is not None: metrics.stop_memory_tracing()
+    return variant.name, output_paths, time.perf_counter() - started
+
+
+def _resolve_workers(workers, variants_count: int) -> int:
+    try:
+        workers = int(workers)
+    except (TypeError, ValueError):
+        logger.warning(f"Некорректное значение workers '{workers}' в манифесте. Используется 1.")
+        workers = 1
+    if workers <= 0: workers = os.cpu_count() or 1
+    return max(1, min(workers, variants_count))
+
+
+def _worker_pool_context():
+    """fork (где доступен): загруженная выгрузка наследуется процессами без сериализации и только читается."""
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+
+def run_batch(manifest_path: str, project_root: str, config_dir_name: str = "configs", profile_dir: str = None) -> int:
+    """
+    Пакетный режим: CSV читается и индексируется один раз, задачи подготавливаются один раз на каждый набор
+    полей, после чего отчеты всех вариантов манифеста генерируются пулом процессов.
+
+    :param profile_dir: Директория профилей cProfile (режим --profile): этапы каждого варианта профилируются
+                        в подкаталог с именем варианта.
+
+    :return: Код завершения процесса (0 - все варианты сгенерированы).
+    """
+    logger.info(f"--- Пакетный режим: манифест {manifest_path} ---")
+    loaded_manifest = load_batch_manifest(manifest_path, config_dir_name)
+    if loaded_manifest is None:
+        logger.critical("--- Ошибка загрузки манифеста. Завершение работы. ---")
+        return 1
+    workers, variants = loaded_manifest
+    workers = _resolve_workers(workers, len(variants))
+    logger_config.apply_log_levels(variants[0].main_config.get('log_levels', {}))
+
+    base_config = variants[0].main_config
+    if int(base_config.get('csv_chunk_size', 0) or 0) > 0:
+        logger.info("Пакетный режим: csv_chunk_size не используется, CSV читается целиком (общий для вариантов).")
+    logger.info("--- Этап 2: Чтение CSV-файла (общее для всех вариантов) ---")
+    task_data = report_pipeline.load_task_data(base_config, variants[0].fields_schema, project_root,
+                                               usecols=_combined_column_projection(variants), allow_chunked=False)
+    if task_data is None:
+        logger.critical("--- Ошибка чтения CSV. Завершение работы. ---")
+        return 1
+
+    processed_frames = {}
+    for variant in variants:
+        processing_key = variant.processing_key()
+        if processing_key not in processed_frames:
+            logger.info(f"Подготовка задач для набора полей '{variant.fields_mapping_file}' (вариант '{variant.name}').")
+            processed_frames[processing_key] = report_pipeline.process_tasks(variant.main_config,
+                                                                             variant.fields_schema, task_data)
+    task_data.raw_df = None  # Исходные данные дальше не нужны (все нужное - в processed_frames и version_index)
+
+    if workers > 1:
+        for variant in variants:
+            if variant.main_config.get('render_workers', 1) != 1:
+                # Параллельность уже по вариантам; вложенный пул процессов только конкурировал бы за ядра
+                logger.info(f"Вариант '{variant.name}': render_workers = 1 в пакетном режиме.")
+                variant.main_config = dict(variant.main_config, render_workers=1)
+
+    logger.info(f"Генерация вариантов: {len(variants)}, процессов: {workers}.")
+    started = time.perf_counter()
+    if workers > 1:
+        report_pipeline.import_document_modules()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_worker_pool_context(),
+                                 initializer=_init_batch_worker,
+                                 initargs=(task_data, processed_frames, variants, project_root,
+                                           profile_dir)) as executor:
+            results = list(executor.map(_generate_variant, range(len(variants))))
+    else:
+        _init_batch_worker(task_data, processed_frames, variants, project_root, profile_dir)
+        results = [_generate_variant(variant_pos) for variant_pos in range(len(variants))]
+
+    failed_count = 0
+    logger.info(f"--- Пакетный режим завершен за {time.perf_counter() - started:.1f} с ---")
+    for name, output_paths, seconds in results:
+        if output_paths is None:
+            failed_count += 1
+            logger.error(f"  {name}: ОШИБКА ({seconds:.1f} с)")
+        else:
+            logger.info(f"  {name}: {', '.join(output_paths) or 'нет файлов'} ({seconds:.1f} с)")
+    return 1 if failed_count else 0
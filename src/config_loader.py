@@ -1,5 +1,6 @@
 import json
 import os
+from . import field_schema
 from . import logger_config  # Относительный импорт для logger_config.py в той же директории
 
 logger = logger_config.setup_logger(__name__)
@@ -37,8 +38,9 @@ def get_all_configs(config_dir_name: str = "configs"):
 
     :param config_dir_name: Имя директории с конфигурационными файлами,
                            расположенной в корне проекта (например, "configs").
-    :return: Кортеж (main_config, fields_mapping, word_styles).
-             Если какой-либо файл не удалось загрузить, соответствующий элемент будет None.
+    :return: Кортеж (main_config, fields_mapping, word_styles), где fields_mapping - скомпилированная
+             field_schema.FieldSchema (итерируется как исходный список полей).
+             Если какой-либо файл не удалось загрузить (или маппинг полей некорректен), соответствующий элемент будет None.
     """
     logger.info(f"Загрузка всех конфигураций из директории '{config_dir_name}' в корне проекта.")
 
@@ -63,6 +65,8 @@ def get_all_configs(config_dir_name: str = "configs"):
     main_config = load_json_config(main_config_path)
     fields_mapping = load_json_config(fields_mapping_path)
     word_styles = load_json_config(word_styles_path)
+    if fields_mapping is not None:
+        fields_mapping = field_schema.build_field_schema(fields_mapping)
 
     if main_config is None or fields_mapping is None or word_styles is None:
         logger.warning("Не удалось загрузить один или несколько основных конфигурационных файлов.")
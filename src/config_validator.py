@@ -0,0 +1,167 @@
+import codecs
+import importlib.util
+import logging
+import os
+from . import config_loader
+from . import csv_parser
+from . import field_schema
+from . import logger_config  # Относительный импорт
+
+logger = logger_config.setup_logger(__name__)
+
+# Проверка не импортирует pandas и python-docx и не разбирает CSV целиком: только JSON-конфигурации и строка
+# заголовков выгрузки (режим main.py --validate)
+CONFIG_FILE_NAMES = ("config.json", "fields_mapping.json", "word_styles.json")
+DOCX_BACKENDS = ("python-docx", "streaming")
+
+
+class ValidationResult:
+    """Итог проверки: ошибки (отчет не будет построен или будет пустым) и предупреждения."""
+
+    def __init__(self):
+        self.errors = []
+        self.warnings = []
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def error(self, message: str):
+        self.errors.append(message)
+        logger.error(message)
+
+    def warning(self, message: str):
+        self.warnings.append(message)
+        logger.warning(message)
+
+
+def _is_non_empty_string(value) -> bool:
+    return isinstance(value, str) and bool(value.strip())
+
+
+def validate_main_config(main_cfg: dict, result: ValidationResult):
+    """Обязательные настройки config.json и типы настроек, которые иначе проявились бы только в середине генерации."""
+    for key in ('input_csv_file', 'microservice_source_field_csv'):
+        if not _is_non_empty_string(main_cfg.get(key)):
+            result.error(f"config.json: не задан '{key}'")
+    csv_encoding = main_cfg.get('csv_encoding', 'utf-8')
+    try:
+        codecs.lookup(csv_encoding)
+    except (LookupError, TypeError):
+        result.error(f"config.json: неизвестная кодировка csv_encoding '{csv_encoding}'")
+    csv_delimiter = main_cfg.get('csv_delimiter', ',')
+    if not isinstance(csv_delimiter, str) or not csv_delimiter:
+        result.error("config.json: csv_delimiter должен быть непустой строкой")
+    csv_engine = main_cfg.get('csv_engine', csv_parser.CSV_ENGINE_C)
+    if csv_engine not in csv_parser.CSV_ENGINES:
+        result.warning(f"config.json: неизвестный csv_engine '{csv_engine}' (будет использован "
+                       f"'{csv_parser.CSV_ENGINE_C}')")
+    elif csv_engine == csv_parser.CSV_ENGINE_PYARROW and importlib.util.find_spec("pyarrow") is None:
+        result.warning(f"config.json: csv_engine '{csv_engine}', но пакет pyarrow не установлен (будет использован "
+                       f"'{csv_parser.CSV_ENGINE_C}')")
+    for key, min_value in (('csv_chunk_size', 0), ('render_workers', 0)):
+        value = main_cfg.get(key, min_value)
+        if not isinstance(value, int) or isinstance(value, bool) or value < min_value:
+            result.error(f"config.json: {key} должен быть целым числом не меньше {min_value}, получено: {value!r}")
+    docx_backend = main_cfg.get('docx_backend', "python-docx")
+    if docx_backend not in DOCX_BACKENDS:
+        result.warning(f"config.json: неизвестный docx_backend '{docx_backend}' (будет использован 'python-docx')")
+    log_levels = main_cfg.get('log_levels', {})
+    if not isinstance(log_levels, dict):
+        result.error("config.json: log_levels должен быть объектом")
+    else:
+        for logger_name, level_name in log_levels.items():
+            if not isinstance(logging.getLevelName(str(level_name).upper()), int):
+                result.warning(f"config.json: неизвестный уровень логирования '{level_name}' для '{logger_name}'")
+
+
+def validate_prefix_mapping(prefix_mapping, result: ValidationResult):
+    """microservice_prefix_mapping: непустой объект 'префикс' -> 'имя МС'."""
+    if not isinstance(prefix_mapping, dict) or not prefix_mapping:
+        result.error("config.json: microservice_prefix_mapping должен быть непустым объектом 'префикс' -> 'имя МС'")
+        return
+    first_prefix_by_upper = {}
+    for prefix, full_name in prefix_mapping.items():
+        if not prefix.strip() or prefix != prefix.strip():
+            result.error(f"microservice_prefix_mapping: префикс '{prefix}' пустой или с пробелами по краям")
+            continue
+        if not _is_non_empty_string(full_name):
+            result.error(f"microservice_prefix_mapping: для префикса '{prefix}' не задано имя микросервиса")
+        # Префиксы сравниваются без учета регистра (data_processor.PrefixMatcher), действует первый из совпавших
+        first_prefix = first_prefix_by_upper.setdefault(prefix.upper(), prefix)
+        if first_prefix != prefix:
+            result.warning(f"microservice_prefix_mapping: префикс '{prefix}' совпадает с '{first_prefix}' без учета "
+                           f"регистра и не используется")
+
+
+def validate_csv_header(headers: list, fields_schema: field_schema.FieldSchema, main_cfg: dict,
+                        result: ValidationResult):
+    """Колонки из fields_mapping.json и колонки версий против строки заголовков CSV."""
+    header_set = set(headers)
+    fix_versions_base_csv_header = main_cfg.get('microservice_source_field_csv')
+    if fix_versions_base_csv_header:
+        version_columns = [header for header in headers if header.startswith(fix_versions_base_csv_header)]
+        if version_columns:
+            logger.info(f"Колонки версий ('{fix_versions_base_csv_header}*'): {len(version_columns)}")
+        else:
+            result.error(f"CSV: колонки версий ('{fix_versions_base_csv_header}*') не найдены, микросервисы задач "
+                         f"не будут определены")
+
+    key_spec = fields_schema.spec_for_internal_name(fields_schema.key)
+    key_csv_header = (key_spec or {}).get('csv_header') or fields_schema.key
+    if key_csv_header not in header_set:
+        result.error(f"CSV: нет колонки ключа задачи '{key_csv_header}'")
+    for spec in fields_schema:
+        csv_header = spec.get('csv_header')
+        if not csv_header or csv_header in (fix_versions_base_csv_header, key_csv_header) or csv_header in header_set:
+            continue
+        result.warning(f"CSV: нет колонки '{csv_header}' (поле '{spec.get('internal_name', csv_header)}'), "
+                       f"поле будет пустым")
+
+
+def validate_project(project_root: str, config_dir_name: str = "configs", csv_path: str = None) -> ValidationResult:
+    """
+    Проверяет конфигурации из config_dir_name и строку заголовков CSV из input_csv_file.
+    Найденные ошибки и предупреждения пишутся в лог.
+
+    :param csv_path: CSV для проверки заголовков вместо input_csv_file (например, образец выгрузки в CI).
+    :return: ValidationResult.
+    """
+    result = ValidationResult()
+    config_dir = os.path.join(project_root, config_dir_name)
+    loaded_configs = {}
+    for file_name in CONFIG_FILE_NAMES:
+        config_data = config_loader.load_json_config(os.path.join(config_dir, file_name))
+        if config_data is None:
+            result.error(f"{file_name}: файл отсутствует или не является корректным JSON")
+        loaded_configs[file_name] = config_data
+    main_cfg, fields_mapping, word_styles = (loaded_configs[file_name] for file_name in CONFIG_FILE_NAMES)
+
+    if word_styles is not None and not isinstance(word_styles, dict):
+        result.error("word_styles.json: ожидается объект")
+    fields_schema = None
+    if fields_mapping is not None:
+        fields_mapping_errors = field_schema.validate_fields_mapping(fields_mapping)
+        for error in fields_mapping_errors:
+            result.error(f"fields_mapping.json: {error}")
+        if not fields_mapping_errors:
+            fields_schema = field_schema.build_field_schema(fields_mapping)
+    if main_cfg is None:
+        return result
+    if not isinstance(main_cfg, dict):
+        result.error("config.json: ожидается объект")
+        return result
+    validate_main_config(main_cfg, result)
+    validate_prefix_mapping(main_cfg.get('microservice_prefix_mapping'), result)
+
+    input_csv_file = csv_path or main_cfg.get('input_csv_file')
+    if fields_schema is not None and _is_non_empty_string(input_csv_file):
+        csv_full_path = os.path.join(project_root, input_csv_file)
+        headers = csv_parser.read_csv_header(csv_full_path, encoding=main_cfg.get('csv_encoding', 'utf-8'),
+                                             delimiter=main_cfg.get('csv_delimiter', ','))
+        if headers is None:
+            result.error(f"CSV: не удалось прочитать строку заголовков {csv_full_path}")
+        else:
+            logger.info(f"CSV {csv_full_path}: колонок {len(headers)}")
+            validate_csv_header(headers, fields_schema, main_cfg, result)
+    return result
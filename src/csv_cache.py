@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import pandas as pd
+from . import logger_config  # Относительный импорт
+
+logger = logger_config.setup_logger(__name__)
+
+# Меняется при изменении формата/нормализации кэшируемого DataFrame, чтобы старые записи не использовались
+CACHE_FORMAT_VERSION = 1
+CACHE_FILE_EXTENSION = ".pkl"
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def _file_sha256(file_path: str) -> str:
+    """Считает SHA-256 содержимого файла блоками (без загрузки файла в память целиком)."""
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def compute_cache_key(file_path: str, encoding: str, delimiter: str, read_options: dict = None) -> str:
+    """
+    Вычисляет ключ кэша для CSV-файла.
+
+    :param file_path: Путь к CSV-файлу.
+    :param encoding: Кодировка, с которой файл читается.
+    :param delimiter: Разделитель полей.
+    :param read_options: Дополнительные параметры чтения, влияющие на результат (должны сериализоваться в JSON).
+    :return: Шестнадцатеричная строка ключа.
+    """
+    file_stat = os.stat(file_path)
+    key_payload = {
+        'format': CACHE_FORMAT_VERSION,
+        'pandas': pd.__version__,
+        'sha256': _file_sha256(file_path),
+        'size': file_stat.st_size,
+        'mtime_ns': file_stat.st_mtime_ns,
+        'encoding': encoding,
+        'delimiter': delimiter,
+        'read_options': read_options or {},
+    }
+    return hashlib.sha256(json.dumps(key_payload, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def _cache_file_path(cache_dir: str, cache_key: str) -> str:
+    return os.path.join(cache_dir, cache_key + CACHE_FILE_EXTENSION)
+
+
+def load_cached_dataframe(cache_dir: str, cache_key: str):
+    """
+    Загружает DataFrame из кэша.
+
+    :return: DataFrame или None, если записи нет или ее не удалось прочитать.
+    """
+    cache_path = _cache_file_path(cache_dir, cache_key)
+    if not os.path.exists(cache_path):
+        logger.debug(f"Кэш CSV: запись не найдена ({cache_key[:12]}...).")
+        return None
+    try:
+        df = pd.read_pickle(cache_path)
+        os.utime(cache_path)  # Отмечаем использование для вытеснения по давности (LRU)
+        logger.info(f"Кэш CSV: данные загружены из кэша ({cache_path}).")
+        return df
+    except Exception as e:
+        logger.warning(f"Кэш CSV: не удалось прочитать запись {cache_path}: {e}. Запись будет пересоздана.")
+        return None
+
+
+def store_dataframe(cache_dir: str, cache_key: str, df: pd.DataFrame, max_size_mb: float = None) -> bool:
+    """
+    Сохраняет DataFrame в кэш (атомарно через временный файл) и при необходимости вытесняет старые записи.
+
+    :param max_size_mb: Ограничение общего размера кэша в МБ. None или 0 - без ограничения.
+    :return: True, если запись сохранена.
+    """
+    cache_path = _cache_file_path(cache_dir, cache_key)
+    tmp_path = cache_path + ".tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        df.to_pickle(tmp_path)
+        os.replace(tmp_path, cache_path)
+        logger.info(f"Кэш CSV: данные сохранены ({cache_path}, {os.path.getsize(cache_path) / 1024 / 1024:.1f} МБ).")
+    except Exception as e:
+        logger.warning(f"Кэш CSV: не удалось сохранить запись {cache_path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    if max_size_mb:
+        evict_cache(cache_dir, max_size_mb, keep_key=cache_key)
+    return True
+
+
+def evict_cache(cache_dir: str, max_size_mb: float, keep_key: str = None,
+                file_extension: str = CACHE_FILE_EXTENSION, cache_name: str = "Кэш CSV") -> int:
+    """
+    Удаляет наиболее давно использованные записи, пока общий размер кэша превышает max_size_mb.
+
+    :param keep_key: Ключ записи, которую нельзя удалять (только что сохраненная).
+    :param file_extension: Расширение файлов записей (кэш фрагментов отчета использует ту же схему вытеснения).
+    :param cache_name: Название кэша для сообщений лога.
+    :return: Количество удаленных записей.
+    """
+    try:
+        entries = []
+        for file_name in os.listdir(cache_dir):
+            if file_name.endswith(file_extension):
+                file_path = os.path.join(cache_dir, file_name)
+                file_stat = os.stat(file_path)
+                entries.append((file_stat.st_mtime, file_stat.st_size, file_name, file_path))
+    except OSError as e:
+        logger.warning(f"{cache_name}: не удалось прочитать директорию {cache_dir}: {e}")
+        return 0
+
+    max_size_bytes = max_size_mb * 1024 * 1024
+    total_size = sum(entry[1] for entry in entries)
+    removed_count = 0
+    for _, entry_size, file_name, file_path in sorted(entries):
+        if total_size <= max_size_bytes: break
+        if keep_key and file_name == keep_key + file_extension: continue
+        try:
+            os.remove(file_path)
+            total_size -= entry_size
+            removed_count += 1
+            logger.debug(f"{cache_name}: удалена старая запись {file_path}")
+        except OSError as e:
+            logger.warning(f"{cache_name}: не удалось удалить {file_path}: {e}")
+    if removed_count:
+        logger.info(f"{cache_name}: вытеснено записей: {removed_count}. Размер кэша: {total_size / 1024 / 1024:.1f} МБ.")
+    return removed_count
@@ -1,10 +1,97 @@
-import pandas as pd
+import csv
+import importlib.util
 import os
 from . import logger_config # Относительный импорт
 
 logger = logger_config.setup_logger(__name__)
 
-def load_csv_to_dataframe(file_path: str, encoding: str = 'utf-8', delimiter: str = ','):
+# pandas (и csv_cache, который его использует) импортируется при первом чтении данных: проверка конфигураций по
+# строке заголовков (read_csv_header, режим --validate) обходится без него
+UTF8_BOM = '\ufeff'
+
+# Движки чтения CSV (настройка csv_engine). Результат у всех одинаковый: пустые ячейки - "", одинаковые заголовки
+# с суффиксами '.1', '.2', типы колонок - как у pandas.read_csv
+CSV_ENGINE_C = "c"  # Парсер pandas на C
+CSV_ENGINE_PYARROW = "pyarrow"  # pyarrow.csv, многопоточный разбор (необязательная зависимость)
+CSV_ENGINES = (CSV_ENGINE_C, CSV_ENGINE_PYARROW)
+BOOLEAN_CSV_VALUES = {"True": True, "TRUE": True, "true": True, "False": False, "FALSE": False, "false": False}
+
+
+class ColumnProjection:
+    """
+    Набор колонок CSV, которые нужно прочитать (передается в pandas как usecols).
+    Колонка читается, если ее имя совпадает с одним из заголовков или начинается с одного из префиксов
+    (префиксы нужны для колонок 'Fix Version/s.1', 'Fix Version/s.2', ... после переименования дубликатов).
+    """
+
+    def __init__(self, headers, prefixes=()):
+        self.headers = frozenset(h for h in headers if h)
+        self.prefixes = tuple(p for p in prefixes if p)
+
+    def __call__(self, column_name) -> bool:
+        return column_name in self.headers or (bool(self.prefixes) and str(column_name).startswith(self.prefixes))
+
+    def cache_token(self) -> dict:
+        """Описание проекции для ключа кэша (разные проекции дают разные DataFrame)."""
+        return {'headers': sorted(self.headers), 'prefixes': sorted(self.prefixes)}
+
+
+def mangle_duplicate_headers(headers: list) -> list:
+    """
+    Имена колонок так же, как их дает pandas.read_csv (engine 'c'): пустое имя - 'Unnamed: N', повторы получают
+    суффиксы '.1', '.2', ... (суффикс, уже занятый другой колонкой заголовка, пропускается).
+    """
+    names = [header if header else f"Unnamed: {pos}" for pos, header in enumerate(headers)]
+    counts = {}
+    for pos, name in enumerate(names):
+        base_name = name
+        cur_count = counts.get(name, 0)
+        while cur_count > 0:
+            counts[base_name] = cur_count + 1
+            name = f"{base_name}.{cur_count}"
+            cur_count = cur_count + 1 if name in names else counts.get(name, 0)
+        names[pos] = name
+        counts[name] = cur_count + 1
+    return names
+
+
+def read_csv_header(file_path: str, encoding: str = 'utf-8', delimiter: str = ','):
+    """
+    Читает только строку заголовков CSV (модулем csv, без pandas и без разбора данных).
+
+    :return: Список имен колонок в том виде, в каком их вернет load_csv_to_dataframe (BOM убран, одинаковые
+             заголовки с суффиксами '.1', '.2'), или None в случае ошибки.
+    """
+    try:
+        with open(file_path, 'r', encoding=encoding, newline='') as f:
+            headers = next(csv.reader(f, delimiter=delimiter), None)
+    except FileNotFoundError:
+        logger.error(f"CSV-файл не найден: {file_path}")
+        return None
+    except (OSError, UnicodeDecodeError, LookupError, TypeError, csv.Error) as e:
+        logger.error(f"Не удалось прочитать строку заголовков CSV-файла {file_path}: {e}")
+        return None
+    if not headers:
+        logger.error(f"CSV-файл пуст: {file_path}")
+        return None
+    if headers[0].startswith(UTF8_BOM): headers[0] = headers[0][len(UTF8_BOM):]
+    return mangle_duplicate_headers(headers)
+
+
+def resolve_csv_engine(engine: str) -> str:
+    """Движок из настройки csv_engine: неизвестное значение или 'pyarrow' без установленного пакета - 'c'."""
+    if engine not in CSV_ENGINES:
+        logger.warning(f"Неизвестный csv_engine '{engine}'. Используется '{CSV_ENGINE_C}'.")
+        return CSV_ENGINE_C
+    if engine == CSV_ENGINE_PYARROW and importlib.util.find_spec("pyarrow") is None:
+        logger.warning(f"csv_engine '{CSV_ENGINE_PYARROW}': пакет pyarrow не установлен. Используется '{CSV_ENGINE_C}'.")
+        return CSV_ENGINE_C
+    return engine
+
+
+def load_csv_to_dataframe(file_path: str, encoding: str = 'utf-8', delimiter: str = ',',
+                          cache_dir: str = None, cache_max_size_mb: float = None,
+                          usecols: ColumnProjection = None, engine: str = CSV_ENGINE_C):
     """
     Загружает данные из CSV-файла в pandas DataFrame.
     Пустые значения читаются как пустые строки (а не NaN).
@@ -13,16 +100,117 @@ def load_csv_to_dataframe(file_path: str, encoding: str = 'utf-8', delimiter: st
                       (main.py должен передавать абсолютный путь).
     :param encoding: Кодировка CSV-файла.
     :param delimiter: Разделитель полей в CSV-файле.
+    :param cache_dir: Директория кэша разобранных CSV. Если указана, результат берется из кэша, когда совпадают
+                      содержимое, размер, время изменения файла и параметры чтения, иначе кэш пересоздается.
+    :param cache_max_size_mb: Ограничение общего размера кэша в МБ (старые записи вытесняются).
+    :param usecols: Проекция колонок (ColumnProjection). Если указана, остальные колонки не читаются.
+    :param engine: Движок чтения (CSV_ENGINES, настройка csv_engine).
     :return: pandas DataFrame с данными или None в случае ошибки.
     """
-    logger.debug(f"Попытка загрузки CSV из: {file_path} (кодировка: {encoding}, разделитель: '{delimiter}')")
+    engine = resolve_csv_engine(engine)
+    logger.debug(f"Попытка загрузки CSV из: {file_path} (кодировка: {encoding}, разделитель: '{delimiter}', "
+                 f"движок: {engine})")
     if not os.path.exists(file_path):
         logger.error(f"CSV-файл не найден: {file_path}")
         return None
+
+    cache_key = None
+    if cache_dir:
+        from . import csv_cache
+        try:
+            read_options = {}
+            if usecols is not None: read_options['usecols'] = usecols.cache_token()
+            # Ключи записей движка 'c' не меняются (кэш, созданный до появления csv_engine, остается действительным)
+            if engine != CSV_ENGINE_C: read_options['engine'] = engine
+            cache_key = csv_cache.compute_cache_key(file_path, encoding, delimiter, read_options=read_options)
+        except OSError as e:
+            logger.warning(f"Кэш CSV: не удалось вычислить ключ для {file_path}: {e}. Кэш не используется.")
+        if cache_key:
+            df = csv_cache.load_cached_dataframe(cache_dir, cache_key)
+            if df is not None:
+                logger.info(f"CSV-файл загружен из кэша: {file_path}. Обнаружено строк: {len(df)}, колонок: {len(df.columns)}")
+                return df
+
+    df = _read_csv_file(file_path, encoding, delimiter, usecols, engine)
+    if df is not None and cache_key:
+        csv_cache.store_dataframe(cache_dir, cache_key, df, max_size_mb=cache_max_size_mb)
+    return df
+
+
+def _read_with_pandas(file_path: str, encoding: str, delimiter: str, usecols: ColumnProjection = None):
+    import pandas as pd
+    # keep_default_na=False и na_filter=False нужны, чтобы пустые строки читались как "", а не NaN
+    return pd.read_csv(file_path, encoding=encoding, delimiter=delimiter, keep_default_na=False, na_filter=False,
+                       usecols=usecols)
+
+
+def _read_with_pyarrow(file_path: str, encoding: str, delimiter: str, usecols: ColumnProjection = None):
+    """
+    Разбор через pyarrow.csv (многопоточный). Имена колонок берутся из read_csv_header (pyarrow не переименовывает
+    одинаковые заголовки), все колонки читаются строками, типы определяются как у pandas (_infer_column_types).
+    """
+    import pandas as pd
+    import pyarrow
+    from pyarrow import csv as pyarrow_csv
+    column_names = read_csv_header(file_path, encoding=encoding, delimiter=delimiter)
+    if column_names is None:
+        raise pd.errors.EmptyDataError(f"Не удалось прочитать строку заголовков {file_path}")
+    selected_columns = [name for name in column_names if usecols is None or usecols(name)]
+    if not selected_columns: return _empty_dataframe()  # Пустой include_columns в pyarrow означает "все колонки"
+    try:
+        table = pyarrow_csv.read_csv(
+            file_path,
+            read_options=pyarrow_csv.ReadOptions(column_names=column_names, skip_rows=1, encoding=encoding),
+            parse_options=pyarrow_csv.ParseOptions(delimiter=delimiter, newlines_in_values=True),
+            convert_options=pyarrow_csv.ConvertOptions(
+                include_columns=selected_columns, column_types={name: pyarrow.string() for name in selected_columns},
+                null_values=[], strings_can_be_null=False, quoted_strings_can_be_null=False))
+    except pyarrow.ArrowInvalid as e:
+        # В том числе строки с неполным числом полей: pyarrow их не принимает, pandas дополняет пустыми значениями
+        logger.warning(f"pyarrow не разобрал CSV-файл {file_path} ({e}). Используется '{CSV_ENGINE_C}'.")
+        return _read_with_pandas(file_path, encoding, delimiter, usecols)
+    return _infer_column_types(table.to_pandas())
+
+
+def _empty_dataframe():
+    """DataFrame, который возвращает pandas.read_csv, когда проекция не выбрала ни одной колонки."""
+    import pandas as pd
+    return pd.DataFrame(columns=pd.Index([], dtype=object))
+
+
+def _infer_column_types(df):
+    """
+    Типы колонок, прочитанных строками, как у pandas.read_csv(na_filter=False): колонка без пустых ячеек, все
+    значения которой - числа, становится числовой, 'True'/'False' - логической, остальные остаются строками.
+    """
+    import pandas as pd
+    if df.empty: return df.astype(object)  # Только заголовок: pandas.read_csv дает колонки типа object
+    for column_name in df.columns:
+        values = df[column_name]
+        if not (values == "").any():
+            try:
+                df[column_name] = pd.to_numeric(values)
+                continue
+            except (ValueError, TypeError):
+                pass
+            if values.isin(BOOLEAN_CSV_VALUES.keys()).all():
+                df[column_name] = values.map(BOOLEAN_CSV_VALUES).astype(bool)
+                continue
+        df[column_name] = values.astype(str)
+    return df
+
+
+_CSV_READERS = {CSV_ENGINE_C: _read_with_pandas, CSV_ENGINE_PYARROW: _read_with_pyarrow}
+
+
+def _read_csv_file(file_path: str, encoding: str, delimiter: str, usecols: ColumnProjection = None,
+                   engine: str = CSV_ENGINE_C):
+    """Разбирает CSV-файл движком engine. Возвращает DataFrame или None в случае ошибки."""
+    import pandas as pd
     try:
-        # keep_default_na=False и na_filter=False нужны, чтобы пустые строки читались как "", а не NaN
-        df = pd.read_csv(file_path, encoding=encoding, delimiter=delimiter, keep_default_na=False, na_filter=False)
-        logger.info(f"CSV-файл успешно загружен: {file_path}. Обнаружено строк: {len(df)}, колонок: {len(df.columns)}")
+        df = _CSV_READERS[engine](file_path, encoding, delimiter, usecols)
+        logger.info(f"CSV-файл успешно загружен ({engine}): {file_path}. Обнаружено строк: {len(df)}, "
+                    f"колонок: {len(df.columns)}")
         logger.debug(f"Имена колонок в DataFrame: {list(df.columns)}")
         return df
     except FileNotFoundError: # Хотя эта проверка уже есть выше, pandas может выдать свою специфическую ошибку
@@ -36,4 +224,56 @@ def load_csv_to_dataframe(file_path: str, encoding: str = 'utf-8', delimiter: st
         return None
     except Exception as e:
         logger.error(f"Произошла непредвиденная ошибка при чтении CSV-файла {file_path}: {e}", exc_info=True)
-        return None
\ No newline at end of file
+        return None
+
+
+def _iter_csv_chunks(chunk_reader, file_path: str):
+    """Оборачивает итератор блоков pandas: логирует ошибки разбора, возникшие в середине файла."""
+    import pandas as pd
+    try:
+        with chunk_reader:
+            for chunk_number, df_chunk in enumerate(chunk_reader, start=1):
+                logger.debug("Прочитан блок CSV №%d: строк %d", chunk_number, len(df_chunk))
+                yield df_chunk
+    except pd.errors.ParserError as e:
+        logger.error(f"Не удалось разобрать (ошибка парсинга) блок CSV-файла {file_path}: {e}")
+        raise
+    except Exception as e:
+        logger.error(f"Произошла непредвиденная ошибка при потоковом чтении CSV-файла {file_path}: {e}", exc_info=True)
+        raise
+
+
+def load_csv_in_chunks(file_path: str, encoding: str = 'utf-8', delimiter: str = ',', chunk_size: int = 50000,
+                       usecols: ColumnProjection = None):
+    """
+    Открывает CSV-файл для потокового чтения блоками по chunk_size строк.
+    Семантика та же, что у load_csv_to_dataframe: пустые значения - пустые строки, одинаковые заголовки
+    получают суффиксы '.1', '.2' и т.д. Индексы строк сквозные по всему файлу.
+
+    :param file_path: Абсолютный или относительный путь к CSV-файлу.
+    :param encoding: Кодировка CSV-файла.
+    :param delimiter: Разделитель полей в CSV-файле.
+    :param chunk_size: Количество строк в одном блоке.
+    :param usecols: Проекция колонок (ColumnProjection). Если указана, остальные колонки не читаются.
+    :return: Итератор по DataFrame-блокам или None в случае ошибки открытия файла.
+    """
+    logger.debug(f"Попытка потокового чтения CSV из: {file_path} (кодировка: {encoding}, разделитель: '{delimiter}', "
+                 f"блок: {chunk_size} строк)")
+    if not os.path.exists(file_path):
+        logger.error(f"CSV-файл не найден: {file_path}")
+        return None
+    import pandas as pd
+    try:
+        chunk_reader = pd.read_csv(file_path, encoding=encoding, delimiter=delimiter, keep_default_na=False,
+                                   na_filter=False, chunksize=chunk_size, usecols=usecols)
+        logger.info(f"CSV-файл открыт для потокового чтения: {file_path}. Размер блока: {chunk_size} строк.")
+        return _iter_csv_chunks(chunk_reader, file_path)
+    except pd.errors.EmptyDataError:
+        logger.error(f"CSV-файл пуст: {file_path}")
+        return None
+    except pd.errors.ParserError as e:
+        logger.error(f"Не удалось разобрать (ошибка парсинга) CSV-файл {file_path}: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"Произошла непредвиденная ошибка при открытии CSV-файла {file_path}: {e}", exc_info=True)
+        return None
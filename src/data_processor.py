@@ -1,6 +1,11 @@
+import re
+import numpy as np
 import pandas as pd
 from collections import OrderedDict
+from collections.abc import Mapping
 from packaging.version import parse as parse_version
+from . import csv_parser
+from . import field_schema
 from . import logger_config  # Относительный импорт
 
 logger = logger_config.setup_logger(__name__)
@@ -8,96 +13,304 @@ logger = logger_config.setup_logger(__name__)
 GLOBAL_VERSION_IDENTIFIER = "(GLOBAL)"
 
 
-class _FieldNames:
-    """Внутренний класс для хранения и доступа к стандартизированным именам колонок."""
-
-    def __init__(self, fields_mapping_config: list):
-        # Вспомогательная функция для поиска internal_name
-        def get_name(standard_csv_header: str, default_internal: str, alt_internals: list = None):
-            if alt_internals is None: alt_internals = []
-            for field_spec in fields_mapping_config:
-                # Сначала проверяем internal_name, если он явно задан и совпадает
-                spec_internal = field_spec.get('internal_name')
-                if spec_internal and (spec_internal == default_internal or spec_internal in alt_internals):
-                    # Если нашли по internal_name, проверяем, есть ли для него csv_header,
-                    # чтобы убедиться, что это поле вообще может прийти из CSV.
-                    # Но для определения имени колонки это не так важно, как сам internal_name.
-                    return spec_internal
-
-                # Затем проверяем csv_header
-                spec_csv_header = field_spec.get('csv_header', '').lower()
-                if spec_csv_header == standard_csv_header.lower():
-                    return field_spec.get('internal_name',
-                                          field_spec.get('csv_header'))  # Возвращаем internal_name или csv_header
-
-            logger.debug(
-                f"Для стандартного заголовка '{standard_csv_header}' не найдено явного internal_name в маппинге. "
-                f"Используется значение по умолчанию: '{default_internal}'.")
-            return default_internal
-
-        self.key = get_name('issue key', 'issue_key')
-        self.summary = get_name('summary', 'summary_text', ['summary'])
-        self.customer_desc = get_name('custom field (description for the customer)', 'description_for_customer')
-        self.links = get_name('links', 'links_text')
-        self.issue_type = get_name('issue type', 'type', ['issue_type'])
-        self.priority = get_name('priority', 'priority_val', ['priority'])
-        self.setup_instructions = get_name('custom field (инструкция по установке)', 'setup_instructions')
-        self.fix_versions_display = get_name('fix version/s',
-                                             'fix_versions_display_all')  # Для отображения сырых версий
-
-
-def extract_single_microservice_and_version(version_code_str: str, prefix_mapping: dict):
-    if not isinstance(version_code_str, str) or not version_code_str.strip():
-        return None, None
-    vc_str = version_code_str.strip()
-    logger.debug(f"[extract_ms_ver] Вход: '{vc_str}'")
-    for prefix, full_name in prefix_mapping.items():
-        if vc_str.upper().startswith(prefix.upper()):
+_CACHE_MISS = object()
+
+
+class PrefixMatcher:
+    """
+    Скомпилированное сопоставление префиксов из microservice_prefix_mapping.
+    Префиксы объединены в одно якорное регулярное выражение (самый длинный префикс побеждает,
+    независимо от порядка в config.json), результаты кэшируются по сырой строке.
+    """
+
+    def __init__(self, prefix_mapping: dict, max_cache_size: int = 100_000):
+        self.prefix_mapping = dict(prefix_mapping)
+        self.max_cache_size = max_cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = {}
+        # Верхний регистр префикса -> (исходный префикс, имя МС). При совпадении без учета регистра
+        # остается первый префикс из конфигурации.
+        self._prefix_specs = {}
+        for prefix, full_name in self.prefix_mapping.items():
+            self._prefix_specs.setdefault(prefix.upper(), (prefix, full_name))
+        ordered_prefixes = sorted(self._prefix_specs, key=len, reverse=True)
+        self.pattern = re.compile("^(" + "|".join(re.escape(p) for p in ordered_prefixes) + ")") \
+            if ordered_prefixes else None
+
+    def match(self, version_code_str: str):
+        """Возвращает (имя МС, версия) для строки вида 'IN 2.3.1' или (None, None)."""
+        if not isinstance(version_code_str, str):
+            return None, None
+        cached = self._cache.get(version_code_str, _CACHE_MISS)
+        if cached is not _CACHE_MISS:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        result = self._match_uncached(version_code_str)
+        if len(self._cache) < self.max_cache_size:
+            self._cache[version_code_str] = result
+        return result
+
+    def _match_uncached(self, version_code_str: str):
+        if not version_code_str.strip():
+            return None, None
+        vc_str = version_code_str.strip()
+        # Горячий путь (каждое новое значение ячейки версий): аргументы сообщений форматируются, только если
+        # DEBUG для модуля включен, и уже в потоке записи логов
+        logger.debug("[extract_ms_ver] Вход: '%s'", vc_str)
+        prefix_match = self.pattern.match(vc_str.upper()) if self.pattern else None
+        if prefix_match:
+            prefix, full_name = self._prefix_specs[prefix_match.group(1)]
             if len(vc_str) > len(prefix):
                 version_part = vc_str[len(prefix):].strip()
-                logger.debug(
-                    f"  [extract_ms_ver] Префикс '{prefix}' для '{vc_str}' -> Сервис: '{full_name}', Версия: '{version_part}'")
+                logger.debug("  [extract_ms_ver] Префикс '%s' для '%s' -> Сервис: '%s', Версия: '%s'",
+                             prefix, vc_str, full_name, version_part)
                 return full_name, version_part
-            else:
-                logger.debug(f"  [extract_ms_ver] Префикс '{prefix}' для '{vc_str}', но версия отсутствует.")
-                return full_name, None
-    if vc_str and GLOBAL_VERSION_IDENTIFIER not in vc_str.upper():
-        logger.debug(f"  [extract_ms_ver] Префикс не найден для '{vc_str}'")
-    return None, None
+            logger.debug("  [extract_ms_ver] Префикс '%s' для '%s', но версия отсутствует.", prefix, vc_str)
+            return full_name, None
+        if GLOBAL_VERSION_IDENTIFIER not in vc_str.upper():
+            logger.debug("  [extract_ms_ver] Префикс не найден для '%s'", vc_str)
+        return None, None
+
+    def cache_info(self) -> dict:
+        """Статистика кэша: попадания, промахи и число закэшированных строк."""
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._cache)}
+
+
+_prefix_matchers = {}
 
 
-def detect_component_versions_from_data(df_raw: pd.DataFrame, microservice_config: dict) -> list:
-    if df_raw is None or df_raw.empty: return []
+def get_prefix_matcher(prefix_mapping: dict) -> PrefixMatcher:
+    """Возвращает PrefixMatcher для данного маппинга (компилируется один раз на процесс)."""
+    mapping_key = tuple(prefix_mapping.items())
+    matcher = _prefix_matchers.get(mapping_key)
+    if matcher is None:
+        matcher = PrefixMatcher(prefix_mapping)
+        _prefix_matchers[mapping_key] = matcher
+    return matcher
+
+
+def extract_single_microservice_and_version(version_code_str: str, prefix_mapping: dict):
+    return get_prefix_matcher(prefix_mapping).match(version_code_str)
+
+
+def _get_version_columns(df_raw: pd.DataFrame, fix_versions_base_csv_header: str) -> list:
+    """Возвращает отсортированный список колонок версий ('Fix Version/s', 'Fix Version/s.1', ...)."""
+    return sorted([col for col in df_raw.columns if col.startswith(fix_versions_base_csv_header)])
+
+
+def _stack_version_cells(df_raw: pd.DataFrame, version_columns: list) -> pd.DataFrame:
+    """
+    Складывает все колонки версий в одну длинную таблицу (построчно: строка 0 - все колонки, строка 1 - ...).
+    Порядок совпадает с обходом iterrows() по отсортированным колонкам версий.
+
+    :return: DataFrame с колонками 'row' (позиция строки в df_raw) и 'value' (строковое значение ячейки).
+    """
+    cells_matrix = df_raw[version_columns].astype(str).to_numpy(dtype=object)
+    return pd.DataFrame({
+        'row': np.repeat(np.arange(len(df_raw)), len(version_columns)),
+        'value': pd.Series(cells_matrix.ravel(), dtype=object),
+    })
+
+
+def _match_microservice_prefixes(values: pd.Series, prefix_mapping: dict) -> pd.DataFrame:
+    """
+    Векторный аналог extract_single_microservice_and_version для серии строк:
+    каждое уникальное значение сопоставляется один раз через PrefixMatcher, результат раскладывается по ячейкам.
+
+    :return: DataFrame с колонками 'service' и 'version' (None, если префикс/версия не найдены),
+             с тем же индексом, что и у values.
+    """
+    matcher = get_prefix_matcher(prefix_mapping)
+    codes, unique_values = pd.factorize(values.astype(str))
+    unique_results = [matcher.match(value) for value in unique_values]
+    unique_services = np.array([service for service, _ in unique_results] + [None], dtype=object)
+    unique_versions = np.array([version for _, version in unique_results] + [None], dtype=object)
+    # Код -1 (пропуск) указывает на последний элемент - None
+    return pd.DataFrame({'service': unique_services[codes], 'version': unique_versions[codes]}, index=values.index)
+
+
+def _extract_global_version_cells(values: pd.Series) -> pd.Series:
+    """
+    Векторно находит значения вида 'X.Y.Z (GLOBAL)'.
+
+    :return: Серия глобальных версий (в верхнем регистре) с индексом ячеек values; ячейки без глобальной версии
+             в нее не входят.
+    """
+    upper = values.astype(str).str.strip().str.upper()
+    global_cells = upper[upper.str.contains(GLOBAL_VERSION_IDENTIFIER, regex=False)]
+    if global_cells.empty: return pd.Series([], dtype=object)
+    version_parts = global_cells.str.partition(GLOBAL_VERSION_IDENTIFIER)[0].str.strip()
+    version_parts = version_parts[version_parts != ""]
+    cleaned_parts = version_parts.str.replace('(', '', regex=False).str.replace(')', '', regex=False).str.strip()
+    is_version = []
+    for version_part, cleaned_version_part in zip(version_parts, cleaned_parts):
+        is_version.append(bool(cleaned_version_part) and any(char.isdigit() for char in cleaned_version_part))
+        if not is_version[-1]:
+            logger.debug("(detect_global_ver): Найдена '%s', но извлеченная часть '%s' не версия.",
+                         version_part, cleaned_version_part)
+    return cleaned_parts[np.array(is_version, dtype=bool)].astype(object)
+
+
+def _normalize_global_versions(global_versions) -> set:
+    """Глобальные версии в том виде, в котором их хранит VersionIndex (без пробелов по краям, в верхнем регистре)."""
+    return {str(global_version).strip().upper() for global_version in global_versions}
+
+
+class VersionIndex:
+    """
+    Индекс версий, построенный за один проход по колонкам 'Fix Version/s*'.
+    Общий для авто-определения глобальной версии, версий компонентов и извлечения МС для задач.
+    Построчные данные (row_services, row_global_versions, version_cells) позволяют построить индекс для части
+    строк - варианта отчета по глобальным версиям (subset).
+    """
+
+    def __init__(self, version_columns: list, row_services: list, component_versions: dict,
+                 global_version_candidates: set, row_global_versions: dict = None, version_cells=None):
+        self.version_columns = version_columns  # Отсортированные колонки версий в исходном DataFrame
+        self.row_services = row_services  # Для каждой строки: отсортированный список имен МС
+        self.component_versions = component_versions  # Имя МС -> максимальная версия (packaging.Version)
+        self.global_version_candidates = global_version_candidates  # Найденные версии с маркером (GLOBAL)
+        # Позиция строки -> глобальные версии строки (только строки с маркером (GLOBAL))
+        self.row_global_versions = row_global_versions if row_global_versions is not None else {}
+        # Ячейки с распознанными МС и версией: DataFrame 'row', 'service', 'version' (None - построчных данных нет)
+        self.version_cells = version_cells
+
+    def component_versions_list(self) -> list:
+        """Версии компонентов в формате таблицы отчета: [{'microservice': ..., 'version': ...}], по имени МС."""
+        detected_versions_list = [{'microservice': name, 'version': str(ver_obj)} for name, ver_obj in
+                                  self.component_versions.items()]
+        detected_versions_list.sort(key=lambda x: x['microservice'])
+        return detected_versions_list
+
+    def merge(self, other: 'VersionIndex') -> 'VersionIndex':
+        """
+        Добавляет данные индекса следующего блока CSV (версии компонентов и кандидаты глоб. версии).
+        Построчные списки МС не накапливаются - они нужны только для обработки своего блока.
+        """
+        if not self.version_columns:
+            self.version_columns = other.version_columns
+        for service_name, version_obj in other.component_versions.items():
+            # Строгое сравнение: при равных версиях остается найденная раньше, как при проходе по всему файлу
+            if service_name not in self.component_versions or version_obj > self.component_versions[service_name]:
+                self.component_versions[service_name] = version_obj
+        self.global_version_candidates |= other.global_version_candidates
+        return self
+
+    def has_row_data(self) -> bool:
+        """Есть ли построчные данные (их нет у индекса, собранного по блокам в потоковом режиме)."""
+        return self.version_cells is not None
+
+    def rows_with_global_versions(self, global_versions) -> list:
+        """Позиции строк, у которых в колонках версий есть одна из global_versions с маркером (GLOBAL)."""
+        wanted_versions = _normalize_global_versions(global_versions)
+        return sorted(row_pos for row_pos, row_versions in self.row_global_versions.items()
+                      if wanted_versions.intersection(row_versions))
+
+    def subset(self, row_positions: list, global_versions=None) -> 'VersionIndex':
+        """
+        Индекс для части строк (позиции row_positions, новые позиции - по порядку в списке): версии компонентов и
+        кандидаты глобальной версии только из этих строк, кандидаты дополнительно ограничены global_versions.
+        """
+        new_positions = {row_pos: new_pos for new_pos, row_pos in enumerate(row_positions)}
+        selected_cells = self.version_cells[self.version_cells['row'].isin(new_positions)]
+        selected_cells = selected_cells.assign(row=selected_cells['row'].map(new_positions))
+        row_global_versions = {new_positions[row_pos]: row_versions for row_pos, row_versions in
+                               self.row_global_versions.items() if row_pos in new_positions}
+        global_version_candidates = set().union(*row_global_versions.values())
+        if global_versions is not None:
+            global_version_candidates &= _normalize_global_versions(global_versions)
+        return VersionIndex(self.version_columns, [self.row_services[row_pos] for row_pos in row_positions],
+                            _collect_component_versions(selected_cells[['service', 'version']]),
+                            global_version_candidates, row_global_versions, selected_cells)
+
+
+def _collect_component_versions(matched: pd.DataFrame) -> dict:
+    """Выбирает максимальную версию для каждого МС из результатов _match_microservice_prefixes."""
+    # Повторяющиеся пары (сервис, версия) не меняют результат - разбираем каждую один раз, в порядке появления.
+    service_versions = matched[matched['service'].notna() & matched['version'].notna()].drop_duplicates()
+    component_versions = {}
+    for service_name, version_str in zip(service_versions['service'], service_versions['version']):
+        try:
+            cleaned_version_str = version_str.split(" ")[0].split("(")[0]
+            current_version_obj = parse_version(cleaned_version_str)
+            if service_name not in component_versions or current_version_obj > component_versions[service_name]:
+                component_versions[service_name] = current_version_obj
+        except Exception as e:
+            logger.warning(
+                f"(version_index): Не удалось распарсить версию '{version_str}' (очищенная: '{cleaned_version_str}') для '{service_name}'. Ошибка: {e}")
+    return component_versions
+
+
+def _collect_row_global_versions(rows: pd.Series, global_version_cells: pd.Series) -> dict:
+    """Глобальные версии строк: позиция строки -> кортеж версий в порядке колонок (только строки с маркером)."""
+    row_global_versions = {}
+    for row_pos, global_version in zip(rows.to_numpy()[global_version_cells.index], global_version_cells):
+        row_versions = row_global_versions.setdefault(int(row_pos), ())
+        if global_version not in row_versions:
+            row_global_versions[int(row_pos)] = row_versions + (global_version,)
+    return row_global_versions
+
+
+def _collect_row_services(rows: pd.Series, services: pd.Series, rows_count: int) -> list:
+    """Собирает для каждой строки отсортированный список уникальных имен МС."""
+    row_service_pairs = pd.DataFrame({'row': rows, 'service': services})
+    row_service_pairs = row_service_pairs[row_service_pairs['service'].notna()].drop_duplicates()
+    row_service_pairs = row_service_pairs.sort_values(['row', 'service'], kind='stable')
+    row_services = [[] for _ in range(rows_count)]
+    for row_pos, service_name in zip(row_service_pairs['row'], row_service_pairs['service']):
+        row_services[row_pos].append(service_name)
+    return row_services
+
+
+def build_version_index(df_raw: pd.DataFrame, microservice_config: dict) -> VersionIndex | None:
+    """
+    Строит VersionIndex за один проход по колонкам версий.
+
+    :param df_raw: Исходный DataFrame из CSV (не изменяется).
+    :param microservice_config: Словарь с 'microservice_source_field_csv' и 'microservice_prefix_mapping'.
+    :return: VersionIndex или None, если DataFrame пуст или не указано поле версий.
+    """
+    if df_raw is None or df_raw.empty: return None
     fix_versions_base_csv_header = microservice_config.get('microservice_source_field_csv')
     prefix_mapping = microservice_config.get('microservice_prefix_mapping', {})
     if not fix_versions_base_csv_header:
-        logger.warning("(detect_comp_ver): 'microservice_source_field_csv' не указан.")
-        return []
-    version_columns_in_df = sorted([col for col in df_raw.columns if col.startswith(fix_versions_base_csv_header)])
+        logger.warning("(version_index): 'microservice_source_field_csv' не указан.")
+        return None
+    version_columns_in_df = _get_version_columns(df_raw, fix_versions_base_csv_header)
     if not version_columns_in_df:
-        logger.warning(f"(detect_comp_ver): Колонки версий ('{fix_versions_base_csv_header}*') не найдены.")
-        return []
+        logger.warning(f"(version_index): Колонки версий ('{fix_versions_base_csv_header}*') не найдены.")
+        return VersionIndex([], [[] for _ in range(len(df_raw))], {}, set(), {},
+                            pd.DataFrame(columns=['row', 'service', 'version']))
+
+    cells = _stack_version_cells(df_raw, version_columns_in_df)
+    matched = _match_microservice_prefixes(cells['value'], prefix_mapping)
+    global_version_cells = _extract_global_version_cells(cells['value'])
+    version_index = VersionIndex(
+        version_columns=version_columns_in_df,
+        row_services=_collect_row_services(cells['row'], matched['service'], len(df_raw)),
+        component_versions=_collect_component_versions(matched),
+        global_version_candidates=set(global_version_cells),
+        row_global_versions=_collect_row_global_versions(cells['row'], global_version_cells),
+        version_cells=pd.DataFrame({'row': cells['row'], 'service': matched['service'],
+                                    'version': matched['version']})[matched['service'].notna() &
+                                                                    matched['version'].notna()]
+    )
+    logger.info(f"Индекс версий построен: строк {len(df_raw)}, колонок версий {len(version_columns_in_df)}, "
+                f"МС с версиями {len(version_index.component_versions)}, "
+                f"кандидатов глоб. версии {len(version_index.global_version_candidates)}.")
+    logger.debug(f"(version_index): Кэш префиксов: {get_prefix_matcher(prefix_mapping).cache_info()}")
+    return version_index
 
-    component_versions = {}
-    for index, row in df_raw.iterrows():
-        for v_col_name in version_columns_in_df:
-            version_code_str = str(row.get(v_col_name, ""))
-            if version_code_str:
-                service_name, version_str = extract_single_microservice_and_version(version_code_str, prefix_mapping)
-                if service_name and version_str:
-                    try:
-                        cleaned_version_str = version_str.split(" ")[0].split("(")[0]
-                        current_version_obj = parse_version(cleaned_version_str)
-                        if service_name not in component_versions or current_version_obj > component_versions[
-                            service_name]:
-                            component_versions[service_name] = current_version_obj
-                    except Exception as e:
-                        logger.warning(
-                            f"(detect_comp_ver): Не удалось распарсить версию '{version_str}' (очищенная: '{cleaned_version_str}') для '{service_name}'. Ошибка: {e}")
-
-    detected_versions_list = [{'microservice': name, 'version': str(ver_obj)} for name, ver_obj in
-                              component_versions.items()]
-    detected_versions_list.sort(key=lambda x: x['microservice'])
+
+def detect_component_versions_from_data(df_raw: pd.DataFrame, microservice_config: dict,
+                                        version_index: VersionIndex = None) -> list:
+    if version_index is None:
+        version_index = build_version_index(df_raw, microservice_config)
+    if version_index is None or not version_index.version_columns: return []
+
+    detected_versions_list = version_index.component_versions_list()
     if detected_versions_list:
         logger.info(f"Авто-определено версий компонентов для таблицы: {len(detected_versions_list)} шт.")
     else:
@@ -105,30 +318,13 @@ def detect_component_versions_from_data(df_raw: pd.DataFrame, microservice_confi
     return detected_versions_list
 
 
-def detect_global_release_version(df_raw: pd.DataFrame, microservice_config: dict) -> str | None:
-    if df_raw is None or df_raw.empty: return None
-    fix_versions_base_csv_header = microservice_config.get('microservice_source_field_csv')
-    if not fix_versions_base_csv_header:
-        logger.warning("(detect_global_ver): 'microservice_source_field_csv' не указан.")
-        return None
-    version_columns_in_df = sorted([col for col in df_raw.columns if col.startswith(fix_versions_base_csv_header)])
-    if not version_columns_in_df:
-        logger.warning(f"(detect_global_ver): Колонки версий ('{fix_versions_base_csv_header}*') не найдены.")
-        return None
+def detect_global_release_version(df_raw: pd.DataFrame, microservice_config: dict,
+                                  version_index: VersionIndex = None) -> str | None:
+    if version_index is None:
+        version_index = build_version_index(df_raw, microservice_config)
+    if version_index is None or not version_index.version_columns: return None
 
-    found_global_versions = set()
-    for index, row in df_raw.iterrows():
-        for v_col_name in version_columns_in_df:
-            version_code_str = str(row.get(v_col_name, "")).strip()
-            if GLOBAL_VERSION_IDENTIFIER in version_code_str.upper():
-                version_part = version_code_str.upper().split(GLOBAL_VERSION_IDENTIFIER)[0].strip()
-                if version_part:
-                    cleaned_version_part = version_part.replace('(', '').replace(')', '').strip()
-                    if cleaned_version_part and any(char.isdigit() for char in cleaned_version_part):
-                        found_global_versions.add(cleaned_version_part)
-                    else:
-                        logger.debug(
-                            f"(detect_global_ver): Найдена '{version_code_str}', но извлеченная часть '{cleaned_version_part}' не версия.")
+    found_global_versions = set(version_index.global_version_candidates)
     if not found_global_versions:
         logger.warning(f"Глобальная версия релиза с '{GLOBAL_VERSION_IDENTIFIER}' не найдена.")
         return None
@@ -141,7 +337,23 @@ def detect_global_release_version(df_raw: pd.DataFrame, microservice_config: dic
     return global_version
 
 
-def prepare_task_description_text(row: pd.Series, field_names: _FieldNames,
+def build_csv_column_projection(fields_mapping_config, microservice_config: dict) -> csv_parser.ColumnProjection:
+    """
+    Вычисляет набор колонок CSV, которые используются на этапах обработки: csv_header и internal_name из маппинга,
+    стандартные заголовки, которые process_initial_data ищет напрямую, и колонки версий по префиксу
+    'microservice_source_field_csv'. Остальные колонки выгрузки можно не читать.
+    """
+    field_names = field_schema.ensure_field_schema(fields_mapping_config)
+    headers = {"issue type", "priority", "custom field (инструкция по установке)", "summary", "issue key"}
+    headers.update(getattr(field_names, attr_name) for attr_name in field_schema.STANDARD_FIELDS)
+    for spec in field_names:
+        headers.add(spec.get('csv_header'))
+        headers.add(spec.get('internal_name'))
+    fix_versions_base_csv_header = microservice_config.get('microservice_source_field_csv')
+    return csv_parser.ColumnProjection(headers, [fix_versions_base_csv_header] if fix_versions_base_csv_header else [])
+
+
+def prepare_task_description_text(row: pd.Series, field_names: field_schema.FieldSchema,
                                   links_label: str = "реализовано в рамках") -> str:
     description_text = ""
     customer_description = row.get(field_names.customer_desc, "")
@@ -159,26 +371,60 @@ def prepare_task_description_text(row: pd.Series, field_names: _FieldNames,
     return description_text
 
 
-def process_initial_data(df_raw: pd.DataFrame, fields_mapping_config: list, microservice_config: dict,
-                         main_app_config: dict) -> pd.DataFrame:  # Добавлен main_app_config
+def _column_as_stripped_text(df: pd.DataFrame, column_name: str) -> pd.Series:
+    """
+    Векторный аналог `str(value).strip() if value else ""` для колонки DataFrame.
+    Отсутствующая колонка дает пустые строки (как row.get(column_name, "")).
+    """
+    if not column_name or column_name not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    values = df[column_name]
+    if values.dtype != object and pd.api.types.is_string_dtype(values) and not values.isna().any():
+        return values.str.strip().astype(object)  # Обычный случай: строковая колонка из CSV без пропусков
+    text = values.map(str).str.strip().astype(object)
+    if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+        text = text.where(values.astype(bool), "")  # 0 / False - "ложные" значения, как в исходной проверке
+    else:
+        text = text.where(values.map(bool).astype(bool), "")
+    return text
+
+
+def build_task_report_texts(processed_df: pd.DataFrame, field_names: field_schema.FieldSchema,
+                            links_label: str = "реализовано в рамках") -> pd.Series:
+    """
+    Векторная версия prepare_task_description_text для всех строк сразу: описание для клиента,
+    иначе Summary, иначе "Нет описания.", плюс суффикс со ссылками. Результат совпадает построчно.
+    """
+    customer_description = _column_as_stripped_text(processed_df, field_names.customer_desc)
+    summary = _column_as_stripped_text(processed_df, field_names.summary)
+    links_text = _column_as_stripped_text(processed_df, field_names.links)
+
+    description_text = customer_description.where(customer_description != "", summary)
+    description_text = description_text.where(description_text != "", "Нет описания.")
+    links_suffix = (f" ({links_label}: " + links_text + ")").where(links_text != "", "")
+    return (description_text + links_suffix).astype(object)
+
+
+def process_initial_data(df_raw: pd.DataFrame, fields_mapping_config, microservice_config: dict,
+                         main_app_config: dict, version_index: VersionIndex = None) -> pd.DataFrame:
     if df_raw is None or df_raw.empty:
         logger.warning("(PIDs): Входной DataFrame пуст.")
         return pd.DataFrame()
 
     logger.info("Начало process_initial_data: отбор полей, извлечение МС, подготовка текста.")
-    field_names = _FieldNames(fields_mapping_config)
+    field_names = field_schema.ensure_field_schema(fields_mapping_config)
 
     fix_versions_base_csv_header = microservice_config.get('microservice_source_field_csv')
     if not fix_versions_base_csv_header:
         logger.error("(PIDs): 'microservice_source_field_csv' не указан.")
         return pd.DataFrame()
-    version_columns_in_df = sorted([col for col in df_raw.columns if col.startswith(fix_versions_base_csv_header)])
+    version_columns_in_df = _get_version_columns(df_raw, fix_versions_base_csv_header)
     if not version_columns_in_df: logger.warning(
         f"(PIDs): Колонки версий ('{fix_versions_base_csv_header}*') не найдены.")
 
     columns_to_process_map = {}
     original_headers_for_selection = []
-    for spec in fields_mapping_config:
+    for spec in field_names:
         csv_h = spec.get('csv_header')
         internal_n = spec.get('internal_name', csv_h)
         if csv_h and csv_h != fix_versions_base_csv_header:
@@ -189,33 +435,28 @@ def process_initial_data(df_raw: pd.DataFrame, fields_mapping_config: list, micr
         OrderedDict.fromkeys(h for h in original_headers_for_selection if h in df_raw.columns))
 
     if not unique_original_headers:
-        key_csv_h = next((spec.get('csv_header') for spec in fields_mapping_config if
+        key_csv_h = next((spec.get('csv_header') for spec in field_names if
                           spec.get('internal_name') == field_names.key and spec.get('csv_header') in df_raw.columns),
                          field_names.key if field_names.key in df_raw.columns else None)
         if key_csv_h:
-            processed_df = df_raw[[key_csv_h]].copy()
+            processed_df = df_raw[[key_csv_h]]
         else:
             logger.error(f"(PIDs): Ключ. колонка ('{field_names.key}') не найдена."); processed_df = pd.DataFrame(
                 index=df_raw.index)
     else:
-        processed_df = df_raw[unique_original_headers].copy()
+        processed_df = df_raw[unique_original_headers]
 
     rename_map = {csv_col: internal_n for csv_col, internal_n in columns_to_process_map.items() if
                   csv_col in processed_df.columns}
-    processed_df.rename(columns=rename_map, inplace=True)
+    # rename (не inplace) всегда возвращает новый DataFrame: колонки, добавленные ниже, не попадают в df_raw, и
+    # защитная .copy() не нужна. В pandas >= 3.0 (Copy-on-Write) данные колонок при этом не копируются.
+    processed_df = processed_df.rename(columns=rename_map)
     logger.debug(f"(PIDs): Колонки после отбора и переименования: {list(processed_df.columns)}")
 
-    prefix_mapping = microservice_config.get('microservice_prefix_mapping', {})
-    service_names_for_rows = []
-    if version_columns_in_df:
-        for idx, raw_row in df_raw.iterrows():
-            current_row_services = set()
-            for v_col in version_columns_in_df:
-                val = str(raw_row.get(v_col, ""))
-                if val:
-                    service_name, _ = extract_single_microservice_and_version(val, prefix_mapping)
-                    if service_name: current_row_services.add(service_name)
-            service_names_for_rows.append(sorted(list(current_row_services)))
+    if version_index is None and version_columns_in_df:
+        version_index = build_version_index(df_raw, microservice_config)
+    if version_index is not None and version_columns_in_df:
+        service_names_for_rows = version_index.row_services
     else:
         service_names_for_rows = [[] for _ in range(len(processed_df))]
 
@@ -229,10 +470,14 @@ def process_initial_data(df_raw: pd.DataFrame, fields_mapping_config: list, micr
     logger.info("Извлечение ИМЕН микросервисов для задач завершено.")
 
     links_label_text = main_app_config.get("links_label_text", "реализовано в рамках")  # Получаем из main_app_config
-    processed_df['task_report_text'] = processed_df.apply(
-        lambda row: prepare_task_description_text(row, field_names, links_label=links_label_text),
-        axis=1
-    )
+    if main_app_config.get("task_text_engine", "vectorized") == "legacy":
+        processed_df['task_report_text'] = processed_df.apply(
+            lambda row: prepare_task_description_text(row, field_names, links_label=links_label_text),
+            axis=1
+        )
+    else:
+        processed_df['task_report_text'] = build_task_report_texts(processed_df, field_names,
+                                                                   links_label=links_label_text)
     logger.info("Подготовка текста задачи для отчета завершена.")
 
     required_cols_map = {
@@ -242,8 +487,8 @@ def process_initial_data(df_raw: pd.DataFrame, fields_mapping_config: list, micr
     }
     for std_csv_h, internal_n_val in required_cols_map.items():
         if internal_n_val and internal_n_val not in processed_df.columns:
-            original_csv_h = next((spec.get('csv_header') for spec in fields_mapping_config if
-                                   spec.get('internal_name') == internal_n_val), std_csv_h)
+            spec_for_internal_n = field_names.spec_for_internal_name(internal_n_val)
+            original_csv_h = spec_for_internal_n.get('csv_header') if spec_for_internal_n else std_csv_h
             if original_csv_h in df_raw.columns:
                 processed_df[internal_n_val] = df_raw[original_csv_h]
                 logger.debug(f"Добавлена колонка '{internal_n_val}' из CSV-колонки '{original_csv_h}'.")
@@ -255,7 +500,7 @@ def process_initial_data(df_raw: pd.DataFrame, fields_mapping_config: list, micr
                     f"Не удалось добавить необходимую колонку '{internal_n_val}' (из CSV '{original_csv_h}' или '{std_csv_h}')")
 
     if field_names.fix_versions_display and version_columns_in_df:
-        spec_for_fix_ver_display = next((s for s in fields_mapping_config if
+        spec_for_fix_ver_display = next((s for s in field_names if
                                          s.get('internal_name') == field_names.fix_versions_display or s.get(
                                              'csv_header') == fix_versions_base_csv_header), None)
         if spec_for_fix_ver_display and spec_for_fix_ver_display.get('include_in_task_details', False):
@@ -268,13 +513,193 @@ def process_initial_data(df_raw: pd.DataFrame, fields_mapping_config: list, micr
     return processed_df
 
 
-def group_and_sort_tasks(processed_df: pd.DataFrame, sort_config: dict, fields_mapping_config: list) -> OrderedDict:
-    if processed_df.empty:
-        logger.warning("(group_sort): Входной DataFrame пуст.")
-        return OrderedDict()
-    logger.info("Начало group_and_sort_tasks: группировка и сортировка для 'Перечня изменений'.")
-
-    field_names = _FieldNames(fields_mapping_config)
+def select_reportable_tasks(processed_df: pd.DataFrame, fields_mapping_config, sort_field: str = None) -> pd.DataFrame:
+    """
+    Часть processed_df, которую использует отчет: задачи хотя бы с одним МС (остальные группировка отбрасывает) и
+    колонки, которые читают группировка, сортировка (sort_field - 'sort_tasks_within_group_by') и разделы отчета.
+    Метки индекса сохраняются.
+    """
+    field_names = field_schema.ensure_field_schema(fields_mapping_config)
+    used_columns = set(_report_field_names(field_names))
+    used_columns.update(f for f in (field_names.issue_type, field_names.priority, sort_field) if f)
+    used_columns.add('identified_microservices')
+    reportable_columns = [column for column in processed_df.columns if column in used_columns]
+    has_microservices = processed_df['identified_microservices'].map(bool).to_numpy(dtype=bool)
+    return processed_df.loc[has_microservices, reportable_columns]
+
+
+def process_data_in_chunks(df_chunks, fields_mapping_config, microservice_config: dict,
+                           main_app_config: dict) -> tuple:
+    """
+    Потоковая обработка CSV: каждый блок проходит индексацию версий, извлечение МС и подготовку текста задач,
+    после чего исходный блок освобождается. Из обработанного блока сохраняются только задачи, которые попадут в
+    отчет (select_reportable_tasks: с МС и только колонки отчета).
+
+    Память ограничена размером блока не полностью: до конца чтения хранится одна запись на каждую задачу отчета
+    (задачу с МС) всего файла, плюс версии компонентов и кандидаты глобальной версии. Построчные данные индекса
+    версий (row_services, row_global_versions, version_cells) не сохраняются, поэтому варианты отчета по
+    глобальным версиям в потоковом режиме недоступны.
+
+    :param df_chunks: Итератор DataFrame-блоков (см. csv_parser.load_csv_in_chunks).
+    :return: Кортеж (processed_df, version_index, rows_total): задачи отчета - как select_reportable_tasks от
+             process_initial_data для всего файла, version_index - как build_version_index для всего файла
+             (без построчных данных), rows_total - прочитано строк CSV. При ошибке - (пустой DataFrame, None, 0).
+    """
+    fields_schema = field_schema.ensure_field_schema(fields_mapping_config)  # Компилируем один раз для всех блоков
+    sort_field = main_app_config.get('sort_tasks_within_group_by')
+    combined_version_index = None
+    processed_parts = []
+    rows_total = chunks_total = 0
+    for df_chunk in df_chunks:
+        chunk_version_index = build_version_index(df_chunk, microservice_config)
+        processed_chunk = process_initial_data(df_chunk, fields_schema, microservice_config, main_app_config,
+                                               version_index=chunk_version_index)
+        if processed_chunk.empty:
+            logger.error(f"(chunks): Блок CSV (строки с {rows_total}) не обработан. Потоковая обработка прервана.")
+            return pd.DataFrame(), None, 0
+        reportable_chunk = select_reportable_tasks(processed_chunk, fields_schema, sort_field)
+        if not processed_parts or not reportable_chunk.empty: processed_parts.append(reportable_chunk)
+        rows_total += len(df_chunk)
+        chunks_total += 1
+        if chunk_version_index is not None:
+            chunk_version_index.row_services = []
+            chunk_version_index.row_global_versions, chunk_version_index.version_cells = {}, None
+            combined_version_index = chunk_version_index if combined_version_index is None else \
+                combined_version_index.merge(chunk_version_index)
+        del df_chunk, processed_chunk, reportable_chunk
+
+    if not processed_parts:
+        logger.warning("(chunks): CSV не содержит строк данных.")
+        return pd.DataFrame(), None, 0
+    processed_df = pd.concat(processed_parts) if len(processed_parts) > 1 else processed_parts[0]
+    logger.info(f"Потоковая обработка завершена: блоков {chunks_total}, строк {rows_total}, "
+                f"задач отчета (с МС) {len(processed_df)}.")
+    return processed_df, combined_version_index, rows_total
+
+
+def _explode_tasks_by_microservice(processed_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Разворачивает задачи по списку identified_microservices: одна строка на пару (задача, МС).
+    Задачи без МС отбрасываются.
+
+    :return: DataFrame с колонками 'row' (позиция задачи в processed_df), 'microservice' и 'position'
+             (порядковый номер пары в исходном порядке обхода).
+    """
+    if 'identified_microservices' not in processed_df.columns:
+        return pd.DataFrame(columns=['row', 'microservice', 'position'])
+    expanded_tasks = pd.DataFrame({
+        'row': np.arange(len(processed_df)),
+        'microservice': processed_df['identified_microservices'].to_numpy(dtype=object),
+    }).explode('microservice', ignore_index=True)
+    expanded_tasks = expanded_tasks[expanded_tasks['microservice'].notna()].reset_index(drop=True)
+    expanded_tasks['row'] = expanded_tasks['row'].astype(np.int64)
+    expanded_tasks['position'] = np.arange(len(expanded_tasks))
+    return expanded_tasks
+
+
+def _issue_type_ranks(task_types, issue_type_order_list: list) -> dict:
+    """Ранги типов задач: сначала в порядке из sort_issue_types_order, затем остальные по алфавиту."""
+    type_ranks = {}
+    for ordered_type in issue_type_order_list:
+        type_ranks.setdefault(ordered_type, len(type_ranks))
+    present_types = set(task_types)
+    for remaining_type in sorted(t for t in present_types if t not in type_ranks):
+        type_ranks[remaining_type] = len(type_ranks)
+    return type_ranks
+
+
+class TaskRecord(Mapping):
+    """
+    Компактная запись задачи для отчета: значения полей хранятся в кортеже, а имена полей - в словаре позиций,
+    общем для всех записей раздела. Неизменяемый Mapping (get, [], in, keys/items/values, len, итерация, сравнение
+    со словарем), поэтому report_generator работает с ней так же, как со словарем задачи. copy() и to_dict()
+    возвращают обычный словарь. Одна запись используется во всех группах МС задачи.
+    """
+    __slots__ = ('_values', '_field_positions')
+
+    def __init__(self, values: tuple, field_positions: dict):
+        self._values = values
+        self._field_positions = field_positions
+
+    def get(self, field_name, default=None):
+        pos = self._field_positions.get(field_name)
+        return default if pos is None else self._values[pos]
+
+    def __getitem__(self, field_name):
+        return self._values[self._field_positions[field_name]]
+
+    def __contains__(self, field_name) -> bool:
+        return field_name in self._field_positions
+
+    def __iter__(self):
+        return iter(self._field_positions)
+
+    def __len__(self) -> int:
+        return len(self._field_positions)
+
+    def keys(self):
+        return self._field_positions.keys()
+
+    def to_dict(self) -> dict:
+        return {field_name: self._values[pos] for field_name, pos in self._field_positions.items()}
+
+    copy = to_dict  # Как dict.copy: изменяемая копия, которую можно дополнять полями
+
+    def __repr__(self) -> str:
+        return f"TaskRecord({self.to_dict()!r})"
+
+
+def _report_field_names(field_names: field_schema.FieldSchema) -> list:
+    """Поля задачи, которые читает report_generator: отображаемые в разделах и поля для фоллбэк-вывода."""
+    report_fields = [display_field.source_name for display_field in field_names.changes_fields + field_names.setup_fields]
+    report_fields += [field_names.key, field_names.summary, field_names.setup_instructions, 'task_report_text']
+    return list(OrderedDict.fromkeys(f for f in report_fields if f))
+
+
+def _build_task_records(df: pd.DataFrame, field_names_to_keep: list) -> list:
+    """Создает TaskRecord для каждой строки df, сохраняя только указанные поля, присутствующие в df."""
+    present_fields = [f for f in field_names_to_keep if f in df.columns]
+    field_positions = {field_name: pos for pos, field_name in enumerate(present_fields)}
+    if not present_fields:
+        return [TaskRecord((), field_positions) for _ in range(len(df))]
+    column_values = [df[field_name].to_numpy(dtype=object) for field_name in present_fields]
+    return [TaskRecord(row_values, field_positions) for row_values in zip(*column_values)]
+
+
+class TaskGrouping:
+    """
+    Группировка задач по МС, общая для разделов 'Перечень изменений' и 'Настройки системы'.
+    Каждая задача хранится один раз в task_table (TaskRecord, позиция = позиция строки в processed_df),
+    оба раздела ссылаются на нее позиционными индексами:
+      changes_index: МС -> тип задачи -> [позиции] (порядок отчета);
+      setup_index: МС -> [позиции] (только задачи с инструкциями по установке).
+    """
+
+    def __init__(self, task_table: list, changes_index: OrderedDict, setup_index: OrderedDict):
+        self.task_table = task_table
+        self.changes_index = changes_index
+        self.setup_index = setup_index
+
+    def changes_view(self) -> OrderedDict:
+        """Данные для 'Перечня изменений': МС -> тип задачи -> [задачи]. Задачи общие для всех своих МС."""
+        return OrderedDict(
+            (ms_name, OrderedDict((task_type, [self.task_table[pos] for pos in positions])
+                                  for task_type, positions in types_dict.items()))
+            for ms_name, types_dict in self.changes_index.items())
+
+    def setup_view(self) -> OrderedDict:
+        """
+        Данные для 'Настроек системы': МС -> [задачи с инструкциями]. Те же записи, что и в changes_view();
+        поля issue_key, summary и setup_instructions прежнего формата раздела report_generator читает из колонок
+        схемы (field_schema.SETUP_RECORD_FIELDS).
+        """
+        return OrderedDict((ms_name, [self.task_table[pos] for pos in positions])
+                           for ms_name, positions in self.setup_index.items())
+
+
+def _build_changes_index(processed_df: pd.DataFrame, expanded_tasks: pd.DataFrame, field_names: field_schema.FieldSchema,
+                         sort_config: dict) -> OrderedDict:
+    """Индекс 'Перечня изменений': МС -> тип задачи -> [позиции задач], отсортированный одним проходом."""
     issue_type_col = field_names.issue_type
     priority_gs = field_names.priority
     key_col_gs = field_names.key
@@ -287,20 +712,7 @@ def group_and_sort_tasks(processed_df: pd.DataFrame, sort_config: dict, fields_m
             f"(group_sort): Колонка приоритета ('{priority_gs}') отсутствует. Сортировка по приоритету не будет применена.");
         priority_gs = None
 
-    expanded_tasks_list = []
-    for index, task_row in processed_df.iterrows():
-        task_dict = task_row.to_dict()
-        microservices = task_row.get('identified_microservices', [])
-        if not microservices: continue
-        for ms_name in microservices:
-            expanded_tasks_list.append({'microservice': ms_name, 'task_data': task_dict.copy()})
-    if not expanded_tasks_list: logger.warning("(group_sort): Нет задач после расширения по МС."); return OrderedDict()
-
-    temp_grouped = {}
-    for item in expanded_tasks_list:
-        ms_name, task_data = item['microservice'], item['task_data']
-        task_type = task_data.get(issue_type_col, "Неизвестный тип")
-        temp_grouped.setdefault(ms_name, {}).setdefault(task_type, []).append(task_data)
+    if expanded_tasks.empty: logger.warning("(group_sort): Нет задач после расширения по МС."); return OrderedDict()
 
     priority_order_list = sort_config.get('priority_order', [])
     priority_map = {p.lower(): i for i, p in enumerate(priority_order_list)}
@@ -310,111 +722,142 @@ def group_and_sort_tasks(processed_df: pd.DataFrame, sort_config: dict, fields_m
             f"Поле для сортировки '{sort_tasks_by_internal_name}' отсутствует в DataFrame. Сортировка по '{key_col_gs}'.")
         sort_tasks_by_internal_name = key_col_gs
 
-    for ms_name, types_dict in temp_grouped.items():
-        for task_type, tasks_list in types_dict.items():
-            # Проверка, что tasks_list не пустой перед доступом к tasks_list[0]
-            if not tasks_list: continue
-
-            if priority_gs and priority_map and sort_tasks_by_internal_name == priority_gs:
-                tasks_list.sort(
-                    key=lambda t: priority_map.get(str(t.get(priority_gs, "")).lower(), len(priority_map)))
-            elif sort_tasks_by_internal_name in tasks_list[0]:
-                tasks_list.sort(key=lambda t: str(t.get(sort_tasks_by_internal_name, '')))
-            elif key_col_gs in tasks_list[0]:
-                tasks_list.sort(key=lambda t: str(t.get(key_col_gs, '')))
-            # Если ни одно из полей сортировки не найдено, задачи останутся в исходном порядке для этой группы
-
-    issue_type_order_list = sort_config.get('sort_issue_types_order', [])
-    sorted_grouped_tasks = OrderedDict()
-    sorted_microservice_names = sorted(temp_grouped.keys())
-    if sort_config.get('sort_microservices_by') == 'name_desc': sorted_microservice_names.reverse()
-    for ms_name in sorted_microservice_names:
-        types_dict = temp_grouped[ms_name]
-        sorted_types_dict = OrderedDict()
-        for ordered_type in issue_type_order_list:
-            if ordered_type in types_dict: sorted_types_dict[ordered_type] = types_dict.pop(ordered_type)
-        for remaining_type in sorted(types_dict.keys()): sorted_types_dict[remaining_type] = types_dict[remaining_type]
-        sorted_grouped_tasks[ms_name] = sorted_types_dict
-    logger.info("Группировка и сортировка задач для 'Перечня изменений' завершена.")
-    return sorted_grouped_tasks
-
-
-def prepare_setup_instructions_data(processed_df_with_tasks: pd.DataFrame, fields_mapping_config: list,
-                                    sort_config: dict) -> OrderedDict:
-    if processed_df_with_tasks.empty:
-        logger.warning("(prepare_setup_data): Входной DataFrame пуст.")
-        return OrderedDict()
-    logger.info("Начало prepare_setup_data: подготовка данных для 'Настроек системы'.")
-
-    field_names = _FieldNames(fields_mapping_config)
+    # Единый составной ключ: МС -> тип задачи (порядок из конфига, затем по алфавиту) -> поле сортировки задач ->
+    # исходный порядок строк (сортировка устойчивая, как у list.sort в построчной версии).
+    expanded_rows = expanded_tasks['row'].to_numpy()
+    task_types = processed_df[issue_type_col].to_numpy(dtype=object)[expanded_rows]
+    type_ranks = _issue_type_ranks(pd.unique(task_types), sort_config.get('sort_issue_types_order', []))
+    if priority_gs and priority_map and sort_tasks_by_internal_name == priority_gs:
+        task_sort_keys = processed_df[priority_gs].map(str).str.lower().map(priority_map).fillna(len(priority_map))
+    elif sort_tasks_by_internal_name in processed_df.columns:
+        task_sort_keys = processed_df[sort_tasks_by_internal_name].map(str).astype(object)
+    else:  # Ни поля сортировки, ни ключа - задачи остаются в исходном порядке
+        task_sort_keys = pd.Series(0, index=processed_df.index)
+    sort_frame = expanded_tasks.assign(task_type=task_types,
+                                       type_rank=pd.Series(task_types).map(type_ranks).to_numpy(),
+                                       task_key=task_sort_keys.to_numpy()[expanded_rows])
+
+    microservices_ascending = sort_config.get('sort_microservices_by') != 'name_desc'
+    sort_frame = sort_frame.sort_values(['microservice', 'type_rank', 'task_key', 'position'],
+                                        ascending=[microservices_ascending, True, True, True], kind='stable')
+
+    changes_index = OrderedDict()
+    for ms_name, task_type, row_pos in zip(sort_frame['microservice'], sort_frame['task_type'], sort_frame['row']):
+        changes_index.setdefault(ms_name, OrderedDict()).setdefault(task_type, []).append(row_pos)
+    return changes_index
+
+
+def _build_setup_index(processed_df: pd.DataFrame, expanded_tasks: pd.DataFrame, field_names: field_schema.FieldSchema,
+                       sort_config: dict) -> OrderedDict:
+    """
+    Индекс 'Настроек системы' - отфильтрованное представление той же развертки по МС:
+    только задачи с непустыми инструкциями, отсортированные внутри МС.
+
+    :return: МС -> [позиции задач в processed_df (и в task_table)].
+    """
     setup_instructions_col = field_names.setup_instructions
     summary_col_setup = field_names.summary
     key_col_setup = field_names.key
     sort_field_tasks_setup = sort_config.get('sort_tasks_within_group_by', key_col_setup)
     priority_for_sort_setup = field_names.priority
 
-    if not key_col_setup or key_col_setup not in processed_df_with_tasks.columns:
+    if not key_col_setup or key_col_setup not in processed_df.columns:
         logger.error(f"(prepare_setup_data): Колонка ключа ('{key_col_setup}') отсутствует.");
         return OrderedDict()
-    if not setup_instructions_col or setup_instructions_col not in processed_df_with_tasks.columns:
+    if not setup_instructions_col or setup_instructions_col not in processed_df.columns:
         logger.warning(f"(prepare_setup_data): Колонка инструкций ('{setup_instructions_col}') отсутствует.");
         return OrderedDict()
-    if not summary_col_setup or summary_col_setup not in processed_df_with_tasks.columns:
+    if not summary_col_setup or summary_col_setup not in processed_df.columns:
         logger.warning(
-            f"(prepare_setup_data): Колонка Summary ('{summary_col_setup}') отсутствует. Используется 'Без заголовка'.")
-        # Не добавляем колонку в df, просто используем значение по умолчанию в get()
-
-    df_with_setup = processed_df_with_tasks[
-        processed_df_with_tasks[setup_instructions_col].fillna('').astype(str).str.strip() != ''
-        ].copy()
-
-    if df_with_setup.empty: logger.warning("(prepare_setup_data): Нет задач с инструкциями."); return OrderedDict()
-    logger.info(f"Найдено задач с инструкциями по установке: {len(df_with_setup)}")
-
-    expanded_setup_tasks_list = []
-    for index, task_row in df_with_setup.iterrows():
-        task_data_for_setup = {
-            'issue_key': task_row.get(key_col_setup),
-            'summary': task_row.get(summary_col_setup, "Без заголовка"),
-            'setup_instructions': task_row.get(setup_instructions_col),
-            sort_field_tasks_setup: task_row.get(sort_field_tasks_setup)
-        }
-        microservices = task_row.get('identified_microservices', [])
-        if not microservices: continue
-        for ms_name in microservices:
-            expanded_setup_tasks_list.append({'microservice': ms_name, 'task_data': task_data_for_setup.copy()})
-
-    if not expanded_setup_tasks_list: logger.warning(
+            f"(prepare_setup_data): Колонка Summary ('{summary_col_setup}') отсутствует. Используется "
+            f"'{field_schema.MISSING_SUMMARY_TEXT}'.")
+
+    has_setup_mask = (processed_df[setup_instructions_col].fillna('').astype(str).str.strip() != '').to_numpy()
+    if not has_setup_mask.any(): logger.warning("(prepare_setup_data): Нет задач с инструкциями."); return OrderedDict()
+    logger.info(f"Найдено задач с инструкциями по установке: {int(has_setup_mask.sum())}")
+
+    setup_entries = expanded_tasks[has_setup_mask[expanded_tasks['row'].to_numpy()]] if not expanded_tasks.empty \
+        else expanded_tasks
+    if setup_entries.empty: logger.warning(
         "(prepare_setup_data): Нет задач после расширения по МС."); return OrderedDict()
 
-    temp_grouped_setup = {}
-    for item in expanded_setup_tasks_list:
-        ms_name, task_data = item['microservice'], item['task_data']
-        temp_grouped_setup.setdefault(ms_name, []).append(task_data)
+    key_values = processed_df[key_col_setup].to_numpy(dtype=object)
+    sort_values = processed_df[sort_field_tasks_setup].to_numpy(dtype=object) \
+        if sort_field_tasks_setup and sort_field_tasks_setup in processed_df.columns else None
+
+    setup_groups = {}
+    for ms_name, row_pos in zip(setup_entries['microservice'], setup_entries['row']):
+        setup_groups.setdefault(ms_name, []).append(row_pos)
 
     priority_order_list = sort_config.get('priority_order', [])
     priority_map = {p.lower(): i for i, p in enumerate(priority_order_list)}
 
-    for ms_name, tasks_list in temp_grouped_setup.items():
-        if not tasks_list: continue  # Пропускаем, если список задач пуст
-
-        # Проверяем, существует ли поле для сортировки в первой задаче (предполагая однородность)
-        if sort_field_tasks_setup and sort_field_tasks_setup in tasks_list[0] and tasks_list[0].get(
-                sort_field_tasks_setup) is not None:
+    for ms_name, positions in setup_groups.items():
+        # Проверяем, заполнено ли поле для сортировки у первой задачи (предполагая однородность)
+        if sort_values is not None and sort_values[positions[0]] is not None:
             if priority_map and priority_for_sort_setup and sort_field_tasks_setup == priority_for_sort_setup:
-                tasks_list.sort(
-                    key=lambda t: priority_map.get(str(t.get(sort_field_tasks_setup, "")).lower(), len(priority_map)))
+                positions.sort(key=lambda pos: priority_map.get(str(sort_values[pos]).lower(), len(priority_map)))
             else:
-                tasks_list.sort(key=lambda t: str(t.get(sort_field_tasks_setup, '')))
-        elif key_col_setup in tasks_list[0]:
-            logger.debug(
-                f"Сортировка для {ms_name} в Настройках по ключу, т.к. поле '{sort_field_tasks_setup}' не найдено/пусто.")
-            tasks_list.sort(key=lambda t: t.get(key_col_setup, ''))
-
-    sorted_grouped_setup_tasks = OrderedDict()
-    sorted_microservice_names_setup = sorted(temp_grouped_setup.keys())
+                positions.sort(key=lambda pos: str(sort_values[pos]))
+        else:
+            logger.debug("Сортировка для %s в Настройках по ключу, т.к. поле '%s' не найдено/пусто.",
+                         ms_name, sort_field_tasks_setup)
+            positions.sort(key=lambda pos: key_values[pos])
+
+    setup_index = OrderedDict()
+    sorted_microservice_names_setup = sorted(setup_groups.keys())
     if sort_config.get('sort_microservices_by') == 'name_desc':
         sorted_microservice_names_setup.reverse()
-    for ms_name in sorted_microservice_names_setup: sorted_grouped_setup_tasks[ms_name] = temp_grouped_setup[ms_name]
+    for ms_name in sorted_microservice_names_setup: setup_index[ms_name] = setup_groups[ms_name]
+    return setup_index
+
+
+def build_task_grouping(processed_df: pd.DataFrame, sort_config: dict, fields_mapping_config) -> TaskGrouping:
+    """
+    Строит общую группировку задач для обоих разделов отчета: одна развертка по МС, одна таблица задач,
+    раздел 'Настройки системы' - отфильтрованное представление той же развертки.
+    """
+    if processed_df.empty:
+        logger.warning("(task_grouping): Входной DataFrame пуст.")
+        return TaskGrouping([], OrderedDict(), OrderedDict())
+    logger.info("Начало build_task_grouping: группировка и сортировка для 'Перечня изменений' и 'Настроек системы'.")
+
+    field_names = field_schema.ensure_field_schema(fields_mapping_config)
+    expanded_tasks = _explode_tasks_by_microservice(processed_df)
+    changes_index = _build_changes_index(processed_df, expanded_tasks, field_names, sort_config)
+    setup_index = _build_setup_index(processed_df, expanded_tasks, field_names, sort_config)
+    task_table = _build_task_records(processed_df, _report_field_names(field_names)) \
+        if changes_index or setup_index else []
+    logger.info(f"Группировка задач завершена: МС в 'Перечне изменений' {len(changes_index)}, "
+                f"в 'Настройках системы' {len(setup_index)}.")
+    return TaskGrouping(task_table, changes_index, setup_index)
+
+
+def group_and_sort_tasks(processed_df: pd.DataFrame, sort_config: dict, fields_mapping_config) -> OrderedDict:
+    if processed_df.empty:
+        logger.warning("(group_sort): Входной DataFrame пуст.")
+        return OrderedDict()
+    logger.info("Начало group_and_sort_tasks: группировка и сортировка для 'Перечня изменений'.")
+    field_names = field_schema.ensure_field_schema(fields_mapping_config)
+    changes_index = _build_changes_index(processed_df, _explode_tasks_by_microservice(processed_df), field_names,
+                                         sort_config)
+    if not changes_index: return OrderedDict()
+    task_table = _build_task_records(processed_df, _report_field_names(field_names))
+    task_grouping = TaskGrouping(task_table, changes_index, OrderedDict())
+    logger.info("Группировка и сортировка задач для 'Перечня изменений' завершена.")
+    return task_grouping.changes_view()
+
+
+def prepare_setup_instructions_data(processed_df_with_tasks: pd.DataFrame, fields_mapping_config,
+                                    sort_config: dict) -> OrderedDict:
+    if processed_df_with_tasks.empty:
+        logger.warning("(prepare_setup_data): Входной DataFrame пуст.")
+        return OrderedDict()
+    logger.info("Начало prepare_setup_data: подготовка данных для 'Настроек системы'.")
+    field_names = field_schema.ensure_field_schema(fields_mapping_config)
+    setup_index = _build_setup_index(processed_df_with_tasks, _explode_tasks_by_microservice(processed_df_with_tasks),
+                                     field_names, sort_config)
+    if not setup_index: return OrderedDict()
+    task_table = _build_task_records(processed_df_with_tasks, _report_field_names(field_names))
     logger.info("Подготовка данных для раздела 'Настройки системы' завершена.")
-    return sorted_grouped_setup_tasks
\ No newline at end of file
+    return TaskGrouping(task_table, OrderedDict(), setup_index).setup_view()
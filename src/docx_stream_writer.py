@@ -0,0 +1,409 @@
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from copy import copy
+from io import BytesIO, StringIO, TextIOWrapper
+from xml.sax.saxutils import escape as xml_escape
+from docx import Document
+from lxml import etree
+from . import field_schema
+from . import fragment_cache
+from . import report_generator
+from . import section_emitter
+from . import stage_metrics
+from . import logger_config  # Относительный импорт
+
+logger = logger_config.setup_logger(__name__)
+
+DOCUMENT_PART_NAME = "word/document.xml"
+COPY_BLOCK_SIZE = 1024 * 1024
+# Блоки микросервисов раздаются исполнителям пачками: примерно столько пачек на исполнителя
+# (баланс нагрузки против накладных расходов на межпроцессный обмен)
+RENDER_BATCHES_PER_WORKER = 4
+
+_XMLNS_DECLARATION_RE = re.compile(r' xmlns(?::\w+)?="[^"]*"')
+_RUN_SPECIAL_CHARS_RE = re.compile(r'([\t\r\n])')
+# Символы, недопустимые в XML 1.0 (python-docx на них падает при записи текста)
+_XML_INVALID_CHARS_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+def _element_xml(element) -> str:
+    """XML элемента-шаблона так, как он выглядит внутри document.xml (без объявлений пространств имен)."""
+    return _XMLNS_DECLARATION_RE.sub('', etree.tostring(element, encoding='unicode'))
+
+
+def _run_content_xml(text: str) -> str:
+    """Содержимое w:r для текста - как у python-docx (Run.text): табуляции - w:tab, переводы строк - w:br."""
+    text = _XML_INVALID_CHARS_RE.sub('', text)
+    parts = []
+    for chunk in _RUN_SPECIAL_CHARS_RE.split(text):
+        if chunk == '\t':
+            parts.append('<w:tab/>')
+        elif chunk in ('\r', '\n'):
+            parts.append('<w:br/>')
+        elif chunk:
+            space_attr = ' xml:space="preserve"' if len(chunk.strip()) < len(chunk) else ''
+            parts.append(f'<w:t{space_attr}>{xml_escape(chunk)}</w:t>')
+    return ''.join(parts)
+
+
+class _StreamRun:
+    """Фрагмент текста потокового параграфа (аналог docx Run для RenderPlan)."""
+    __slots__ = ('_run_properties_xml', '_content_xml')
+
+    def __init__(self, run_properties_xml: str, content_xml: str):
+        self._run_properties_xml = run_properties_xml
+        self._content_xml = content_xml
+
+    def add_break(self):
+        self._content_xml += '<w:br/>'
+
+    def xml(self) -> str:
+        inner_xml = self._run_properties_xml + self._content_xml
+        return f'<w:r>{inner_xml}</w:r>' if inner_xml else '<w:r/>'
+
+
+class _StreamParagraph:
+    """Параграф, который копит XML своих run до записи в поток (аналог docx Paragraph для RenderPlan)."""
+    __slots__ = ('_paragraph_properties_xml', '_runs')
+
+    def __init__(self, paragraph_properties_xml: str):
+        self._paragraph_properties_xml = paragraph_properties_xml
+        self._runs = []
+
+    def add_run(self, text: str = None, run_properties_xml: str = ''):
+        run = _StreamRun(run_properties_xml, _run_content_xml(str(text)) if text else '')
+        self._runs.append(run)
+        return run
+
+    def xml(self) -> str:
+        inner_xml = self._paragraph_properties_xml + ''.join(run.xml() for run in self._runs)
+        return f'<w:p>{inner_xml}</w:p>' if inner_xml else '<w:p/>'
+
+
+class XmlRenderPlan(section_emitter.SectionEmitter):
+    """
+    План вывода разделов в виде готовых XML-строк: вместо lxml-дерева python-docx параграфы пишутся в поток.
+
+    Строится из RenderPlan базового документа: шаблоны w:pPr / w:rPr один раз сериализуются в строки, после чего
+    план не ссылается на документ python-docx и может передаваться в процессы-исполнители (render_workers).
+    В памяти держится только текущий параграф, поэтому расход памяти не зависит от количества задач.
+    Разделы строятся теми же create_changes_section / create_setup_section, что и в python-docx бэкенде.
+    """
+
+    def __init__(self, render_plan, fragment_stream=None):
+        self.heading1 = tuple(self._template_xml(template) for template in render_plan.heading1)
+        self.heading2 = tuple(self._template_xml(template) for template in render_plan.heading2)
+        self.heading3 = tuple(self._template_xml(template) for template in render_plan.heading3)
+        self.task_paragraph = self._template_xml(render_plan.task_paragraph)
+        self.changes_no_tasks_paragraph = self._template_xml(render_plan.changes_no_tasks_paragraph)
+        self.setup_no_tasks_paragraph = self._template_xml(render_plan.setup_no_tasks_paragraph)
+        self.task_text_format = self._template_xml(render_plan.task_text_format)
+        self.task_bold_format = self._template_xml(render_plan.task_bold_format)
+        self.task_italic_format = self._template_xml(render_plan.task_italic_format)
+        self.key_field = render_plan.key_field
+        self.summary_field = render_plan.summary_field
+        self.setup_instructions_field = render_plan.setup_instructions_field
+        self.changes_fields = [self._field_xml(instruction) for instruction in render_plan.changes_fields]
+        self.setup_fields = [self._field_xml(instruction) for instruction in render_plan.setup_fields]
+        self._fragment_stream = fragment_stream
+        self._current_paragraph = None
+        self.paragraphs_written = 0
+
+    @staticmethod
+    def _template_xml(template) -> str:
+        return '' if template is None else _element_xml(template)
+
+    def _field_xml(self, instruction):
+        instruction_xml = copy(instruction)
+        instruction_xml.run_format = self._template_xml(instruction.run_format)
+        return instruction_xml
+
+    def fingerprint(self) -> list:
+        """Все оформление и инструкции полей плана (для ключей кэша фрагментов): одинаковый план - одинаковый XML."""
+        instruction_slots = section_emitter.FieldRenderInstruction.__slots__
+        return [self.heading1, self.heading2, self.heading3, self.task_paragraph, self.changes_no_tasks_paragraph,
+                self.setup_no_tasks_paragraph, self.task_text_format, self.task_bold_format, self.task_italic_format,
+                self.key_field, self.summary_field, self.setup_instructions_field,
+                [[getattr(instruction, slot) for slot in instruction_slots] for instruction in self.changes_fields],
+                [[getattr(instruction, slot) for slot in instruction_slots] for instruction in self.setup_fields]]
+
+    def fragment_source(self, section: str, ms_content) -> list:
+        """Данные блока МС, от которых зависит его XML: значения выводимых полей задач в порядке вывода."""
+        if section == field_schema.SECTION_CHANGES:
+            field_names = [instruction.internal_name for instruction in self.changes_fields] or \
+                          [self.key_field, 'task_report_text']
+            return [[issue_type, [[task.get(name) for name in field_names] for task in tasks_list]]
+                    for issue_type, tasks_list in ms_content.items()]
+        # Поля 'Настроек системы' в прежнем формате записей читаются из колонок схемы (source_name)
+        field_sources = [(instruction.source_name, instruction.missing_value) for instruction in self.setup_fields] or \
+                        [(self.key_field, None), (self.summary_field, field_schema.MISSING_SUMMARY_TEXT),
+                         (self.setup_instructions_field, None)]
+        return [[task.get(name, missing_value) for name, missing_value in field_sources] for task in ms_content]
+
+    def add_paragraph(self, paragraph_xml: str):
+        self.flush()
+        self._current_paragraph = _StreamParagraph(paragraph_xml)
+        return self._current_paragraph
+
+    def add_run(self, paragraph, text: str, run_xml: str):
+        return paragraph.add_run(text, run_xml)
+
+    def flush(self):
+        """Записывает текущий параграф в поток."""
+        if self._current_paragraph is not None:
+            self._fragment_stream.write(self._current_paragraph.xml())
+            self._current_paragraph = None
+            self.paragraphs_written += 1
+
+    def render_fragment(self, section: str, ms_name: str, ms_content) -> tuple:
+        """
+        XML блока одного микросервиса раздела (field_schema.SECTION_CHANGES / SECTION_SETUP).
+
+        :return: (XML-строка фрагмента, количество параграфов в нем).
+        """
+        previous_stream, previous_count = self._fragment_stream, self.paragraphs_written
+        self._fragment_stream, self.paragraphs_written = StringIO(), 0
+        try:
+            if section == field_schema.SECTION_CHANGES:
+                self.add_changes_microservice(ms_name, ms_content)
+            else:
+                self.add_setup_microservice(ms_name, ms_content)
+            self.flush()
+            return self._fragment_stream.getvalue(), self.paragraphs_written
+        finally:
+            self._fragment_stream, self.paragraphs_written = previous_stream, previous_count
+
+
+class SplicedXmlRenderPlan(XmlRenderPlan):
+    """
+    XmlRenderPlan, который вместо вывода блоков микросервисов вставляет в поток готовые фрагменты
+    (отрисованные процессами-исполнителями) в порядке обхода разделов. Заголовки H1 и прочие параграфы
+    разделов по-прежнему выводятся самим планом.
+    """
+
+    def __init__(self, render_plan, fragment_stream, fragments):
+        super().__init__(render_plan, fragment_stream)
+        self._fragments = iter(fragments)
+
+    def _splice_next_fragment(self):
+        self.flush()
+        fragment_xml, fragment_paragraphs = next(self._fragments)
+        self._fragment_stream.write(fragment_xml)
+        self.paragraphs_written += fragment_paragraphs
+
+    def add_changes_microservice(self, ms_name: str, types_dict: dict):
+        self._splice_next_fragment()
+
+    def add_setup_microservice(self, ms_name: str, tasks_list: list):
+        self._splice_next_fragment()
+
+
+# Состояние процесса-исполнителя: (XmlRenderPlan, {раздел: [(МС, данные), ...]}); задается инициализатором пула
+_worker_state = None
+
+
+def _init_render_worker(xml_plan, section_items: dict):
+    global _worker_state
+    _worker_state = (xml_plan, section_items)
+
+
+def _render_fragment_job(job: tuple) -> tuple:
+    """Задача исполнителя: (раздел, номер МС в разделе) -> (XML фрагмента, количество параграфов)."""
+    section, ms_position = job
+    xml_plan, section_items = _worker_state
+    ms_name, ms_content = section_items[section][ms_position]
+    return xml_plan.render_fragment(section, ms_name, ms_content)
+
+
+def _ordered_fragments(render_jobs: list, job_keys: list, jobs_cached: list, rendered_fragments, fragments_plan,
+                       section_items: dict, fragments_cache=None):
+    """
+    Фрагменты всех блоков МС в порядке разделов: из кэша (jobs_cached) или следующий из rendered_fragments
+    (перерисованные блоки в том же порядке). Перерисованные фрагменты сохраняются в кэш.
+    """
+    for (section, ms_position), job_key, job_cached in zip(render_jobs, job_keys, jobs_cached):
+        if job_cached:
+            fragment = fragments_cache.load(job_key)
+            if fragment is None:  # Запись повреждена или удалена после проверки - перерисовываем здесь
+                fragment = fragments_plan.render_fragment(section, *section_items[section][ms_position])
+                fragments_cache.store(job_key, *fragment)
+        else:
+            fragment = next(rendered_fragments)
+            if fragments_cache is not None:
+                logger.debug("%s: перерисован блок '%s' (%s).", fragment_cache.CACHE_NAME,
+                             section_items[section][ms_position][0], section)
+                fragments_cache.store(job_key, *fragment)
+        yield fragment
+
+
+def resolve_render_workers(render_workers) -> int:
+    """Количество процессов отрисовки из настройки render_workers: 0 - по числу ядер, некорректное значение - 1."""
+    try:
+        render_workers = int(render_workers)
+    except (TypeError, ValueError):
+        logger.warning(f"Некорректное значение render_workers '{render_workers}'. Используется 1.")
+        return 1
+    if render_workers == 0: return os.cpu_count() or 1
+    return max(render_workers, 1)
+
+
+def _render_pool_context():
+    """fork (где доступен): данные разделов наследуются исполнителями без сериализации."""
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+
+def _split_document_xml(document, marker_text: str) -> tuple:
+    """
+    Сериализует document.xml базового документа (как python-docx при save) с маркерным параграфом перед w:sectPr
+    и возвращает (начало, конец) - байты до и после места вставки потоковых параграфов.
+    """
+    marker_paragraph = document.add_paragraph(marker_text)
+    try:
+        document_xml = etree.tostring(document.element, encoding="UTF-8", standalone=True)
+        marker_xml = etree.tostring(marker_paragraph._p, encoding="UTF-8")
+        marker_xml = _XMLNS_DECLARATION_RE.sub('', marker_xml.decode('utf-8')).encode('utf-8')
+        head, marker_found, tail = document_xml.partition(marker_xml)
+        if not marker_found:
+            raise RuntimeError("Не найден маркер вставки в сериализованном document.xml")
+        return head, tail
+    finally:
+        marker_paragraph._p.getparent().remove(marker_paragraph._p)
+
+
+def _write_package(output_filename: str, base_package: bytes, document_head: bytes, fragment_file,
+                   document_tail: bytes):
+    """Собирает DOCX: все части базового пакета как есть, а word/document.xml - из начала, фрагментов и конца."""
+    with zipfile.ZipFile(BytesIO(base_package)) as base_zip, \
+            zipfile.ZipFile(output_filename, 'w', compression=zipfile.ZIP_DEFLATED) as output_zip:
+        for item in base_zip.infolist():
+            if item.filename != DOCUMENT_PART_NAME:
+                output_zip.writestr(item, base_zip.read(item.filename))
+                continue
+            document_item = zipfile.ZipInfo(item.filename, date_time=item.date_time)
+            document_item.compress_type = item.compress_type
+            document_item.external_attr = item.external_attr
+            with output_zip.open(document_item, 'w') as document_stream:
+                document_stream.write(document_head)
+                fragment_file.seek(0)
+                shutil.copyfileobj(fragment_file, document_stream, COPY_BLOCK_SIZE)
+                document_stream.write(document_tail)
+
+
+def generate_report_docx(output_filename, report_title_text, logo_full_path,
+                         microservice_versions_list, word_styles_config,
+                         grouped_data_for_changes,
+                         grouped_data_for_setup,
+                         main_config_for_titles,
+                         fields_mapping_for_details,
+                         render_workers=1,
+                         fragment_cache_dir=None,
+                         fragment_cache_max_size_mb=None,
+                         metrics=None
+                         ):
+    """
+    Потоковый бэкенд генерации DOCX (docx_backend: "streaming"), параметры - как у
+    report_generator.generate_report_docx.
+
+    Титульная секция, таблица версий, стили, нумерация и логотип строятся python-docx в небольшом базовом
+    документе. Параграфы разделов 'Перечень изменений' и 'Настройки системы' пишутся готовым XML во временный
+    файл и затем копируются в word/document.xml архива блоками, без построения lxml-дерева всего отчета.
+    Итоговый document.xml совпадает с результатом python-docx бэкенда.
+
+    :param render_workers: Количество процессов отрисовки (настройка render_workers; 0 - по числу ядер).
+        При значении больше 1 блоки микросервисов обоих разделов отрисовываются в XML-фрагменты параллельно,
+        а основной процесс вставляет их в документ в порядке разделов.
+    :param fragment_cache_dir: Директория кэша фрагментов блоков микросервисов (fragment_cache.FragmentCache).
+        Если указана, перерисовываются только блоки МС, у которых изменились задачи, остальные берутся из кэша.
+    :param fragment_cache_max_size_mb: Ограничение общего размера кэша фрагментов в МБ.
+    :param metrics: stage_metrics.PipelineMetrics: этапы docx_render (до записи XML разделов во временный файл
+        включительно) и docx_save (сборка архива).
+    """
+    logger.info(f"Начало потоковой генерации DOCX отчета: {output_filename}")
+    render_stage = stage_metrics.start_stage(metrics, "docx_render", unit="задач")
+    doc = Document()
+    fields_schema = field_schema.ensure_field_schema(fields_mapping_for_details)
+    style_registry = None
+    if word_styles_config.get('use_named_styles', False):
+        style_registry = report_generator.NamedStyleRegistry(doc)
+        logger.info("Режим именованных стилей Word: оформление задается стилями документа.")
+
+    report_generator.create_title_section(doc, report_title_text, logo_full_path, word_styles_config)
+    report_generator.create_microservices_version_table(doc, microservice_versions_list, word_styles_config,
+                                                        style_registry)
+    # Все стили документа (в т.ч. именованные) создаются здесь, до отрисовки разделов
+    render_plan = report_generator.RenderPlan(doc, word_styles_config, fields_schema, style_registry)
+
+    section_items = {field_schema.SECTION_CHANGES: list((grouped_data_for_changes or {}).items()),
+                     field_schema.SECTION_SETUP: list((grouped_data_for_setup or {}).items())}
+    render_jobs = [(section, ms_position) for section, items in section_items.items()
+                   for ms_position in range(len(items))]
+    render_workers = min(resolve_render_workers(render_workers), len(render_jobs))
+    fragments_plan = XmlRenderPlan(render_plan)  # Отрисовка блоков МС во фрагменты (в этом процессе и в пуле)
+    fragments_cache = None
+    if fragment_cache_dir:
+        fragments_cache = fragment_cache.FragmentCache(fragment_cache_dir, fragments_plan, fragment_cache_max_size_mb)
+
+    with tempfile.TemporaryFile(mode='w+b') as fragment_file, ExitStack() as render_pool_stack:
+        fragment_stream = TextIOWrapper(fragment_file, encoding='utf-8', newline='')
+        if render_workers > 1 or fragments_cache is not None:
+            job_keys = [None] * len(render_jobs)
+            if fragments_cache is not None:
+                job_keys = [fragments_cache.fragment_key(section, *section_items[section][ms_position])
+                            for section, ms_position in render_jobs]
+            jobs_cached = [job_key is not None and fragments_cache.contains(job_key) for job_key in job_keys]
+            jobs_to_render = [job for job, job_cached in zip(render_jobs, jobs_cached) if not job_cached]
+            render_workers = min(render_workers, len(jobs_to_render))
+            if render_workers > 1:
+                logger.info(f"Параллельная отрисовка разделов: процессов {render_workers}, "
+                            f"блоков микросервисов {len(jobs_to_render)}.")
+                executor = render_pool_stack.enter_context(ProcessPoolExecutor(
+                    max_workers=render_workers, mp_context=_render_pool_context(), initializer=_init_render_worker,
+                    initargs=(fragments_plan, section_items)))
+                batch_size = max(1, len(jobs_to_render) // (render_workers * RENDER_BATCHES_PER_WORKER))
+                rendered_fragments = executor.map(_render_fragment_job, jobs_to_render, chunksize=batch_size)
+            else:
+                rendered_fragments = (fragments_plan.render_fragment(section, *section_items[section][ms_position])
+                                      for section, ms_position in jobs_to_render)
+            fragments = _ordered_fragments(render_jobs, job_keys, jobs_cached, rendered_fragments, fragments_plan,
+                                           section_items, fragments_cache)
+            xml_plan = SplicedXmlRenderPlan(render_plan, fragment_stream, fragments)
+        else:
+            xml_plan = XmlRenderPlan(render_plan, fragment_stream)
+        # Единственное, что разделы добавляют в базовый документ напрямую, - параграф "нет изменений"
+        # (до любых потоковых параграфов), поэтому он окажется в начале document.xml на своем месте.
+        report_generator.create_changes_section(doc, grouped_data_for_changes, word_styles_config, fields_schema,
+                                                main_config_for_titles, style_registry, xml_plan)
+        report_generator.create_setup_section(doc, grouped_data_for_setup, word_styles_config, fields_schema,
+                                              main_config_for_titles, style_registry, xml_plan)
+        xml_plan.flush()
+        render_pool_stack.close()
+        if fragments_cache is not None: fragments_cache.finish()
+        fragment_stream.detach()  # Дальше работаем с бинарным файлом напрямую
+        logger.info(f"Потоковая запись: параграфов разделов {xml_plan.paragraphs_written}, "
+                    f"{fragment_file.tell() / 1024 / 1024:.1f} МБ XML.")
+        render_stage.finish(items=sum(section_emitter.count_section_tasks(grouped_data_for_changes,
+                                                                           grouped_data_for_setup)))
+
+        try:
+            output_dir = os.path.dirname(output_filename)
+            if output_dir and not os.path.exists(output_dir):
+                os.makedirs(output_dir);
+                logger.info(f"Создана директория: {output_dir}")
+            with stage_metrics.start_stage(metrics, "docx_save"):
+                document_head, document_tail = _split_document_xml(doc, f"stream-marker-{uuid.uuid4().hex}")
+                base_package = BytesIO()
+                doc.save(base_package)
+                _write_package(output_filename, base_package.getvalue(), document_head, fragment_file,
+                               document_tail)
+            logger.info(f"Отчет успешно сохранен: {output_filename}")
+        except Exception as e:
+            logger.error(f"Не удалось сохранить документ {output_filename}: {e}", exc_info=True)
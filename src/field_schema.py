@@ -0,0 +1,179 @@
+from . import logger_config  # Относительный импорт
+
+logger = logger_config.setup_logger(__name__)
+
+# Стандартные поля задачи: атрибут схемы -> (стандартный заголовок CSV в нижнем регистре, internal_name по умолчанию,
+# альтернативные internal_name)
+STANDARD_FIELDS = {
+    'key': ('issue key', 'issue_key', ()),
+    'summary': ('summary', 'summary_text', ('summary',)),
+    'customer_desc': ('custom field (description for the customer)', 'description_for_customer', ()),
+    'links': ('links', 'links_text', ()),
+    'issue_type': ('issue type', 'type', ('issue_type',)),
+    'priority': ('priority', 'priority_val', ('priority',)),
+    'setup_instructions': ('custom field (инструкция по установке)', 'setup_instructions', ()),
+    'fix_versions_display': ('fix version/s', 'fix_versions_display_all', ()),  # Для отображения сырых версий
+}
+
+SECTION_CHANGES = 'changes'
+SECTION_SETUP = 'setup'
+DEFAULT_DISPLAY_ORDER = 99
+
+# Имена полей записей 'Настроек системы' в прежнем формате (отдельный словарь на задачу) -> (атрибут схемы с колонкой
+# задачи, значение при отсутствии колонки). Разделы читают одни и те же записи задач, поэтому internal_name полей
+# 'Настроек системы' с этими именами при выводе заменяются на колонки схемы.
+MISSING_SUMMARY_TEXT = "Без заголовка"
+SETUP_RECORD_FIELDS = {
+    'issue_key': ('key', None),
+    'summary': ('summary', MISSING_SUMMARY_TEXT),
+    'setup_instructions': ('setup_instructions', None),
+}
+
+
+class DisplayField:
+    """
+    Поле, выводимое в разделе отчета: internal_name, подпись и опции стиля раздела (changes_style/setup_style).
+    source_name - поле записи задачи, из которого берется значение (и missing_value, если такого поля в записи нет).
+    """
+    __slots__ = ('internal_name', 'report_label', 'style', 'spec', 'source_name', 'missing_value')
+
+    def __init__(self, spec: dict, section: str, source_name: str = None, missing_value=None):
+        self.spec = spec
+        self.internal_name = spec.get('internal_name')
+        self.report_label = spec.get('report_label', '')
+        self.style = spec.get(f'{section}_style', {})
+        self.source_name = source_name or self.internal_name
+        self.missing_value = missing_value
+
+    def __repr__(self) -> str:
+        return f"DisplayField({self.internal_name!r})"
+
+
+class FieldSchema:
+    """
+    Скомпилированный fields_mapping.json. Строится один раз (config_loader) и передается по всему конвейеру:
+    стандартные имена колонок (key, summary, ...) доступны как атрибуты, поиск спецификации по internal_name и
+    csv_header - за O(1), списки полей разделов отчета отсортированы заранее.
+    Итерация по схеме возвращает исходные спецификации полей в порядке файла.
+    """
+
+    def __init__(self, fields_mapping_config: list):
+        self.specs = tuple(fields_mapping_config)
+        # Первая спецификация с данным internal_name / csv_header (как при линейном поиске по списку)
+        self._first_pos_by_internal_name = {}
+        self._first_pos_by_csv_header = {}
+        for pos, spec in enumerate(self.specs):
+            spec_internal = spec.get('internal_name')
+            if spec_internal: self._first_pos_by_internal_name.setdefault(spec_internal, pos)
+            self._first_pos_by_csv_header.setdefault((spec.get('csv_header') or '').lower(), pos)
+
+        for attr_name, (standard_csv_header, default_internal, alt_internals) in STANDARD_FIELDS.items():
+            setattr(self, attr_name, self.internal_name_for(standard_csv_header, default_internal, alt_internals))
+
+        self.changes_fields = self._build_display_fields(SECTION_CHANGES)
+        self.setup_fields = self._build_display_fields(SECTION_SETUP)
+
+    def __iter__(self):
+        return iter(self.specs)
+
+    def __len__(self) -> int:
+        return len(self.specs)
+
+    def internal_name_for(self, standard_csv_header: str, default_internal: str, alt_internals=()) -> str:
+        """
+        Имя колонки для стандартного поля: первая по порядку спецификация, у которой internal_name равен
+        default_internal (или одному из alt_internals), либо csv_header совпадает со стандартным заголовком.
+        """
+        candidates = [(self._first_pos_by_internal_name.get(name), True) for name in (default_internal, *alt_internals)]
+        candidates.append((self._first_pos_by_csv_header.get(standard_csv_header.lower()), False))
+        candidates = [candidate for candidate in candidates if candidate[0] is not None]
+        if not candidates:
+            logger.debug(
+                f"Для стандартного заголовка '{standard_csv_header}' не найдено явного internal_name в маппинге. "
+                f"Используется значение по умолчанию: '{default_internal}'.")
+            return default_internal
+        # При совпадении позиций проверка по internal_name идет первой
+        pos, matched_by_internal = min(candidates, key=lambda candidate: (candidate[0], not candidate[1]))
+        spec = self.specs[pos]
+        if matched_by_internal: return spec.get('internal_name')
+        return spec.get('internal_name', spec.get('csv_header'))  # Возвращаем internal_name или csv_header
+
+    def spec_for_internal_name(self, internal_name: str):
+        """Первая спецификация с данным internal_name или None."""
+        pos = self._first_pos_by_internal_name.get(internal_name)
+        return None if pos is None else self.specs[pos]
+
+    def spec_for_csv_header(self, csv_header: str):
+        """Первая спецификация с данным csv_header (без учета регистра) или None."""
+        pos = self._first_pos_by_csv_header.get((csv_header or '').lower())
+        return None if pos is None else self.specs[pos]
+
+    def display_fields(self, section: str) -> list:
+        """Поля раздела отчета ('changes' или 'setup') в порядке вывода."""
+        return self.changes_fields if section == SECTION_CHANGES else self.setup_fields
+
+    def _build_display_fields(self, section: str) -> list:
+        section_specs = sorted([spec for spec in self.specs if spec.get(f'display_in_{section}', False)],
+                               key=lambda spec: spec.get(f'{section}_order', DEFAULT_DISPLAY_ORDER))
+        if section != SECTION_SETUP:
+            return [DisplayField(spec, section) for spec in section_specs]
+        setup_display_fields = []
+        for spec in section_specs:
+            attr_name, missing_value = SETUP_RECORD_FIELDS.get(spec.get('internal_name'), (None, None))
+            setup_display_fields.append(DisplayField(spec, section, attr_name and getattr(self, attr_name),
+                                                     missing_value))
+        return setup_display_fields
+
+
+def validate_fields_mapping(fields_mapping_config) -> list:
+    """
+    Проверяет структуру fields_mapping.json.
+
+    :return: Список сообщений об ошибках (пустой, если маппинг корректен).
+    """
+    if not isinstance(fields_mapping_config, list):
+        return [f"fields_mapping должен быть списком, получено: {type(fields_mapping_config).__name__}"]
+    errors = []
+    for pos, spec in enumerate(fields_mapping_config):
+        if not isinstance(spec, dict):
+            errors.append(f"Поле #{pos}: ожидается объект, получено: {type(spec).__name__}")
+            continue
+        if not spec.get('internal_name') and not spec.get('csv_header'):
+            errors.append(f"Поле #{pos}: не задан ни internal_name, ни csv_header")
+        for section in (SECTION_CHANGES, SECTION_SETUP):
+            if not isinstance(spec.get(f'{section}_style', {}), dict):
+                errors.append(f"Поле #{pos} ('{spec.get('internal_name')}'): {section}_style должен быть объектом")
+            order_value = spec.get(f'{section}_order', DEFAULT_DISPLAY_ORDER)
+            if not isinstance(order_value, (int, float)) or isinstance(order_value, bool):
+                errors.append(f"Поле #{pos} ('{spec.get('internal_name')}'): {section}_order должен быть числом")
+    return errors
+
+
+def build_field_schema(fields_mapping_config):
+    """
+    Проверяет и компилирует fields_mapping.json в FieldSchema.
+
+    :return: FieldSchema или None, если маппинг некорректен.
+    """
+    errors = validate_fields_mapping(fields_mapping_config)
+    if errors:
+        for error in errors:
+            logger.error(f"Ошибка в fields_mapping: {error}")
+        return None
+    seen_internal_names = set()
+    for spec in fields_mapping_config:
+        spec_internal = spec.get('internal_name')
+        if spec_internal and spec_internal in seen_internal_names:
+            logger.warning(f"internal_name '{spec_internal}' встречается в fields_mapping несколько раз. "
+                           f"Используется первое вхождение.")
+        seen_internal_names.add(spec_internal)
+    schema = FieldSchema(fields_mapping_config)
+    logger.debug(f"Схема полей скомпилирована: полей {len(schema)}, в 'Перечне изменений' "
+                 f"{len(schema.changes_fields)}, в 'Настройках системы' {len(schema.setup_fields)}.")
+    return schema
+
+
+def ensure_field_schema(fields_mapping) -> FieldSchema:
+    """Возвращает FieldSchema: готовую схему - как есть, список спецификаций полей - компилирует."""
+    if isinstance(fields_mapping, FieldSchema): return fields_mapping
+    return FieldSchema(fields_mapping or [])
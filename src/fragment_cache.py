@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+from . import csv_cache
+from . import logger_config  # Относительный импорт
+
+logger = logger_config.setup_logger(__name__)
+
+# Меняется при изменении формата записи или вывода фрагментов, чтобы старые записи не использовались
+FRAGMENT_CACHE_FORMAT_VERSION = 1
+FRAGMENT_FILE_EXTENSION = ".xml"
+CACHE_NAME = "Кэш фрагментов"
+
+
+def _sha256_json(payload) -> str:
+    # default=str: значения задач могут быть не JSON-типами (Timestamp, numpy-числа)
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+
+
+class FragmentCache:
+    """
+    Дисковый кэш XML-фрагментов блоков микросервисов (docx_stream_writer.XmlRenderPlan.render_fragment).
+
+    Ключ фрагмента - хэш содержимого блока (раздел, имя МС, значения выводимых полей задач в порядке отчета) и
+    отпечатка плана вывода (шаблоны оформления из word_styles.json и инструкции полей из fields_mapping.json).
+    При повторной генерации перерисовываются только МС, у которых изменились задачи; изменение стилей или набора
+    полей меняет отпечаток и ключи всех фрагментов.
+    """
+
+    def __init__(self, cache_dir: str, xml_plan, max_size_mb: float = None):
+        self.cache_dir = cache_dir
+        self.max_size_mb = max_size_mb
+        self._xml_plan = xml_plan
+        self._plan_fingerprint = _sha256_json([FRAGMENT_CACHE_FORMAT_VERSION, xml_plan.fingerprint()])
+        self.hits = 0
+        self.misses = 0
+
+    def fragment_key(self, section: str, ms_name: str, ms_content) -> str:
+        """Ключ фрагмента блока МС раздела (field_schema.SECTION_CHANGES / SECTION_SETUP)."""
+        return _sha256_json([self._plan_fingerprint, section, ms_name,
+                             self._xml_plan.fragment_source(section, ms_content)])
+
+    def _fragment_path(self, fragment_key: str) -> str:
+        return os.path.join(self.cache_dir, fragment_key + FRAGMENT_FILE_EXTENSION)
+
+    def contains(self, fragment_key: str) -> bool:
+        return os.path.exists(self._fragment_path(fragment_key))
+
+    def load(self, fragment_key: str):
+        """
+        Загружает фрагмент из кэша.
+
+        :return: (XML-строка фрагмента, количество параграфов) или None, если записи нет или ее не удалось прочитать.
+        """
+        fragment_path = self._fragment_path(fragment_key)
+        try:
+            with open(fragment_path, 'r', encoding='utf-8', newline='') as f:
+                paragraphs_count = int(f.readline())
+                fragment_xml = f.read()
+            os.utime(fragment_path)  # Отмечаем использование для вытеснения по давности (LRU)
+        except (OSError, ValueError) as e:
+            logger.warning(f"{CACHE_NAME}: не удалось прочитать запись {fragment_path}: {e}. Фрагмент будет перерисован.")
+            return None
+        self.hits += 1
+        return fragment_xml, paragraphs_count
+
+    def store(self, fragment_key: str, fragment_xml: str, paragraphs_count: int) -> bool:
+        """Сохраняет перерисованный фрагмент (атомарно через временный файл). Возвращает True, если запись сохранена."""
+        self.misses += 1
+        fragment_path = self._fragment_path(fragment_key)
+        tmp_path = f"{fragment_path}.{os.getpid()}.tmp"  # Кэш может заполняться несколькими процессами (--batch)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+                f.write(f"{paragraphs_count}\n")
+                f.write(fragment_xml)
+            os.replace(tmp_path, fragment_path)
+        except OSError as e:
+            logger.warning(f"{CACHE_NAME}: не удалось сохранить запись {fragment_path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        return True
+
+    def finish(self):
+        """Пишет в лог статистику попаданий и вытесняет старые записи сверх max_size_mb."""
+        total = self.hits + self.misses
+        logger.info(f"{CACHE_NAME}: попаданий {self.hits}, промахов {self.misses} из {total} блоков МС"
+                    f"{f' ({self.hits / total:.0%} из кэша)' if total else ''}.")
+        if self.max_size_mb and os.path.isdir(self.cache_dir):
+            csv_cache.evict_cache(self.cache_dir, self.max_size_mb, file_extension=FRAGMENT_FILE_EXTENSION,
+                                  cache_name=CACHE_NAME)
@@ -1,5 +1,9 @@
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
+import threading
 import os  # Добавлен для определения пути к лог-файлу относительно корня проекта
 
 # Уровни логирования
@@ -16,42 +20,154 @@ LOG_FILE_NAME = "release_notes_word.log"
 
 # Словарь для хранения уже настроенных логгеров, чтобы избежать дублирования обработчиков
 _configured_loggers = {}
+# Общие очереди логирования: (уровень консоли, уровень файла, путь к файлу) -> QueueHandler
+_queue_handlers = {}
+# Типы аргументов сообщения, которые можно форматировать позже, в потоке записи (значение не изменится)
+_IMMUTABLE_ARG_TYPES = (str, int, float, bool, type(None))
+# Уровни модулей из 'log_levels' (apply_log_levels): действуют и для логгеров модулей, импортируемых позже
+_module_log_levels = {}
+# Признак фонового потока записи: там сброс буферов после каждой записи откладывается (см. BufferedQueueListener)
+_listener_thread_state = threading.local()
 
 
-def setup_logger(name="AppLogger", level_console=LOG_LEVEL_CONSOLE, level_file=LOG_LEVEL_FILE,
-                 log_file_name=LOG_FILE_NAME):
+class _DeferredFlushMixin:
+    """StreamHandler.emit сбрасывает поток после каждой записи; в фоновом потоке очереди сброс откладывается."""
+
+    def flush(self):
+        if getattr(_listener_thread_state, 'defer_flush', False): return
+        super().flush()
+
+
+class QueuedStreamHandler(_DeferredFlushMixin, logging.StreamHandler):
+    pass
+
+
+class QueuedFileHandler(_DeferredFlushMixin, logging.FileHandler):
+    pass
+
+
+class BufferedQueueListener(logging.handlers.QueueListener):
+    """QueueListener, который сбрасывает буферы обработчиков, когда очередь опустела, а не после каждой записи."""
+
+    def dequeue(self, block):
+        _listener_thread_state.defer_flush = True
+        try:
+            return self.queue.get(block=False)
+        except queue.Empty:
+            self._flush_handlers()
+        return self.queue.get(block)
+
+    def _flush_handlers(self):
+        _listener_thread_state.defer_flush = False
+        try:
+            for handler in self.handlers:
+                handler.flush()
+        finally:
+            _listener_thread_state.defer_flush = True
+
+    def stop(self):
+        super().stop()
+        for handler in self.handlers:
+            try:
+                handler.flush()  # Фоновый поток завершен: сброс из вызывающего потока
+            except (OSError, ValueError):
+                pass  # Поток вывода уже закрыт (например, перехваченный stdout под pytest), как в logging.shutdown
+
+
+class ProcessAwareQueueHandler(logging.handlers.QueueHandler):
     """
-    Настраивает и возвращает логгер.
-    Если логгер с таким именем уже настроен, возвращает его.
+    QueueHandler, который передает записи фоновому потоку QueueListener (запись на диск и в консоль не блокирует
+    вызывающий код).
+
+    В процессах, порожденных fork (пулы render_workers и пакетного режима), фонового потока нет: там записи
+    обрабатываются конечными обработчиками синхронно, как без очереди. Сообщения с неизменяемыми аргументами
+    (logger.debug("... %s", value)) форматируются уже в фоновом потоке.
     """
-    if name in _configured_loggers:
-        return _configured_loggers[name]
 
-    logger = logging.getLogger(name)
-    logger.setLevel(min(level_console, level_file))  # Устанавливаем общий минимальный уровень для логгера
+    def __init__(self, log_queue, target_handlers: list):
+        super().__init__(log_queue)
+        self.target_handlers = target_handlers
+        self.owner_pid = os.getpid()
+
+    def prepare(self, record):
+        if record.exc_info or record.stack_info or not isinstance(record.args, tuple) or \
+                not all(isinstance(arg, _IMMUTABLE_ARG_TYPES) for arg in record.args):
+            return super().prepare(record)  # Форматирование здесь: аргументы могут измениться после вызова
+        return record
+
+    def emit(self, record):
+        if os.getpid() != self.owner_pid:
+            for handler in self.target_handlers:
+                if record.levelno >= handler.level: handler.handle(record)
+            return
+        super().emit(record)
+
+
+def create_queue_handler(target_handlers: list) -> ProcessAwareQueueHandler:
+    """
+    Очередь с фоновым потоком записи в target_handlers (QueuedStreamHandler / QueuedFileHandler - с отложенным
+    сбросом буфера). Поток останавливается (с дозаписью очереди) при выходе.
+    """
+    log_queue = queue.SimpleQueue()
+    queue_handler = ProcessAwareQueueHandler(log_queue, target_handlers)
+    listener = BufferedQueueListener(log_queue, *target_handlers, respect_handler_level=True)
+    listener.start()
+    queue_handler.listener = listener
+    atexit.register(_stop_listener, queue_handler)
+    return queue_handler
+
+
+def _lock_queue_targets_before_fork():
+    """
+    Перед fork: сброс отложенных буферов и захват обработчиков, чтобы дочерний процесс не унаследовал
+    недописанный буфер (он был бы записан в файл повторно). В дочернем процессе блокировки пересоздает logging.
+    """
+    for queue_handler in _queue_handlers.values():
+        for handler in queue_handler.target_handlers:
+            handler.acquire()
+            logging.StreamHandler.flush(handler)
 
-    # Предотвращаем дублирование, если другой код уже добавил обработчики (маловероятно при такой схеме)
-    if logger.hasHandlers():
-        logger.handlers.clear()
+
+def _release_queue_targets_after_fork():
+    for queue_handler in _queue_handlers.values():
+        for handler in queue_handler.target_handlers:
+            handler.release()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(before=_lock_queue_targets_before_fork, after_in_parent=_release_queue_targets_after_fork)
+
+
+def _stop_listener(queue_handler):
+    if queue_handler.owner_pid == os.getpid() and queue_handler.listener._thread is not None:
+        queue_handler.listener.stop()
+
+
+def _get_queue_handler(level_console, level_file, log_file_name):
+    """Общий QueueHandler (консоль и файл) для всех логгеров с одинаковыми настройками вывода."""
+    actual_log_file_path = None
+    if log_file_name:
+        # Определяем путь к лог-файлу относительно корня проекта
+        # Предполагаем, что logger_config.py находится в src/
+        current_script_dir = os.path.dirname(os.path.abspath(__file__))
+        project_root = os.path.dirname(current_script_dir)  # Поднимаемся из src в корень
+        actual_log_file_path = os.path.join(project_root, log_file_name)
+    handler_key = (level_console, level_file, actual_log_file_path)
+    if handler_key in _queue_handlers:
+        return _queue_handlers[handler_key]
 
     formatter = logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+    target_handlers = []
 
     # 1. Обработчик для вывода в консоль
-    ch = logging.StreamHandler(sys.stdout)
+    ch = QueuedStreamHandler(sys.stdout)
     ch.setLevel(level_console)  # Индивидуальный уровень для консоли
     ch.setFormatter(formatter)
-    logger.addHandler(ch)
+    target_handlers.append(ch)
 
     # 2. Обработчик для вывода в файл (если указано имя файла)
-    actual_log_file_path = None
-    if log_file_name:
+    if actual_log_file_path:
         try:
-            # Определяем путь к лог-файлу относительно корня проекта
-            # Предполагаем, что logger_config.py находится в src/
-            current_script_dir = os.path.dirname(os.path.abspath(__file__))
-            project_root = os.path.dirname(current_script_dir)  # Поднимаемся из src в корень
-            actual_log_file_path = os.path.join(project_root, log_file_name)
-
             # Создаем директорию для лога, если она не существует (на случай если log_file_name содержит папки)
             log_dir = os.path.dirname(actual_log_file_path)
             if log_dir and not os.path.exists(log_dir):
@@ -59,10 +175,10 @@ def setup_logger(name="AppLogger", level_console=LOG_LEVEL_CONSOLE, level_file=L
                 # Используем print, т.к. логгер еще не полностью настроен для файла
                 print(f"INFO: Создана директория для лог-файла: {log_dir}")
 
-            fh = logging.FileHandler(actual_log_file_path, encoding='utf-8', mode='a')  # mode='a' для дозаписи
+            fh = QueuedFileHandler(actual_log_file_path, encoding='utf-8', mode='a')  # mode='a' для дозаписи
             fh.setLevel(level_file)  # Индивидуальный уровень для файла
             fh.setFormatter(formatter)
-            logger.addHandler(fh)
+            target_handlers.append(fh)
             # Используем print для первого сообщения о лог-файле, т.к. logger может быть еще не готов для файла
             print(
                 f"INFO: Логирование в файл настроено: {actual_log_file_path} (Уровень: {logging.getLevelName(level_file)})")
@@ -71,6 +187,31 @@ def setup_logger(name="AppLogger", level_console=LOG_LEVEL_CONSOLE, level_file=L
                 f"КРИТИЧЕСКАЯ ОШИБКА: Не удалось настроить файловый логгер для '{actual_log_file_path or log_file_name}': {e}",
                 file=sys.stderr)
 
+    _queue_handlers[handler_key] = create_queue_handler(target_handlers)
+    return _queue_handlers[handler_key]
+
+
+def setup_logger(name="AppLogger", level_console=LOG_LEVEL_CONSOLE, level_file=LOG_LEVEL_FILE,
+                 log_file_name=LOG_FILE_NAME):
+    """
+    Настраивает и возвращает логгер.
+    Если логгер с таким именем уже настроен, возвращает его.
+    Логгеры с одинаковыми настройками вывода пишут через общую очередь (ProcessAwareQueueHandler): консоль и файл
+    обслуживает один фоновый поток.
+    """
+    if name in _configured_loggers:
+        return _configured_loggers[name]
+
+    logger = logging.getLogger(name)
+    logger.setLevel(min(level_console, level_file))  # Устанавливаем общий минимальный уровень для логгера
+    if name in _module_log_levels: logger.setLevel(_module_log_levels[name])
+
+    # Предотвращаем дублирование, если другой код уже добавил обработчики (маловероятно при такой схеме)
+    if logger.hasHandlers():
+        logger.handlers.clear()
+
+    logger.addHandler(_get_queue_handler(level_console, level_file, log_file_name))
+
     logger.propagate = False  # Отключаем передачу сообщений родительским логгерам
     _configured_loggers[name] = logger
 
@@ -79,6 +220,21 @@ def setup_logger(name="AppLogger", level_console=LOG_LEVEL_CONSOLE, level_file=L
     return logger
 
 
+def apply_log_levels(log_levels: dict):
+    """
+    Уровни логгеров модулей из config.json ('log_levels'), например {"src.data_processor": "INFO"}.
+    Уровень выше DEBUG отключает отладочные сообщения модуля и в файле, и в консоли. Модули конвейера
+    импортируются после загрузки конфигураций, поэтому уровень запоминается и применяется в setup_logger.
+    """
+    for logger_name, level_name in (log_levels or {}).items():
+        level = logging.getLevelName(str(level_name).upper())
+        if not isinstance(level, int):
+            setup_logger(__name__).warning(f"Неизвестный уровень логирования '{level_name}' для '{logger_name}'.")
+            continue
+        _module_log_levels[logger_name] = level
+        logging.getLogger(logger_name).setLevel(level)
+
+
 if __name__ == '__main__':
     # Тестирование конфигурации логгера
     # Этот блок покажет, как логгеры с разными именами и настройками могут работать
@@ -0,0 +1,296 @@
+import html
+import os
+import re
+from . import field_schema
+from . import section_emitter
+from . import logger_config  # Относительный импорт
+
+logger = logger_config.setup_logger(__name__)
+
+PREVIEW_HTML = "html"
+PREVIEW_MARKDOWN = "markdown"
+
+# Виды параграфов предпросмотра (аналог шаблонов w:pPr в RenderPlan)
+PARAGRAPH_HEADING1 = ('heading', 1)
+PARAGRAPH_HEADING2 = ('heading', 2)
+PARAGRAPH_HEADING3 = ('heading', 3)
+PARAGRAPH_LIST_ITEM = ('list_item', None)
+PARAGRAPH_TEXT = ('text', None)
+
+LINE_BREAK = None  # Элемент параграфа "перевод строки" (остальные элементы - пары (текст, (bold, italic)))
+
+_MARKDOWN_SPECIAL_CHARS_RE = re.compile(r'([\\`*_\[\]<>#|])')
+
+
+class _PreviewRun:
+    """Фрагмент текста параграфа предпросмотра (аналог docx Run для SectionEmitter: нужен только add_break)."""
+    __slots__ = ('_paragraph_parts',)
+
+    def __init__(self, paragraph_parts: list):
+        self._paragraph_parts = paragraph_parts
+
+    def add_break(self):
+        self._paragraph_parts.append(LINE_BREAK)
+
+
+class _PreviewParagraph:
+    """Параграф предпросмотра: вид параграфа и последовательность фрагментов текста и переводов строк."""
+    __slots__ = ('kind', 'parts')
+
+    def __init__(self, kind: tuple):
+        self.kind = kind
+        self.parts = []
+
+    def add_run(self, text: str = None, run_format: tuple = None):
+        if text: self.parts.append((str(text), run_format))
+        return _PreviewRun(self.parts)
+
+
+class HtmlMarkup:
+    """Разметка HTML-предпросмотра."""
+    file_description = "HTML"
+
+    def document_start(self, title: str) -> str:
+        return ('<!DOCTYPE html>\n<html lang="ru">\n<head>\n<meta charset="utf-8">\n'
+                f'<title>{html.escape(title)}</title>\n'
+                '<style>body{font-family:Arial,sans-serif;max-width:60em;margin:1em auto}'
+                'table{border-collapse:collapse}th,td{border:1px solid #999;padding:2px 8px}'
+                'th{background:#d9d9d9}</style>\n</head>\n<body>\n'
+                f'<h1>{html.escape(title)}</h1>\n')
+
+    def document_end(self) -> str:
+        return '</body>\n</html>\n'
+
+    def inline(self, parts: list) -> str:
+        chunks = []
+        for part in parts:
+            if part is LINE_BREAK:
+                chunks.append('<br>')
+                continue
+            text, run_format = part
+            text = html.escape(text).replace('\t', ' ').replace('\r\n', '<br>').replace('\n', '<br>')
+            bold, italic = run_format or (False, False)
+            if italic: text = f'<i>{text}</i>'
+            if bold: text = f'<b>{text}</b>'
+            chunks.append(text)
+        return ''.join(chunks)
+
+    def heading(self, level: int, inline_text: str) -> str:
+        return f'<h{level + 1}>{inline_text}</h{level + 1}>\n'
+
+    def list_start(self) -> str:
+        return '<ul>\n'
+
+    def list_item(self, inline_text: str) -> str:
+        return f'<li>{inline_text}</li>\n'
+
+    def list_end(self) -> str:
+        return '</ul>\n'
+
+    def paragraph(self, inline_text: str) -> str:
+        return f'<p>{inline_text}</p>\n'
+
+    def table(self, header: list, rows: list) -> str:
+        header_html = ''.join(f'<th>{html.escape(str(cell))}</th>' for cell in header)
+        rows_html = ''.join('<tr>' + ''.join(f'<td>{html.escape(str(cell))}</td>' for cell in row) + '</tr>\n'
+                            for row in rows)
+        return f'<table>\n<tr>{header_html}</tr>\n{rows_html}</table>\n'
+
+
+class MarkdownMarkup:
+    """Разметка Markdown-предпросмотра."""
+    file_description = "Markdown"
+
+    def document_start(self, title: str) -> str:
+        return f'# {self._escape(title)}\n\n'
+
+    def document_end(self) -> str:
+        return ''
+
+    @staticmethod
+    def _escape(text: str) -> str:
+        return _MARKDOWN_SPECIAL_CHARS_RE.sub(r'\\\1', text)
+
+    def inline(self, parts: list) -> str:
+        chunks = []
+        for part in parts:
+            if part is LINE_BREAK:
+                chunks.append('  \n')
+                continue
+            text, run_format = part
+            lines = self._escape(text.replace('\t', ' ')).splitlines() or ['']
+            bold, italic = run_format or (False, False)
+            marker = ('**' if bold else '') + ('*' if italic else '')
+            if marker:
+                # Маркеры выделения не должны прилегать к пробелам, иначе Markdown их не распознает
+                lines = [self._emphasize(line, marker) for line in lines]
+            chunks.append('  \n'.join(lines))
+        return ''.join(chunks)
+
+    @staticmethod
+    def _emphasize(text: str, marker: str) -> str:
+        stripped = text.strip()
+        if not stripped: return text
+        leading = text[:len(text) - len(text.lstrip())]
+        trailing = text[len(text.rstrip()):]
+        return f'{leading}{marker}{stripped}{marker[::-1]}{trailing}'
+
+    def heading(self, level: int, inline_text: str) -> str:
+        inline_text = inline_text.replace('  \n', ' ')  # Заголовок Markdown - одна строка
+        return f'{"#" * (level + 1)} {inline_text}\n\n'
+
+    def list_start(self) -> str:
+        return ''
+
+    def list_item(self, inline_text: str) -> str:
+        return '- ' + inline_text.replace('\n', '\n  ') + '\n'
+
+    def list_end(self) -> str:
+        return '\n'
+
+    def paragraph(self, inline_text: str) -> str:
+        return f'{inline_text}\n\n'
+
+    def table(self, header: list, rows: list) -> str:
+        lines = ['| ' + ' | '.join(self._escape(str(cell)) for cell in header) + ' |',
+                 '|' + '---|' * len(header)]
+        lines += ['| ' + ' | '.join(self._escape(str(cell)) for cell in row) + ' |' for row in rows]
+        return '\n'.join(lines) + '\n\n'
+
+
+PREVIEW_MARKUPS = {PREVIEW_HTML: HtmlMarkup, PREVIEW_MARKDOWN: MarkdownMarkup}
+
+
+class PreviewRenderPlan(section_emitter.SectionEmitter):
+    """
+    План вывода разделов в HTML или Markdown. Разделы выводятся той же логикой SectionEmitter, что и в DOCX
+    (порядок, подписи и опции полей из fields_mapping.json), но оформление сводится к заголовкам, спискам и
+    выделению bold/italic; шрифты, размеры и отступы word_styles.json в предпросмотре не используются.
+    Текст пишется в поток по параграфам, без построения документа в памяти.
+    """
+
+    def __init__(self, fields_schema, markup, output_stream):
+        self.heading1 = (PARAGRAPH_HEADING1, None)
+        self.heading2 = (PARAGRAPH_HEADING2, None)
+        self.heading3 = (PARAGRAPH_HEADING3, None)
+        self.task_paragraph = PARAGRAPH_LIST_ITEM
+        self.changes_no_tasks_paragraph = PARAGRAPH_LIST_ITEM
+        self.setup_no_tasks_paragraph = PARAGRAPH_LIST_ITEM
+        self.no_changes_paragraph = PARAGRAPH_TEXT
+        self.task_text_format = None
+        self.task_bold_format = (True, False)
+        self.task_italic_format = (False, True)
+        self.key_field = fields_schema.key
+        self.summary_field = fields_schema.summary
+        self.setup_instructions_field = fields_schema.setup_instructions
+        self.changes_fields = [self._compile_field(display_field) for display_field in fields_schema.changes_fields]
+        self.setup_fields = [self._compile_field(display_field) for display_field in fields_schema.setup_fields]
+        self._markup = markup
+        self._output_stream = output_stream
+        self._current_paragraph = None
+        self._in_list = False
+
+    @staticmethod
+    def _compile_field(display_field):
+        style_options = display_field.style
+        bold, italic = bool(style_options.get('bold', False)), bool(style_options.get('italic', False))
+        return section_emitter.FieldRenderInstruction(display_field, (bold, italic) if bold or italic else None)
+
+    def add_paragraph(self, paragraph_kind: tuple):
+        self.flush()
+        self._current_paragraph = _PreviewParagraph(paragraph_kind)
+        return self._current_paragraph
+
+    def add_run(self, paragraph, text: str, run_format):
+        return paragraph.add_run(text, run_format)
+
+    def write_block(self, markup_text: str):
+        """Выводит готовый блок разметки (таблица версий) после текущего параграфа."""
+        self.flush()
+        self._close_list()
+        self._output_stream.write(markup_text)
+
+    def _close_list(self):
+        if self._in_list:
+            self._output_stream.write(self._markup.list_end())
+            self._in_list = False
+
+    def flush(self):
+        """Записывает текущий параграф в поток."""
+        paragraph = self._current_paragraph
+        if paragraph is None: return
+        self._current_paragraph = None
+        kind, level = paragraph.kind
+        inline_text = self._markup.inline(paragraph.parts)
+        if kind == 'list_item':
+            if not self._in_list:
+                self._output_stream.write(self._markup.list_start())
+                self._in_list = True
+            self._output_stream.write(self._markup.list_item(inline_text))
+            return
+        self._close_list()
+        if kind == 'heading':
+            self._output_stream.write(self._markup.heading(level, inline_text))
+        else:
+            self._output_stream.write(self._markup.paragraph(inline_text))
+
+    def close(self):
+        self.flush()
+        self._close_list()
+
+
+def generate_report_preview(output_filename, preview_format: str, report_title_text, microservice_versions_list,
+                            grouped_data_for_changes, grouped_data_for_setup, main_config_for_titles,
+                            fields_mapping_for_details) -> bool:
+    """
+    Быстрый предпросмотр отчета в HTML или Markdown (preview_format: "html" / "markdown") по тем же
+    сгруппированным данным и настройкам полей, что и DOCX. Нужен для вычитки формулировок: без python-docx,
+    стилей Word и упаковки в архив.
+
+    :return: True, если файл сохранен.
+    """
+    markup_class = PREVIEW_MARKUPS.get(preview_format)
+    if markup_class is None:
+        logger.error(f"Неизвестный формат предпросмотра '{preview_format}'.")
+        return False
+    markup = markup_class()
+    logger.info(f"Начало генерации {markup.file_description}-предпросмотра: {output_filename}")
+    fields_schema = field_schema.ensure_field_schema(fields_mapping_for_details)
+    section_titles = main_config_for_titles.get('report_section_titles', {})
+    try:
+        output_dir = os.path.dirname(output_filename)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir);
+            logger.info(f"Создана директория: {output_dir}")
+        with open(output_filename, 'w', encoding='utf-8', newline='\n') as output_stream:
+            output_stream.write(markup.document_start(report_title_text))
+            plan = PreviewRenderPlan(fields_schema, markup, output_stream)
+
+            if microservice_versions_list:
+                plan.add_heading("Версии компонентов релиза:", plan.heading2)
+                plan.write_block(markup.table(['Микросервис', 'Версия'], [
+                    (item.get('microservice', 'N/A'), item.get('version', 'N/A'))
+                    for item in microservice_versions_list]))
+
+            if grouped_data_for_changes:
+                plan.add_heading(section_titles.get('main_changes', "Перечень изменений"), plan.heading1)
+                for ms_name, types_dict in grouped_data_for_changes.items():
+                    plan.add_changes_microservice(ms_name, types_dict)
+            else:
+                no_changes_text = section_titles.get('no_changes_text', "Изменений в данной версии не зарегистрировано.")
+                plan.add_run(plan.add_paragraph(plan.no_changes_paragraph), no_changes_text, plan.task_italic_format)
+
+            if grouped_data_for_setup:
+                setup_title_text = section_titles.get('system_setup', "Настройки системы (Заголовок по умолчанию)")
+                if setup_title_text and setup_title_text.strip():
+                    plan.add_heading(setup_title_text, plan.heading1)
+                for ms_name, tasks_list in grouped_data_for_setup.items():
+                    plan.add_setup_microservice(ms_name, tasks_list)
+
+            plan.close()
+            output_stream.write(markup.document_end())
+        logger.info(f"Предпросмотр успешно сохранен: {output_filename}")
+        return True
+    except Exception as e:
+        logger.error(f"Не удалось сохранить предпросмотр {output_filename}: {e}", exc_info=True)
+        return False
@@ -1,9 +1,16 @@
 from docx import Document
 from docx.shared import Inches, Pt, RGBColor
+from docx.enum.style import WD_STYLE_TYPE
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.oxml.ns import qn
 from docx.oxml import OxmlElement
+from docx.text.paragraph import Paragraph
+from copy import deepcopy
+import logging
 import os
+from . import field_schema
+from . import section_emitter
+from . import stage_metrics
 from . import logger_config  # Относительный импорт
 
 logger = logger_config.setup_logger(__name__)
@@ -16,24 +23,12 @@ H1_FONT_SIZE_PT_VAL = 14  # Для Заголовка 1
 H2_FONT_SIZE_PT_VAL = 13  # Для Заголовка 2
 H3_FONT_SIZE_PT_VAL = 12  # Для Заголовка 3
 TASK_ITEM_FONT_SIZE_PT_VAL = 10  # Для текста задач в списках
+TASK_LIST_STYLE_NAME = 'ListBullet'
+NAMED_STYLE_PREFIX = "RN"  # Префикс имен стилей, регистрируемых в режиме use_named_styles
 
 
 # --- Вспомогательные функции ---
 
-def _get_internal_name_from_mapping(fields_mapping_config: list, standard_csv_header: str, default_internal: str,
-                                    alt_internals: list = None) -> str:
-    """Ищет internal_name в fields_mapping_config."""
-    if alt_internals is None: alt_internals = []
-    for field_spec in fields_mapping_config:
-        spec_internal = field_spec.get('internal_name')
-        if spec_internal and (spec_internal == default_internal or spec_internal in alt_internals):
-            return spec_internal
-        spec_csv_header = field_spec.get('csv_header', '').lower()
-        if spec_csv_header == standard_csv_header.lower():
-            return field_spec.get('internal_name', field_spec.get('csv_header'))
-    return default_internal
-
-
 def set_run_font(run, font_name=None, size_pt_val=None, bold=None, italic=None, color_rgb=None):
     """Устанавливает свойства шрифта для объекта Run."""
     if font_name:
@@ -45,8 +40,9 @@ def set_run_font(run, font_name=None, size_pt_val=None, bold=None, italic=None,
         try:
             actual_size = Pt(int(size_pt_val))
             run.font.size = actual_size
-            logger.debug(
-                f"  [set_run_font] Установлен размер: {actual_size} для '{run.text[:20]}...' (исходное: {size_pt_val})")
+            if logger.isEnabledFor(logging.DEBUG):  # run.text - обход XML run, только когда сообщение будет записано
+                logger.debug("  [set_run_font] Установлен размер: %s для '%s...' (исходное: %s)",
+                             actual_size, run.text[:20], size_pt_val)
         except ValueError:
             logger.warning(f"Неверное значение для размера шрифта: {size_pt_val}. Не удалось установить размер.")
         except Exception as e:
@@ -56,6 +52,107 @@ def set_run_font(run, font_name=None, size_pt_val=None, bold=None, italic=None,
     if color_rgb is not None and isinstance(color_rgb, RGBColor): run.font.color.rgb = color_rgb
 
 
+class NamedStyleRegistry:
+    """
+    Именованные стили документа (режим 'use_named_styles' в word_styles.json).
+    Каждое сочетание шрифта, размера, bold и italic регистрируется в styles.xml один раз как символьный стиль,
+    а run ссылается на него по id (w:rStyle) вместо собственного блока w:rPr. Оформление текста то же, что дает
+    set_run_font. Аналогично параграфы задач ссылаются на стиль абзаца, основанный на стиле списка, с отступами
+    из 'paragraph_spacing'.
+    Символьные стили применяются только в параграфах без собственного bold/italic (списки, таблица): в заголовках
+    bold из стиля символа переключил бы bold стиля заголовка, поэтому заголовки оформляются напрямую.
+    """
+
+    def __init__(self, document):
+        self._styles = document.styles
+        self._character_style_ids = {}
+        self._paragraph_style_ids = {}
+
+    def character_style_id(self, font_name=None, size_pt_val=None, bold=None, italic=None) -> str:
+        """Id символьного стиля с указанным оформлением (создается при первом обращении)."""
+        if size_pt_val is not None:
+            try:
+                size_pt_val = int(size_pt_val)
+            except (TypeError, ValueError):
+                logger.warning(f"Неверное значение для размера шрифта: {size_pt_val}. Не удалось установить размер.")
+                size_pt_val = None
+        style_key = (font_name or None, size_pt_val, bold, italic)
+        style_id = self._character_style_ids.get(style_key)
+        if style_id is None:
+            style_id = self._add_character_style(*style_key)
+            self._character_style_ids[style_key] = style_id
+        return style_id
+
+    def paragraph_style_id(self, base_style_name: str, space_before_pt=None, space_after_pt=None):
+        """
+        Id стиля абзаца на основе base_style_name с заданными отступами (создается при первом обращении).
+        :return: Id стиля или None, если базовый стиль отсутствует в шаблоне документа.
+        """
+        style_key = (base_style_name, space_before_pt, space_after_pt)
+        if style_key not in self._paragraph_style_ids:
+            self._paragraph_style_ids[style_key] = self._add_paragraph_style(*style_key)
+        return self._paragraph_style_ids[style_key]
+
+    def _add_character_style(self, font_name, size_pt_val, bold, italic) -> str:
+        name_parts = [NAMED_STYLE_PREFIX, font_name or "Default", f"{size_pt_val}pt" if size_pt_val is not None else None,
+                      {True: "Bold", False: "NoBold"}.get(bold), {True: "Italic", False: "NoItalic"}.get(italic)]
+        style = self._styles.add_style(" ".join(part for part in name_parts if part), WD_STYLE_TYPE.CHARACTER)
+        if font_name:
+            style.font.name = font_name
+            r_fonts = style.element.rPr.rFonts
+            r_fonts.set(qn('w:eastAsia'), font_name)
+            r_fonts.set(qn('w:cs'), font_name)
+        if size_pt_val is not None: style.font.size = Pt(size_pt_val)
+        if bold is not None: style.font.bold = bold
+        if italic is not None: style.font.italic = italic
+        logger.debug(f"Зарегистрирован символьный стиль '{style.name}' (id: {style.style_id}).")
+        return style.style_id
+
+    def _add_paragraph_style(self, base_style_name, space_before_pt, space_after_pt):
+        # Имя стиля в коде исторически задано как id ('ListBullet'), поэтому ищем и по id, и по имени
+        base_style = next((style for style in self._styles
+                           if style.type == WD_STYLE_TYPE.PARAGRAPH and base_style_name in (style.style_id, style.name)),
+                          None)
+        if base_style is None:
+            logger.warning(f"Стиль '{base_style_name}' не найден. Параграфы задач оформляются без стиля списка.")
+            return None
+        style = self._styles.add_style(f"{NAMED_STYLE_PREFIX} {base_style.name} {space_before_pt}-{space_after_pt}pt",
+                                       WD_STYLE_TYPE.PARAGRAPH)
+        style.base_style = base_style
+        if space_before_pt is not None: style.paragraph_format.space_before = Pt(int(space_before_pt))
+        if space_after_pt is not None: style.paragraph_format.space_after = Pt(int(space_after_pt))
+        logger.debug(f"Зарегистрирован стиль абзаца '{style.name}' (id: {style.style_id}).")
+        return style.style_id
+
+
+def format_run(run, style_registry=None, font_name=None, size_pt_val=None, bold=None, italic=None):
+    """Оформляет run: ссылкой на именованный стиль, если передан NamedStyleRegistry, иначе через set_run_font."""
+    if style_registry is None:
+        set_run_font(run, font_name, size_pt_val, bold, italic)
+    else:
+        run._element.style = style_registry.character_style_id(font_name, size_pt_val, bold, italic)
+
+
+def _task_paragraph_style_id(style_registry, para_spacing: dict):
+    """Id стиля абзаца задач (стиль списка + отступы list_item_*) или None в режиме прямого форматирования."""
+    if style_registry is None: return None
+    return style_registry.paragraph_style_id(TASK_LIST_STYLE_NAME, para_spacing.get('list_item_before', 0),
+                                             para_spacing.get('list_item_after', 6))
+
+
+def _add_list_paragraph(document, list_paragraph_style_id=None):
+    """Параграф списка задач: со стилем из реестра (если есть) или со стилем 'ListBullet'."""
+    if list_paragraph_style_id is not None:
+        paragraph = document.add_paragraph()
+        paragraph._p.style = list_paragraph_style_id
+        return paragraph
+    try:
+        return document.add_paragraph(style=TASK_LIST_STYLE_NAME)
+    except KeyError:
+        logger.warning(f"Стиль '{TASK_LIST_STYLE_NAME}' не найден.")
+        return document.add_paragraph()
+
+
 def add_styled_paragraph(document, text="", style_name=None, font_name=None, size_pt_val=None,
                          bold=None, italic=None, align=None,
                          space_after_pt=None, space_before_pt=None):
@@ -79,75 +176,117 @@ def add_styled_paragraph(document, text="", style_name=None, font_name=None, siz
     return p
 
 
-def _apply_field_style_to_run(run, field_style: dict, default_font_name: str, default_font_size: int):
-    """Применяет стили из field_style к объекту run."""
-    set_run_font(
-        run,
-        font_name=field_style.get('font_name', default_font_name),
-        size_pt_val=field_style.get('font_size', default_font_size),
-        bold=field_style.get('bold', False),
-        italic=field_style.get('italic', False)
-    )
-
-
-def _add_task_fields_to_paragraph(paragraph, task_dict: dict, fields_to_display: list,
-                                  default_font_name: str, default_font_size: int,
-                                  style_key_in_field_spec: str):
+class RenderPlan(section_emitter.SectionEmitter):
     """
-    Добавляет отформатированные поля задачи в существующий параграф.
-    Версия "v1.0" до сложных исправлений многострочности.
+    Скомпилированное оформление разделов 'Перечень изменений' и 'Настройки системы' для конкретного документа.
+
+    Конфиг стилей читается один раз: для каждого вида параграфа (заголовки H1-H3, задача, "нет задач") и каждого
+    оформления текста один раз строится эталонный элемент через обычные функции (add_heading, set_run_font,
+    format_run, paragraph_format), и его w:pPr / w:rPr сохраняется как шаблон. При выводе задач шаблоны только
+    копируются в новые элементы, поэтому XML совпадает с XML прямых вызовов, а стили, Pt(...) и опции полей
+    в цикле по задачам не вычисляются. Новые параграфы вставляются перед w:sectPr тела документа без поиска
+    по всем уже добавленным параграфам.
     """
-    content_added_to_paragraph_this_field_iteration = False
-
-    for field_spec in fields_to_display:
-        internal_name = field_spec.get('internal_name')
-        value = task_dict.get(internal_name)
-        original_value_str = str(value) if value is not None else ""
-        stripped_value_str = original_value_str.strip()
-
-        if not stripped_value_str:
-            if internal_name == 'task_report_text':
-                original_value_str = "Нет описания."
-                stripped_value_str = original_value_str
-            elif internal_name == 'setup_instructions':
-                original_value_str = "Инструкции отсутствуют."
-                stripped_value_str = original_value_str
-            else:
-                logger.debug(f"Поле '{internal_name}' пустое или состоит из пробелов, пропускаем.")
-                continue
-
-        style_options = field_spec.get(style_key_in_field_spec, {})
-
-        if content_added_to_paragraph_this_field_iteration and style_options.get('new_line_before', False):
-            paragraph.add_run().add_break()
-
-        prefix = style_options.get('prefix', '')
-        if prefix:
-            _apply_field_style_to_run(paragraph.add_run(prefix), style_options, default_font_name, default_font_size)
-            content_added_to_paragraph_this_field_iteration = True
-
-        label = field_spec.get('report_label', '')
-        if label:
-            _apply_field_style_to_run(paragraph.add_run(label + (" " if stripped_value_str else "")), style_options,
-                                      default_font_name, default_font_size)
-            content_added_to_paragraph_this_field_iteration = True
-
-        if style_options.get('multiline', False) and '\n' in original_value_str:
-            lines = [line for line in original_value_str.splitlines() if line.strip()]
-            for i, line_text in enumerate(lines):
-                if i > 0: paragraph.add_run().add_break()
-                _apply_field_style_to_run(paragraph.add_run(line_text), style_options, default_font_name,
-                                          default_font_size)
-                content_added_to_paragraph_this_field_iteration = True
-        elif stripped_value_str:
-            _apply_field_style_to_run(paragraph.add_run(stripped_value_str), style_options, default_font_name,
-                                      default_font_size)
-            content_added_to_paragraph_this_field_iteration = True
-
-        suffix = style_options.get('suffix', '')
-        if suffix:
-            _apply_field_style_to_run(paragraph.add_run(suffix), style_options, default_font_name, default_font_size)
-            content_added_to_paragraph_this_field_iteration = True
+
+    def __init__(self, document, styles_config: dict, fields_schema, style_registry=None):
+        fonts = styles_config.get('fonts', {})
+        font_sizes = styles_config.get('font_sizes', {})
+        para_spacing = styles_config.get('paragraph_spacing', {})
+        self.default_font = fonts.get('default', DEFAULT_FONT)
+        self.task_font_size = font_sizes.get('task_item', TASK_ITEM_FONT_SIZE_PT_VAL)
+        self._document = document
+        self._style_registry = style_registry
+        self._body = document.element.body
+        self._body_sect_pr = self._body.sectPr  # Параметры раздела - всегда последний элемент тела документа
+        self._run_formats = {}
+
+        heading1_spacing = (para_spacing.get('before_heading1', para_spacing.get('after_title', 24)),
+                            para_spacing.get('after_heading1', 12))
+        heading2_spacing = (para_spacing.get('before_heading2', 8), para_spacing.get('after_heading2', 4))
+        heading3_spacing = (para_spacing.get('before_heading3', 4), para_spacing.get('after_heading3', 2))
+        self.heading1 = self._compile_heading(1, heading1_spacing, fonts.get('heading1', None),
+                                              font_sizes.get('heading1', None), bold=True)
+        self.heading2 = self._compile_heading(2, heading2_spacing, fonts.get('heading2', None),
+                                              font_sizes.get('heading2', None), bold=True)
+        self.heading3 = self._compile_heading(3, heading3_spacing, fonts.get('heading3', None),
+                                              font_sizes.get('heading3', None), italic=True)
+
+        task_paragraph_style_id = _task_paragraph_style_id(style_registry, para_spacing)
+        list_item_after = para_spacing.get('list_item_after', 6)
+        # В режиме именованных стилей отступы задач заданы в стиле абзаца
+        task_spacing = (None, None) if task_paragraph_style_id is not None else (
+            para_spacing.get('list_item_before', 0), list_item_after)
+        self.task_paragraph = self._compile_list_paragraph(task_paragraph_style_id, task_spacing)
+        self.changes_no_tasks_paragraph = self._compile_list_paragraph(task_paragraph_style_id, (0, list_item_after))
+        self.setup_no_tasks_paragraph = self._compile_list_paragraph(
+            task_paragraph_style_id, (para_spacing.get('list_item_before', 0), list_item_after))
+
+        self.task_text_format = self.run_format(self.default_font, self.task_font_size)
+        self.task_bold_format = self.run_format(self.default_font, self.task_font_size, bold=True)
+        self.task_italic_format = self.run_format(self.default_font, self.task_font_size, italic=True)
+
+        self.key_field = fields_schema.key
+        self.summary_field = fields_schema.summary
+        self.setup_instructions_field = fields_schema.setup_instructions
+        self.changes_fields = [self._compile_field(display_field) for display_field in fields_schema.changes_fields]
+        self.setup_fields = [self._compile_field(display_field) for display_field in fields_schema.setup_fields]
+        logger.debug(f"План вывода разделов построен: оформлений текста {len(self._run_formats)}, полей "
+                     f"'Перечня изменений' {len(self.changes_fields)}, 'Настроек системы' {len(self.setup_fields)}.")
+
+    def run_format(self, font_name=None, size_pt_val=None, bold=None, italic=None, use_style_registry=True):
+        """Шаблон w:rPr (или None - без оформления) для указанного оформления текста; строится один раз."""
+        style_registry = self._style_registry if use_style_registry else None
+        format_key = (font_name, size_pt_val, bold, italic, style_registry is not None)
+        if format_key not in self._run_formats:
+            scratch_paragraph = self._document.add_paragraph()
+            scratch_run = scratch_paragraph.add_run()
+            format_run(scratch_run, style_registry, font_name, size_pt_val, bold, italic)
+            run_properties = scratch_run._r.rPr
+            self._run_formats[format_key] = deepcopy(run_properties) if run_properties is not None else None
+            self._body.remove(scratch_paragraph._p)
+        return self._run_formats[format_key]
+
+    def add_paragraph(self, paragraph_format):
+        """Добавляет в конец документа пустой параграф с оформлением из шаблона w:pPr."""
+        p_element = OxmlElement('w:p')
+        if paragraph_format is not None: p_element.append(deepcopy(paragraph_format))
+        if self._body_sect_pr is not None:
+            self._body_sect_pr.addprevious(p_element)
+        else:
+            self._body.append(p_element)
+        return Paragraph(p_element, self._document._body)
+
+    @staticmethod
+    def add_run(paragraph, text: str, run_format):
+        run = paragraph.add_run(text)
+        if run_format is not None: run._r.insert(0, deepcopy(run_format))
+        return run
+
+    def _compile_heading(self, level: int, spacing: tuple, font_name, size_pt_val, bold=None, italic=None) -> tuple:
+        scratch_heading = self._document.add_heading("", level=level)
+        scratch_heading.paragraph_format.space_before = Pt(int(spacing[0]))
+        scratch_heading.paragraph_format.space_after = Pt(int(spacing[1]))
+        paragraph_format = deepcopy(scratch_heading._p.pPr)
+        self._body.remove(scratch_heading._p)
+        # Заголовки всегда оформляются напрямую (см. NamedStyleRegistry)
+        return paragraph_format, self.run_format(font_name, size_pt_val, bold, italic, use_style_registry=False)
+
+    def _compile_list_paragraph(self, list_paragraph_style_id, spacing: tuple):
+        scratch_paragraph = _add_list_paragraph(self._document, list_paragraph_style_id)
+        space_before_pt, space_after_pt = spacing
+        if space_before_pt is not None: scratch_paragraph.paragraph_format.space_before = Pt(int(space_before_pt))
+        if space_after_pt is not None: scratch_paragraph.paragraph_format.space_after = Pt(int(space_after_pt))
+        paragraph_format = scratch_paragraph._p.pPr
+        paragraph_format = deepcopy(paragraph_format) if paragraph_format is not None else None
+        self._body.remove(scratch_paragraph._p)
+        return paragraph_format
+
+    def _compile_field(self, display_field) -> section_emitter.FieldRenderInstruction:
+        style_options = display_field.style
+        run_format = self.run_format(style_options.get('font_name', self.default_font),
+                                     style_options.get('font_size', self.task_font_size),
+                                     style_options.get('bold', False), style_options.get('italic', False))
+        return section_emitter.FieldRenderInstruction(display_field, run_format)
 
 
 # --- Основные функции генерации секций ---
@@ -185,7 +324,7 @@ def create_title_section(document, report_title, logo_path, styles_config):
     logger.info(f"Заголовок отчета добавлен (Уровень 0): '{report_title}'")
 
 
-def create_microservices_version_table(document, versions_data, styles_config):
+def create_microservices_version_table(document, versions_data, styles_config, style_registry=None):
     if not versions_data:
         logger.warning("Нет данных для таблицы версий МС. Таблица не будет создана.")
         return
@@ -225,7 +364,7 @@ def create_microservices_version_table(document, versions_data, styles_config):
             p.alignment = WD_ALIGN_PARAGRAPH.CENTER
             for old_run in p.runs: p._element.remove(old_run._element)
             run = p.add_run(header_texts[i]);
-            set_run_font(run, font_name=default_font, size_pt_val=table_header_font_size_val, bold=True)
+            format_run(run, style_registry, font_name=default_font, size_pt_val=table_header_font_size_val, bold=True)
             if table_header_bg_color_hex:
                 shd = OxmlElement('w:shd');
                 shd.set(qn('w:val'), 'clear');
@@ -244,7 +383,7 @@ def create_microservices_version_table(document, versions_data, styles_config):
                 p = cell_obj.paragraphs[0]
                 for old_run in p.runs: p._element.remove(old_run._element)
                 run = p.add_run(cell_texts[i]);
-                set_run_font(run, font_name=default_font, size_pt_val=table_content_font_size_val)
+                format_run(run, style_registry, font_name=default_font, size_pt_val=table_content_font_size_val)
         except Exception as e:
             logger.warning(f"Ошибка доб. строки в таблицу ({item}): {e}", exc_info=True)
 
@@ -273,7 +412,8 @@ def create_microservices_version_table(document, versions_data, styles_config):
     logger.info("Таблица версий МС создана.")
 
 
-def create_changes_section(document, grouped_data, styles_config, fields_mapping_config, report_config):
+def create_changes_section(document, grouped_data, styles_config, fields_mapping_config, report_config,
+                           style_registry=None, render_plan=None):
     logger.info("Создание раздела 'Перечень изменений'...")
     fonts = styles_config.get('fonts', {});
     font_sizes = styles_config.get('font_sizes', {})
@@ -294,205 +434,57 @@ def create_changes_section(document, grouped_data, styles_config, fields_mapping
         pf.space_after = Pt(int(para_spacing.get('list_item_after', 6)))
         return
 
+    fields_schema = field_schema.ensure_field_schema(fields_mapping_config)
+    if render_plan is None:
+        render_plan = RenderPlan(document, styles_config, fields_schema, style_registry)
+
     changes_title_text = section_titles.get('main_changes', "Перечень изменений")
-    h1_changes = document.add_heading(changes_title_text, level=1)
-    if h1_changes.runs:
-        set_run_font(h1_changes.runs[0], font_name=fonts.get('heading1', None),
-                     size_pt_val=font_sizes.get('heading1', None), bold=True)
-    pf_h1c = h1_changes.paragraph_format
-    pf_h1c.space_before = Pt(int(para_spacing.get('before_heading1', para_spacing.get('after_title', 24))))
-    pf_h1c.space_after = Pt(int(para_spacing.get('after_heading1', 12)))
-
-    fields_for_display = sorted(
-        [f for f in fields_mapping_config if f.get('display_in_changes', False)],
-        key=lambda f: f.get('changes_order', 99)
-    )
+    render_plan.add_heading(changes_title_text, render_plan.heading1)
+
+    fields_for_display = render_plan.changes_fields
     if not fields_for_display:
         logger.warning("Не настроены поля для отображения в 'Перечне изменений'.")
 
-    key_internal_name_for_fallback = _get_internal_name_from_mapping(fields_mapping_config, 'issue key', 'issue_key')
-
     for ms_name, types_dict in grouped_data.items():
-        h2_ms = document.add_heading(ms_name, level=2)
-        if h2_ms.runs:
-            set_run_font(h2_ms.runs[0], font_name=fonts.get('heading2', None),
-                         size_pt_val=font_sizes.get('heading2', None), bold=True)
-        pf_h2ms = h2_ms.paragraph_format
-        pf_h2ms.space_before = Pt(int(para_spacing.get('before_heading2', 8)))
-        pf_h2ms.space_after = Pt(int(para_spacing.get('after_heading2', 4)))
-
-        for issue_type, tasks_list in types_dict.items():
-            h3_type = document.add_heading(issue_type, level=3)
-            if h3_type.runs:
-                set_run_font(h3_type.runs[0], font_name=fonts.get('heading3', None),
-                             size_pt_val=font_sizes.get('heading3', None), italic=True)
-            pf_h3t = h3_type.paragraph_format
-            pf_h3t.space_before = Pt(int(para_spacing.get('before_heading3', 4)))
-            pf_h3t.space_after = Pt(int(para_spacing.get('after_heading3', 2)))
-
-            if not tasks_list:
-                try:
-                    p_no = document.add_paragraph(style='ListBullet')
-                except KeyError:
-                    p_no = document.add_paragraph()
-                set_run_font(p_no.add_run("Нет задач этого типа."), font_name=default_font, size_pt_val=task_font_size,
-                             italic=True)
-                pf = p_no.paragraph_format;
-                pf.space_before = Pt(0);
-                pf.space_after = Pt(int(para_spacing.get('list_item_after', 6)))
-                continue
-
-            for task_dict in tasks_list:
-                current_list_style = 'ListBullet'
-                try:
-                    p_task = document.add_paragraph(style=current_list_style)
-                except KeyError:
-                    logger.warning(f"Стиль '{current_list_style}' не найден.");
-                    p_task = document.add_paragraph()
-
-                if fields_for_display:
-                    _add_task_fields_to_paragraph(p_task, task_dict, fields_for_display,
-                                                  default_font, task_font_size, 'changes_style')
-                else:
-                    key_val = task_dict.get(key_internal_name_for_fallback, "")
-                    desc_val = task_dict.get('task_report_text', "Нет текста.")
-                    if key_val: set_run_font(p_task.add_run(f"{key_val}: "), font_name=default_font,
-                                             size_pt_val=task_font_size, bold=True)
-                    set_run_font(p_task.add_run(desc_val), font_name=default_font, size_pt_val=task_font_size)
-
-                pf = p_task.paragraph_format
-                pf.space_before = Pt(int(para_spacing.get('list_item_before', 0)))
-                pf.space_after = Pt(int(para_spacing.get('list_item_after', 6)))
+        render_plan.add_changes_microservice(ms_name, types_dict)
     logger.info("Раздел 'Перечень изменений' создан.")
 
 
-def create_setup_section(document, grouped_setup_data, styles_config, fields_mapping_config, report_config):
+def create_setup_section(document, grouped_setup_data, styles_config, fields_mapping_config, report_config,
+                         style_registry=None, render_plan=None):
     logger.info("--- НАЧАЛО: Создание раздела 'Настройки системы' ---")
     logger.debug(f"Полученные grouped_setup_data (тип: {type(grouped_setup_data)}): "
                  f"{grouped_setup_data if grouped_setup_data is not None and len(grouped_setup_data) < 5 else 'Данные присутствуют или слишком большие для лога'}")
     if grouped_setup_data is not None and isinstance(grouped_setup_data, dict):
         logger.debug(f"Ключи в grouped_setup_data: {list(grouped_setup_data.keys())}")
 
-    fonts = styles_config.get('fonts', {});
-    font_sizes = styles_config.get('font_sizes', {})
-    para_spacing = styles_config.get('paragraph_spacing', {});
     section_titles = report_config.get('report_section_titles', {})
-    default_font = fonts.get('default', DEFAULT_FONT)
-    task_font_size = font_sizes.get('task_item', TASK_ITEM_FONT_SIZE_PT_VAL)
 
     if not grouped_setup_data:
         logger.info("Нет данных для 'Настроек системы' (grouped_setup_data пуст или None). Раздел будет пропущен.")
         return
 
+    fields_schema = field_schema.ensure_field_schema(fields_mapping_config)
+    if render_plan is None:
+        render_plan = RenderPlan(document, styles_config, fields_schema, style_registry)
+
     setup_title_text = section_titles.get('system_setup', "Настройки системы (Заголовок по умолчанию)")
     logger.debug(f"Заголовок для раздела Настройки: '{setup_title_text}'")
 
     if not setup_title_text or not setup_title_text.strip():
         logger.warning("Текст заголовка для раздела 'Настройки системы' пуст. Заголовок H1 не будет добавлен.")
     else:
-        h1_setup = document.add_heading(setup_title_text, level=1)
+        render_plan.add_heading(setup_title_text, render_plan.heading1)
         logger.info(f"Добавлен заголовок H1 для Настроек: '{setup_title_text}'")
-        if h1_setup.runs:
-            h1_font_cfg_setup = fonts.get('heading1', None)
-            h1_size_cfg_setup = font_sizes.get('heading1', None)
-            logger.debug(f"Стилизация H1 для Настроек: шрифт={h1_font_cfg_setup}, размер={h1_size_cfg_setup}")
-            set_run_font(h1_setup.runs[0], font_name=h1_font_cfg_setup, size_pt_val=h1_size_cfg_setup, bold=True)
-        else:
-            logger.warning(f"У заголовка H1 (Настройки) '{setup_title_text}' нет runs для стилизации.")
 
-        pf_h1s = h1_setup.paragraph_format
-        pf_h1s.space_before = Pt(int(para_spacing.get('before_heading1', para_spacing.get('after_title', 24))))
-        pf_h1s.space_after = Pt(int(para_spacing.get('after_heading1', 12)))
-
-    fields_for_setup_display = sorted(
-        [f for f in fields_mapping_config if f.get('display_in_setup', False)],
-        key=lambda f: f.get('setup_order', 99)
-    )
+    fields_for_setup_display = render_plan.setup_fields
     if not fields_for_setup_display:
         logger.warning(
             "Не настроены поля для отображения в 'Настройках системы' (display_in_setup: true). Задачи могут быть не отображены или отображены некорректно.")
 
-    key_internal_name_fb_setup = _get_internal_name_from_mapping(fields_mapping_config, 'issue key', 'issue_key')
-    summary_internal_name_fb_setup = _get_internal_name_from_mapping(fields_mapping_config, 'summary', 'summary_text',
-                                                                     ['summary'])
-    setup_instr_internal_name_fb_setup = _get_internal_name_from_mapping(fields_mapping_config,
-                                                                         'custom field (инструкция по установке)',
-                                                                         'setup_instructions')
-
     logger.debug(f"Количество микросервисов для настроек: {len(grouped_setup_data) if grouped_setup_data else 0}")
     for ms_name, tasks_list in grouped_setup_data.items():
-        logger.debug(f"Обработка микросервиса для настроек: '{ms_name}'")
-        if not ms_name or not ms_name.strip():
-            logger.warning("Имя микросервиса для настроек пустое. Заголовок H2 не будет добавлен.")
-        else:
-            h2_ms_setup = document.add_heading(ms_name, level=2)
-            logger.info(f"Добавлен заголовок H2 для Настроек (МС): '{ms_name}'")
-            if h2_ms_setup.runs:
-                h2_font_cfg_setup = fonts.get('heading2', None)
-                h2_size_cfg_setup = font_sizes.get('heading2', None)
-                logger.debug(
-                    f"Стилизация H2 для Настроек (МС '{ms_name}'): шрифт={h2_font_cfg_setup}, размер={h2_size_cfg_setup}")
-                set_run_font(h2_ms_setup.runs[0], font_name=h2_font_cfg_setup, size_pt_val=h2_size_cfg_setup, bold=True)
-            else:
-                logger.warning(f"У заголовка H2 (Настройки, МС '{ms_name}') нет runs для стилизации.")
-
-            pf_h2ms_s = h2_ms_setup.paragraph_format
-            pf_h2ms_s.space_before = Pt(int(para_spacing.get('before_heading2', 8)))
-            pf_h2ms_s.space_after = Pt(int(para_spacing.get('after_heading2', 4)))
-
-        if not tasks_list:
-            logger.debug(f"Для МС '{ms_name}' (Настройки) нет задач с инструкциями.")
-            try:
-                p_no = document.add_paragraph(style='ListBullet')
-            except KeyError:
-                p_no = document.add_paragraph()
-            set_run_font(p_no.add_run("Нет инструкций по настройке для этого компонента."),
-                         font_name=default_font, size_pt_val=task_font_size, italic=True)
-            pf = p_no.paragraph_format
-            pf.space_before = Pt(int(para_spacing.get('list_item_before', 0)))
-            pf.space_after = Pt(int(para_spacing.get('list_item_after', 6)))
-            continue
-
-        logger.debug(f"Для МС '{ms_name}' (Настройки) найдено задач: {len(tasks_list)}")
-        for task_dict in tasks_list:
-            current_list_style = 'ListBullet'
-            try:
-                p_task = document.add_paragraph(style=current_list_style)
-                logger.debug(
-                    f"  Добавлен параграф для задачи (Настройки, стиль {current_list_style}): {task_dict.get(key_internal_name_fb_setup, 'ID?')} ")
-            except KeyError:
-                logger.warning(f"Стиль '{current_list_style}' не найден. Используется обычный параграф.")
-                p_task = document.add_paragraph()
-
-            if fields_for_setup_display:
-                _add_task_fields_to_paragraph(p_task, task_dict, fields_for_setup_display,
-                                              default_font, task_font_size, 'setup_style')
-            else:
-                logger.debug(
-                    f"  Используется фоллбэк для полей задачи {task_dict.get(key_internal_name_fb_setup, 'ID?')} в 'Настройках системы'.")
-                key_val = task_dict.get(key_internal_name_fb_setup, "")
-                summary_val = task_dict.get(summary_internal_name_fb_setup, "")
-                instr_val = task_dict.get(setup_instr_internal_name_fb_setup, "Инструкции отсутствуют.")
-
-                header_parts_fb = [p for p in [key_val, summary_val] if p]
-                header_text_fb = ": ".join(header_parts_fb) if header_parts_fb else "Инструкция"
-
-                run_h = p_task.add_run(header_text_fb)
-                set_run_font(run_h, font_name=default_font, size_pt_val=task_font_size, bold=True)
-
-                if instr_val and instr_val != "Инструкции отсутствуют.":
-                    if header_text_fb and header_text_fb != "Инструкция":
-                        p_task.add_run().add_break()
-
-                    instr_lines_fb = instr_val.splitlines()
-                    for i_fb, line_fb in enumerate(instr_lines_fb):
-                        if i_fb > 0 and line_fb.strip(): p_task.add_run().add_break()
-                        if line_fb.strip():
-                            set_run_font(p_task.add_run(line_fb), font_name=default_font, size_pt_val=task_font_size)
-
-            pf = p_task.paragraph_format
-            pf.space_before = Pt(int(para_spacing.get('list_item_before', 0)))
-            pf.space_after = Pt(int(para_spacing.get('list_item_after', 6)))
+        render_plan.add_setup_microservice(ms_name, tasks_list)
     logger.info("--- ЗАВЕРШЕНИЕ: Создание раздела 'Настройки системы' ---")
 
 
@@ -501,15 +493,24 @@ def generate_report_docx(output_filename, report_title_text, logo_full_path,
                          grouped_data_for_changes,
                          grouped_data_for_setup,  # Это правильное имя параметра
                          main_config_for_titles,
-                         fields_mapping_for_details
+                         fields_mapping_for_details,
+                         metrics=None
                          ):
     logger.info(f"Начало генерации DOCX отчета: {output_filename}")
+    render_stage = stage_metrics.start_stage(metrics, "docx_render", unit="задач")
     doc = Document()
+    fields_mapping_for_details = field_schema.ensure_field_schema(fields_mapping_for_details)
+
+    style_registry = None
+    if word_styles_config.get('use_named_styles', False):
+        style_registry = NamedStyleRegistry(doc)  # Оформление текста - ссылками на стили, а не w:rPr в каждом run
+        logger.info("Режим именованных стилей Word: оформление задается стилями документа.")
 
     create_title_section(doc, report_title_text, logo_full_path, word_styles_config)
-    create_microservices_version_table(doc, microservice_versions_list, word_styles_config)
+    create_microservices_version_table(doc, microservice_versions_list, word_styles_config, style_registry)
+    render_plan = RenderPlan(doc, word_styles_config, fields_mapping_for_details, style_registry)
     create_changes_section(doc, grouped_data_for_changes, word_styles_config, fields_mapping_for_details,
-                           main_config_for_titles)
+                           main_config_for_titles, style_registry, render_plan)
 
     logger.info("--- ПЕРЕД ВЫЗОВОМ create_setup_section В generate_report_docx ---")
     # ИСПРАВЛЕНИЕ ЗДЕСЬ: используем grouped_data_for_setup (имя параметра функции)
@@ -523,15 +524,18 @@ def generate_report_docx(output_filename, report_title_text, logo_full_path,
         logger.debug("grouped_data_for_setup is None (передан в generate_report_docx)")
 
     create_setup_section(doc, grouped_data_for_setup, word_styles_config, fields_mapping_for_details,
-                         main_config_for_titles)
+                         main_config_for_titles, style_registry, render_plan)
     logger.info("--- ПОСЛЕ ВЫЗОВА create_setup_section В generate_report_docx ---")
+    render_stage.finish(items=sum(section_emitter.count_section_tasks(grouped_data_for_changes,
+                                                                      grouped_data_for_setup)))
 
     try:
         output_dir = os.path.dirname(output_filename)
         if output_dir and not os.path.exists(output_dir):
             os.makedirs(output_dir);
             logger.info(f"Создана директория: {output_dir}")
-        doc.save(output_filename)
+        with stage_metrics.start_stage(metrics, "docx_save"):
+            doc.save(output_filename)
         logger.info(f"Отчет успешно сохранен: {output_filename}")
     except Exception as e:
         logger.error(f"Не удалось сохранить документ {output_filename}: {e}", exc_info=True)
\ No newline at end of file
@@ -0,0 +1,359 @@
+import os
+from collections import OrderedDict
+from . import csv_parser
+from . import data_processor
+from . import stage_metrics
+from . import logger_config  # Относительный импорт
+
+# Модули построения документов (python-docx, lxml) импортируются на этапах генерации: report_generator,
+# docx_stream_writer, preview_renderer
+
+logger = logger_config.setup_logger(__name__)
+
+DEFAULT_DOCX_FILE = "output/ReleaseNotes_default.docx"
+DEFAULT_METRICS_FILE = "output/Release_Notes_{global_release_version}.metrics.json"
+# Формат предпросмотра (preview_renderer.PREVIEW_*) -> (флаг в config.json, ключ шаблона имени файла,
+# шаблон по умолчанию)
+PREVIEW_OUTPUTS = {
+    "html": ('generate_html', 'output_report_file_html', "output/Release_Notes_{global_release_version}.html"),
+    "markdown": ('generate_markdown', 'output_report_file_md', "output/Release_Notes_{global_release_version}.md"),
+}
+
+
+class LoadedTaskData:
+    """
+    Загруженная и проиндексированная выгрузка JIRA - общая часть всех отчетов по одному CSV.
+
+    raw_df - исходный DataFrame (None в потоковом режиме csv_chunk_size, когда файл целиком не хранится),
+    version_index - data_processor.VersionIndex, processed_df - задачи после process_initial_data, если они уже
+    подготовлены при загрузке (потоковый режим: только задачи отчета, data_processor.select_reportable_tasks),
+    иначе None.
+    """
+
+    def __init__(self, raw_df, version_index, processed_df=None):
+        self.raw_df = raw_df
+        self.version_index = version_index
+        self.processed_df = processed_df
+
+
+def import_document_modules():
+    """
+    Импортирует модули построения документов заранее. Нужно перед запуском пула процессов (fork): иначе каждый
+    процесс импортировал бы python-docx заново.
+    """
+    from . import docx_stream_writer, preview_renderer, report_generator
+
+
+def build_microservice_config(main_cfg: dict) -> dict:
+    """Настройки извлечения микросервисов из config.json для data_processor."""
+    return {
+        "microservice_source_field_csv": main_cfg.get('microservice_source_field_csv'),
+        "microservice_prefix_mapping": main_cfg.get('microservice_prefix_mapping', {})
+    }
+
+
+def build_sort_config(main_cfg: dict) -> dict:
+    """Настройки сортировки групп и задач из config.json для data_processor."""
+    return {
+        "sort_microservices_by": main_cfg.get('sort_microservices_by', "name_asc"),
+        "sort_issue_types_order": main_cfg.get('sort_issue_types_order', []),
+        "sort_tasks_within_group_by": main_cfg.get('sort_tasks_within_group_by', "issue_key"),
+        "priority_order": main_cfg.get('priority_order', [])
+    }
+
+
+def load_task_data(main_cfg: dict, fields_cfg, project_root: str, usecols=None, allow_chunked: bool = True,
+                   metrics=None):
+    """
+    Этап 2 (и 3, 4 в потоковом режиме): чтение CSV и индекс версий.
+
+    :param usecols: Проекция колонок CSV (csv_parser.ColumnProjection). None - вычислить по fields_cfg
+                    (если включен csv_read_only_used_columns).
+    :param allow_chunked: False - всегда читать файл целиком (нужно, когда по одной выгрузке строится несколько
+                          отчетов с разными наборами полей).
+    :param metrics: stage_metrics.PipelineMetrics для замеров этапов (None - без замеров).
+    :return: LoadedTaskData или None в случае ошибки.
+    """
+    input_csv_relative_path = main_cfg.get('input_csv_file')
+    if not input_csv_relative_path:
+        logger.critical("Путь к CSV не указан в config.json.")
+        return None
+    csv_full_path = os.path.join(project_root, input_csv_relative_path)
+    csv_encoding = main_cfg.get('csv_encoding', 'utf-8')
+    csv_delimiter = main_cfg.get('csv_delimiter', ',')
+    csv_chunk_size = int(main_cfg.get('csv_chunk_size', 0) or 0) if allow_chunked else 0
+    csv_engine = main_cfg.get('csv_engine', csv_parser.CSV_ENGINE_C)
+    microservice_config = build_microservice_config(main_cfg)
+
+    if usecols is None and main_cfg.get('csv_read_only_used_columns', True):
+        # Колонки, не используемые в отчете, не читаются из CSV вовсе
+        usecols = data_processor.build_csv_column_projection(fields_cfg, microservice_config)
+
+    if csv_chunk_size > 0:
+        # Потоковый режим: исходный CSV целиком в памяти не держим, этапы 3, 4 выполняются по блокам
+        logger.info(f"Потоковое чтение CSV блоками по {csv_chunk_size} строк (этапы 3, 4 выполняются по блокам).")
+        if csv_engine != csv_parser.CSV_ENGINE_C:
+            logger.info(f"csv_engine '{csv_engine}' не поддерживает чтение блоками. Используется "
+                        f"'{csv_parser.CSV_ENGINE_C}'.")
+        stream_stage = stage_metrics.start_stage(metrics, "csv_stream_processing", unit="строк")
+        csv_chunks = csv_parser.load_csv_in_chunks(file_path=csv_full_path, encoding=csv_encoding,
+                                                   delimiter=csv_delimiter, chunk_size=csv_chunk_size,
+                                                   usecols=usecols)
+        if csv_chunks is None:
+            logger.critical("Ошибка CSV.")
+            return None
+        try:
+            processed_df, version_index, csv_rows = data_processor.process_data_in_chunks(
+                csv_chunks, fields_mapping_config=fields_cfg, microservice_config=microservice_config,
+                main_app_config=main_cfg)
+        except Exception as e:
+            logger.critical(f"Ошибка потоковой обработки CSV: {e}.")
+            return None
+        if processed_df.columns.empty:
+            logger.critical("Ошибка потоковой обработки CSV.")
+            return None
+        stream_stage.finish(items=csv_rows)
+        if metrics is not None: metrics.add_counter('csv_rows', csv_rows)
+        logger.info(f"CSV успешно обработан потоково. Строк: {csv_rows}, задач отчета (с МС): {len(processed_df)}")
+        return LoadedTaskData(None, version_index, processed_df)
+
+    csv_cache_dir_relative = main_cfg.get('csv_cache_dir')
+    csv_stage = stage_metrics.start_stage(metrics, "csv_load", unit="строк")
+    raw_df = csv_parser.load_csv_to_dataframe(
+        file_path=csv_full_path, encoding=csv_encoding, delimiter=csv_delimiter,
+        cache_dir=os.path.join(project_root, csv_cache_dir_relative) if csv_cache_dir_relative else None,
+        cache_max_size_mb=main_cfg.get('csv_cache_max_size_mb', 1024), usecols=usecols, engine=csv_engine)
+    if raw_df is None or raw_df.empty:
+        logger.critical("Ошибка CSV.")
+        return None
+    csv_stage.finish(items=len(raw_df))
+    if metrics is not None: metrics.add_counter('csv_rows', len(raw_df))
+    logger.info(f"CSV успешно загружен. Строк: {len(raw_df)}")
+
+    # Один проход по колонкам версий для всех последующих этапов
+    with stage_metrics.start_stage(metrics, "version_index", items=len(raw_df), unit="строк"):
+        version_index = data_processor.build_version_index(raw_df, microservice_config)
+    return LoadedTaskData(raw_df, version_index)
+
+
+def process_tasks(main_cfg: dict, fields_cfg, task_data: LoadedTaskData, metrics=None):
+    """Этапы 3, 4: обработка данных задач (если они не подготовлены при загрузке). Пустой DataFrame при ошибке."""
+    if task_data.processed_df is not None:
+        return task_data.processed_df
+    logger.info("--- Этапы 3, 4: Обработка данных задач ---")
+    with stage_metrics.start_stage(metrics, "process_initial_data", unit="задач") as process_stage:
+        processed_df = data_processor.process_initial_data(
+            df_raw=task_data.raw_df,
+            fields_mapping_config=fields_cfg,
+            microservice_config=build_microservice_config(main_cfg),
+            main_app_config=main_cfg,
+            version_index=task_data.version_index
+        )
+        process_stage.items = len(processed_df)
+    return processed_df
+
+
+def safe_file_name_part(value) -> str:
+    return str(value).replace("/", "-").replace("\\", "-").replace(":", "-").replace("*", "-").replace(
+        "?", "-").replace("\"", "").replace("<", "").replace(">", "").replace("|", "").strip()
+
+
+def _output_path(project_root: str, output_file_template: str, safe_gv_filename: str, variant_name: str) -> str:
+    """Абсолютный путь к файлу отчета по шаблону с плейсхолдерами {global_release_version} и {variant}."""
+    return os.path.join(project_root, output_file_template.format(
+        global_release_version=safe_gv_filename, variant=safe_file_name_part(variant_name or "default")))
+
+
+def _filter_microservices(grouped_data: OrderedDict, microservices) -> OrderedDict:
+    if microservices is None: return grouped_data
+    return OrderedDict((ms_name, ms_data) for ms_name, ms_data in grouped_data.items() if ms_name in microservices)
+
+
+def generate_report(main_cfg: dict, fields_cfg, styles_cfg: dict, task_data: LoadedTaskData, project_root: str,
+                    processed_df=None, microservices=None, global_versions=None, variant_name: str = None,
+                    metrics=None):
+    """
+    Этапы после загрузки CSV: версии, обработка и группировка задач, генерация Word-документа и предпросмотров.
+    Общие данные (task_data, processed_df) не изменяются, поэтому по ним можно строить несколько отчетов.
+
+    :param processed_df: Задачи после process_initial_data для fields_cfg. None - подготовить здесь.
+    :param microservices: Набор имен МС, которые попадают в отчет (разделы и таблица версий). None - все.
+    :param global_versions: Набор глобальных версий: в отчет попадают только задачи с меткой '<версия> (GLOBAL)'
+                            одной из них, версии компонентов и глобальная версия определяются по этим задачам.
+                            None - все задачи.
+    :param variant_name: Имя варианта отчета (пакетный режим) для плейсхолдера {variant} в имени файла.
+    :param metrics: stage_metrics.PipelineMetrics. Если задан, этапы замеряются, а в конце метрики пишутся в лог
+                    и в metrics_file.
+    :return: Список путей к созданным файлам (DOCX и предпросмотры, см. generate_docx, generate_html,
+             generate_markdown) или None в случае ошибки.
+    """
+    microservice_config = build_microservice_config(main_cfg)
+    version_index = task_data.version_index
+    global_version_rows = None
+    if global_versions is not None:
+        if version_index is None or not version_index.has_row_data():
+            logger.critical("Отбор задач по глобальным версиям недоступен: нет построчного индекса версий "
+                            "(потоковый режим csv_chunk_size).")
+            return None
+        # Задачи варианта - строки с меткой одной из глобальных версий; индекс версий - только по этим строкам
+        global_version_rows = version_index.rows_with_global_versions(global_versions)
+        version_index = version_index.subset(global_version_rows, global_versions)
+        logger.info(f"Отбор по глобальным версиям {sorted(global_versions)}: задач {len(global_version_rows)}.")
+    global_release_ver = main_cfg.get('global_release_version', "N/A")
+    version_stage = stage_metrics.start_stage(metrics, "version_detection")
+    if main_cfg.get("auto_detect_global_version", False):
+        logger.info("--- Авто-определение глобальной версии ---")
+        detected_gv = data_processor.detect_global_release_version(task_data.raw_df, {
+            "microservice_source_field_csv": microservice_config["microservice_source_field_csv"]},
+                                                                   version_index=version_index)
+        if detected_gv:
+            global_release_ver = detected_gv
+        else:
+            logger.warning(f"Не удалось авто-определить глоб.версию. Используется: '{global_release_ver}'")
+    else:
+        logger.info(f"Используется глоб.версия из config: '{global_release_ver}'")
+
+    if main_cfg.get("auto_detect_component_versions", False):
+        logger.info("--- Авто-определение версий компонентов ---")
+        microservice_versions_for_table_data = data_processor.detect_component_versions_from_data(
+            task_data.raw_df, microservice_config, version_index=version_index)
+    else:
+        microservice_versions_for_table_data = main_cfg.get('microservices_versions_for_table', [])
+        logger.info("Используются версии компонентов из config.")
+    version_stage.finish()
+    if microservices is not None:
+        microservice_versions_for_table_data = [item for item in microservice_versions_for_table_data
+                                                if item.get('microservice') in microservices]
+
+    if processed_df is None:
+        processed_df = process_tasks(main_cfg, fields_cfg, task_data, metrics)
+    # Ошибка - DataFrame без колонок; в потоковом режиме задач отчета (с МС) может не оказаться вовсе
+    if processed_df.columns.empty:
+        logger.critical("Ошибка process_initial_data.")
+        return None
+    logger.info(f"Данные после process_initial_data. Задач: {len(processed_df)}")
+    if global_version_rows is not None:
+        processed_df = processed_df.iloc[global_version_rows]
+
+    logger.info("--- Этапы 5, 8: Группировка для 'Перечня изменений' и 'Настроек системы' ---")
+    # Одна развертка задач по МС; раздел настроек - отфильтрованное представление той же группировки
+    grouping_stage = stage_metrics.start_stage(metrics, "grouping", items=len(processed_df), unit="задач")
+    task_grouping = data_processor.build_task_grouping(
+        processed_df=processed_df, sort_config=build_sort_config(main_cfg), fields_mapping_config=fields_cfg
+    )
+    grouped_and_sorted_tasks_for_changes = _filter_microservices(task_grouping.changes_view(), microservices)
+    if not grouped_and_sorted_tasks_for_changes:
+        logger.warning("Нет данных для 'Перечня изменений'.")
+        grouped_and_sorted_tasks_for_changes = OrderedDict()
+    else:
+        logger.info("Группировка для 'Перечня изменений' завершена.")
+
+    grouped_tasks_for_setup_section = _filter_microservices(task_grouping.setup_view(), microservices)
+    if not grouped_tasks_for_setup_section:
+        logger.warning("Нет данных для 'Настроек системы'.")
+        grouped_tasks_for_setup_section = OrderedDict()
+    else:
+        logger.info("Подготовка для 'Настроек системы' завершена.")
+    grouping_stage.finish()
+
+    report_title_template = main_cfg.get('report_title_template', "Отчет по релизу версия {global_release_version}")
+    report_title = report_title_template.format(global_release_version=global_release_ver)
+    safe_gv_filename = safe_file_name_part(global_release_ver)
+    if not safe_gv_filename: safe_gv_filename = "UNKNOWN_VERSION"; logger.warning(
+        f"Глоб.версия ('{global_release_ver}') пустая. Имя файла: '{safe_gv_filename}'.")
+
+    output_paths = []
+    if main_cfg.get('generate_docx', True):
+        output_full_path_docx = _output_path(project_root, main_cfg.get('output_report_file_docx', DEFAULT_DOCX_FILE),
+                                             safe_gv_filename, variant_name)
+        _generate_docx(main_cfg, styles_cfg, fields_cfg, project_root, output_full_path_docx, report_title,
+                       microservice_versions_for_table_data, grouped_and_sorted_tasks_for_changes,
+                       grouped_tasks_for_setup_section, metrics)
+        output_paths.append(output_full_path_docx)
+
+    for preview_format, (enabled_key, file_template_key, default_file_template) in PREVIEW_OUTPUTS.items():
+        if not main_cfg.get(enabled_key, False): continue
+        logger.info(f"--- Предпросмотр ({preview_format}) ---")
+        output_full_path_preview = _output_path(project_root, main_cfg.get(file_template_key, default_file_template),
+                                                safe_gv_filename, variant_name)
+        with stage_metrics.start_stage(metrics, f"preview_{preview_format}"):
+            from . import preview_renderer
+            preview_saved = preview_renderer.generate_report_preview(
+                output_full_path_preview, preview_format, report_title, microservice_versions_for_table_data,
+                grouped_and_sorted_tasks_for_changes, grouped_tasks_for_setup_section, main_cfg, fields_cfg)
+        if preview_saved:
+            output_paths.append(output_full_path_preview)
+
+    if not output_paths:
+        logger.warning("Не создано ни одного файла отчета (generate_docx, generate_html, generate_markdown).")
+    if metrics is not None:
+        _record_report_counters(metrics, grouped_and_sorted_tasks_for_changes, grouped_tasks_for_setup_section,
+                                output_paths)
+        metrics.log_summary()
+        metrics.write_json(_output_path(project_root, main_cfg.get('metrics_file', DEFAULT_METRICS_FILE),
+                                        safe_gv_filename, variant_name))
+    return output_paths
+
+
+def _record_report_counters(metrics, grouped_changes: OrderedDict, grouped_setup: OrderedDict, output_paths: list):
+    """
+    Счетчики результата: задачи отчета (после отбора по МС и глобальным версиям), выведенные блоки задач по разделам,
+    run в документе и размер файлов. Строки CSV считает счетчик 'csv_rows' (load_task_data).
+    """
+    from . import section_emitter
+    # Задача с несколькими МС - одна запись TaskRecord во всех своих группах: уникальные задачи считаются по записям
+    report_tasks = {id(task) for types_dict in grouped_changes.values() for tasks_list in types_dict.values()
+                    for task in tasks_list}
+    report_tasks.update(id(task) for tasks_list in grouped_setup.values() for task in tasks_list)
+    metrics.add_counter('tasks', len(report_tasks))
+    metrics.add_counter('microservices', len(grouped_changes))
+    changes_tasks_count, setup_tasks_count = section_emitter.count_section_tasks(grouped_changes, grouped_setup)
+    metrics.add_counter('tasks_rendered_changes', changes_tasks_count)
+    metrics.add_counter('tasks_rendered_setup', setup_tasks_count)
+    for output_path in output_paths:
+        if not os.path.exists(output_path): continue
+        file_extension = os.path.splitext(output_path)[1].lstrip('.').lower()
+        metrics.add_counter(f'output_bytes_{file_extension}', os.path.getsize(output_path))
+        if file_extension == 'docx':
+            metrics.add_counter('docx_runs', stage_metrics.count_docx_runs(output_path))
+
+
+def _generate_docx(main_cfg: dict, styles_cfg: dict, fields_cfg, project_root: str, output_full_path_docx: str,
+                   report_title: str, microservice_versions_for_table_data: list, grouped_and_sorted_tasks_for_changes,
+                   grouped_tasks_for_setup_section, metrics=None):
+    logger.info("--- Этапы 6, 7, 8: Генерация Word-документа ---")
+    from . import report_generator
+    logo_relative_path = main_cfg.get('logo_path')
+    logo_full_abs_path = None
+    if logo_relative_path:
+        logo_full_abs_path = os.path.join(project_root, logo_relative_path)
+        if not os.path.exists(logo_full_abs_path):
+            logger.warning(f"Файл логотипа не найден: {logo_full_abs_path}");
+            logo_full_abs_path = None
+
+    docx_backend = main_cfg.get('docx_backend', "python-docx")
+    render_workers = main_cfg.get('render_workers', 1)
+    fragment_cache_dir_relative = main_cfg.get('fragment_cache_dir')
+    docx_backend_options = {}
+    if docx_backend == "streaming":
+        from . import docx_stream_writer
+        docx_generator = docx_stream_writer  # document.xml пишется потоково, без дерева всего отчета в памяти
+        docx_backend_options['render_workers'] = render_workers
+        if fragment_cache_dir_relative:
+            docx_backend_options['fragment_cache_dir'] = os.path.join(project_root, fragment_cache_dir_relative)
+            docx_backend_options['fragment_cache_max_size_mb'] = main_cfg.get('fragment_cache_max_size_mb', 256)
+    else:
+        if docx_backend != "python-docx":
+            logger.warning(f"Неизвестный docx_backend '{docx_backend}'. Используется 'python-docx'.")
+        if render_workers != 1:
+            logger.warning("render_workers поддерживается только для docx_backend 'streaming'. Настройка игнорируется.")
+        if fragment_cache_dir_relative:
+            logger.warning("fragment_cache_dir поддерживается только для docx_backend 'streaming'. Кэш не используется.")
+        docx_generator = report_generator
+    docx_generator.generate_report_docx(
+        output_filename=output_full_path_docx, report_title_text=report_title,
+        logo_full_path=logo_full_abs_path, microservice_versions_list=microservice_versions_for_table_data,
+        word_styles_config=styles_cfg, grouped_data_for_changes=grouped_and_sorted_tasks_for_changes,
+        grouped_data_for_setup=grouped_tasks_for_setup_section, main_config_for_titles=main_cfg,
+        fields_mapping_for_details=fields_cfg, metrics=metrics, **docx_backend_options
+    )
@@ -0,0 +1,152 @@
+from . import field_schema
+from . import logger_config  # Относительный импорт
+
+logger = logger_config.setup_logger(__name__)
+
+# Общая логика вывода разделов для всех форматов отчета. Модуль не импортирует python-docx: его использует и
+# предпросмотр HTML / Markdown (preview_renderer)
+
+
+class FieldRenderInstruction:
+    """Готовая инструкция вывода одного поля задачи: тексты обрамления и шаблон оформления run."""
+    __slots__ = ('internal_name', 'source_name', 'missing_value', 'empty_text', 'new_line_before', 'prefix', 'label',
+                 'multiline', 'suffix', 'run_format')
+
+    def __init__(self, display_field, run_format):
+        style_options = display_field.style
+        self.internal_name = display_field.internal_name
+        self.source_name = display_field.source_name  # Поле записи задачи (см. field_schema.SETUP_RECORD_FIELDS)
+        self.missing_value = display_field.missing_value
+        # Пустые обязательные поля выводятся с текстом-заглушкой, остальные пустые поля пропускаются
+        self.empty_text = {'task_report_text': "Нет описания.",
+                           'setup_instructions': "Инструкции отсутствуют."}.get(self.internal_name)
+        self.new_line_before = style_options.get('new_line_before', False)
+        self.prefix = style_options.get('prefix', '')
+        self.label = display_field.report_label
+        self.multiline = style_options.get('multiline', False)
+        self.suffix = style_options.get('suffix', '')
+        self.run_format = run_format
+
+
+class SectionEmitter:
+    """
+    Вывод содержимого разделов поверх примитивов плана (add_paragraph, add_run) и его готовых оформлений
+    (heading*, task_*, *_fields, key_field, ...). Общая часть report_generator.RenderPlan (python-docx),
+    docx_stream_writer.XmlRenderPlan (готовый XML) и preview_renderer.PreviewRenderPlan (HTML / Markdown), поэтому
+    все форматы выводят задачи одинаково.
+    """
+
+    def add_heading(self, text: str, heading_format):
+        """Аналог document.add_heading с последующим оформлением заголовка (шрифт первого run, отступы)."""
+        paragraph_format, run_format = heading_format
+        paragraph = self.add_paragraph(paragraph_format)
+        if text: self.add_run(paragraph, text, run_format)
+        return paragraph
+
+    def add_task_fields(self, paragraph, task_dict, field_instructions: list):
+        """Добавляет отформатированные поля задачи в параграф по готовым инструкциям раздела."""
+        content_added_to_paragraph = False
+        for instruction in field_instructions:
+            value = task_dict.get(instruction.source_name, instruction.missing_value)
+            original_value_str = str(value) if value is not None else ""
+            stripped_value_str = original_value_str.strip()
+
+            if not stripped_value_str:
+                if instruction.empty_text is None: continue
+                original_value_str = stripped_value_str = instruction.empty_text
+
+            if content_added_to_paragraph and instruction.new_line_before:
+                paragraph.add_run().add_break()
+
+            if instruction.prefix:
+                self.add_run(paragraph, instruction.prefix, instruction.run_format)
+                content_added_to_paragraph = True
+
+            if instruction.label:
+                self.add_run(paragraph, instruction.label + (" " if stripped_value_str else ""), instruction.run_format)
+                content_added_to_paragraph = True
+
+            if instruction.multiline and '\n' in original_value_str:
+                lines = [line for line in original_value_str.splitlines() if line.strip()]
+                for i, line_text in enumerate(lines):
+                    if i > 0: paragraph.add_run().add_break()
+                    self.add_run(paragraph, line_text, instruction.run_format)
+                    content_added_to_paragraph = True
+            elif stripped_value_str:
+                self.add_run(paragraph, stripped_value_str, instruction.run_format)
+                content_added_to_paragraph = True
+
+            if instruction.suffix:
+                self.add_run(paragraph, instruction.suffix, instruction.run_format)
+                content_added_to_paragraph = True
+
+    def add_changes_microservice(self, ms_name: str, types_dict: dict):
+        """Блок одного МС в 'Перечне изменений': заголовок H2, группы по типам задач (H3) и задачи."""
+        self.add_heading(ms_name, self.heading2)
+
+        for issue_type, tasks_list in types_dict.items():
+            self.add_heading(issue_type, self.heading3)
+
+            if not tasks_list:
+                p_no = self.add_paragraph(self.changes_no_tasks_paragraph)
+                self.add_run(p_no, "Нет задач этого типа.", self.task_italic_format)
+                continue
+
+            for task_dict in tasks_list:
+                p_task = self.add_paragraph(self.task_paragraph)
+
+                if self.changes_fields:
+                    self.add_task_fields(p_task, task_dict, self.changes_fields)
+                else:
+                    key_val = task_dict.get(self.key_field, "")
+                    desc_val = task_dict.get('task_report_text', "Нет текста.")
+                    if key_val: self.add_run(p_task, f"{key_val}: ", self.task_bold_format)
+                    self.add_run(p_task, desc_val, self.task_text_format)
+
+    def add_setup_microservice(self, ms_name: str, tasks_list: list):
+        """Блок одного МС в 'Настройках системы': заголовок H2 и задачи с инструкциями."""
+        if not ms_name or not ms_name.strip():
+            logger.warning("Имя микросервиса для настроек пустое. Заголовок H2 не будет добавлен.")
+        else:
+            self.add_heading(ms_name, self.heading2)
+            logger.info(f"Добавлен заголовок H2 для Настроек (МС): '{ms_name}'")
+
+        if not tasks_list:
+            logger.debug("Для МС '%s' (Настройки) нет задач с инструкциями.", ms_name)
+            p_no = self.add_paragraph(self.setup_no_tasks_paragraph)
+            self.add_run(p_no, "Нет инструкций по настройке для этого компонента.", self.task_italic_format)
+            return
+
+        logger.debug("Для МС '%s' (Настройки) найдено задач: %d", ms_name, len(tasks_list))
+        for task_dict in tasks_list:
+            p_task = self.add_paragraph(self.task_paragraph)
+
+            if self.setup_fields:
+                self.add_task_fields(p_task, task_dict, self.setup_fields)
+            else:
+                key_val = task_dict.get(self.key_field, "")
+                summary_val = task_dict.get(self.summary_field, field_schema.MISSING_SUMMARY_TEXT)
+                instr_val = task_dict.get(self.setup_instructions_field, "Инструкции отсутствуют.")
+
+                header_parts_fb = [p for p in [key_val, summary_val] if p]
+                header_text_fb = ": ".join(header_parts_fb) if header_parts_fb else "Инструкция"
+
+                self.add_run(p_task, header_text_fb, self.task_bold_format)
+
+                if instr_val and instr_val != "Инструкции отсутствуют.":
+                    if header_text_fb and header_text_fb != "Инструкция":
+                        p_task.add_run().add_break()
+
+                    instr_lines_fb = instr_val.splitlines()
+                    for i_fb, line_fb in enumerate(instr_lines_fb):
+                        if i_fb > 0 and line_fb.strip(): p_task.add_run().add_break()
+                        if line_fb.strip():
+                            self.add_run(p_task, line_fb, self.task_text_format)
+
+
+def count_section_tasks(grouped_data_for_changes, grouped_data_for_setup) -> tuple:
+    """Количество выводимых блоков задач: (в 'Перечне изменений', в 'Настройках системы')."""
+    changes_tasks_count = sum(len(tasks_list) for types_dict in (grouped_data_for_changes or {}).values()
+                              for tasks_list in types_dict.values())
+    setup_tasks_count = sum(len(tasks_list) for tasks_list in (grouped_data_for_setup or {}).values())
+    return changes_tasks_count, setup_tasks_count
@@ -0,0 +1,270 @@
+import cProfile
+import datetime
+import json
+import os
+import pstats
+import re
+import sys
+import time
+import tracemalloc
+import zipfile
+from collections import defaultdict
+from . import logger_config  # Относительный импорт
+
+try:
+    import resource  # Нет в Windows: пиковый RSS тогда не замеряется
+except ImportError:
+    resource = None
+
+logger = logger_config.setup_logger(__name__)
+
+BYTES_IN_MB = 1024 * 1024
+_DOCX_RUN_RE = re.compile(rb'<w:r[ >/]')
+# Ветви профиля короче доли времени этапа не разворачиваются в collapsed stacks (иначе число путей растет лавинно)
+COLLAPSED_MIN_SHARE = 0.0005
+COLLAPSED_MAX_DEPTH = 200
+
+
+def peak_rss_mb():
+    """Пиковый RSS процесса в МБ с начала работы (None, если платформа не поддерживает замер)."""
+    if resource is None: return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss: в Linux - КБ, в macOS - байты
+    return peak_rss / BYTES_IN_MB if sys.platform == 'darwin' else peak_rss / 1024
+
+
+def _frame_label(func: tuple) -> str:
+    file_name, line_number, function_name = func
+    if file_name == '~':  # Встроенные функции: ('~', 0, "<method 'join' of 'str' objects>")
+        label = function_name
+    else:
+        label = f"{function_name} ({os.path.basename(file_name)}:{line_number})"
+    return label.replace(';', ',')
+
+
+def collapsed_stacks(profile_stats: pstats.Stats, root_label: str = None) -> list:
+    """
+    Строки формата collapsed stacks ('корень;...;функция микросекунды') для flamegraph.pl, speedscope и т.п.
+
+    cProfile хранит только пары вызывающий -> вызываемый, поэтому пути восстанавливаются от корневых функций
+    по дугам графа вызовов: время функции делится между путями пропорционально времени вызовов из каждого
+    вызывающего. Рекурсивные вызовы не разворачиваются, ветви короче COLLAPSED_MIN_SHARE времени этапа опускаются.
+
+    :param root_label: Общий корень всех стеков (имя этапа).
+    """
+    stats = profile_stats.stats
+    callees = defaultdict(list)
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees[caller].append((func, edge[3]))
+    min_seconds = profile_stats.total_tt * COLLAPSED_MIN_SHARE
+    stack_seconds = defaultdict(float)
+
+    def walk(func, path: tuple, path_funcs: frozenset, share: float):
+        _, _, self_seconds, total_seconds, _ = stats[func]
+        path = path + (_frame_label(func),)
+        if self_seconds * share > 0: stack_seconds[';'.join(path)] += self_seconds * share
+        if len(path) >= COLLAPSED_MAX_DEPTH: return
+        for callee, edge_total_seconds in callees.get(func, ()):
+            callee_total_seconds = stats[callee][3]
+            if callee in path_funcs or callee_total_seconds <= 0: continue
+            callee_share = share * edge_total_seconds / callee_total_seconds
+            if callee_total_seconds * callee_share < min_seconds: continue
+            walk(callee, path, path_funcs | {callee}, callee_share)
+
+    root_path = (root_label.replace(';', ','),) if root_label else ()
+    for root in (func for func, func_stats in stats.items() if not func_stats[4]):
+        walk(root, root_path, frozenset((root,)), 1.0)
+    return [f"{stack} {round(seconds * 1_000_000)}" for stack, seconds in sorted(stack_seconds.items())
+            if round(seconds * 1_000_000) > 0]
+
+
+def count_docx_runs(docx_path: str):
+    """Количество w:r в word/document.xml готового отчета (None, если файл не удалось прочитать)."""
+    try:
+        with zipfile.ZipFile(docx_path) as docx_zip:
+            return len(_DOCX_RUN_RE.findall(docx_zip.read('word/document.xml')))
+    except (OSError, KeyError, zipfile.BadZipFile) as e:
+        logger.warning(f"Метрики: не удалось посчитать run в {docx_path}: {e}")
+        return None
+
+
+class StageRecord:
+    """
+    Замер одного этапа: время (стенное и процессорное), пиковый RSS процесса на конце этапа и его прирост за этап,
+    прирост и пик памяти Python (tracemalloc, если включен) и пропускная способность по items.
+    Если у PipelineMetrics задан profile_dir, этап выполняется под cProfile (profile_files - пути к его профилям).
+    Запись, созданная без PipelineMetrics, ничего не замеряет (finish - пустая операция).
+    """
+
+    def __init__(self, name: str, items=None, unit: str = None, metrics=None):
+        self.name = name
+        self.items = items
+        self.unit = unit
+        self.wall_seconds = None
+        self.cpu_seconds = None
+        self.peak_rss_mb = None
+        self.rss_growth_mb = None
+        self.traced_delta_mb = None
+        self.traced_peak_mb = None
+        self.profile_files = None
+        self._metrics = metrics
+        self._started = None
+        self._profiler = None
+        if metrics is None: return
+        self._start_rss_mb = peak_rss_mb()
+        self._start_traced = None
+        if tracemalloc.is_tracing():
+            self._start_traced = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        if metrics.profile_dir:
+            self._profiler = cProfile.Profile()
+        self._start_cpu = time.process_time()
+        self._started = time.perf_counter()
+        if self._profiler is not None: self._profiler.enable()
+
+    def finish(self, items=None):
+        """Завершает замер и добавляет запись в PipelineMetrics. items - количество обработанных элементов."""
+        if self._started is None: return
+        if self._profiler is not None: self._profiler.disable()
+        self.wall_seconds = time.perf_counter() - self._started
+        self.cpu_seconds = time.process_time() - self._start_cpu
+        self._started = None
+        if items is not None: self.items = items
+        if self._start_traced is not None and tracemalloc.is_tracing():
+            traced_current, traced_peak = tracemalloc.get_traced_memory()
+            self.traced_delta_mb = (traced_current - self._start_traced) / BYTES_IN_MB
+            self.traced_peak_mb = (traced_peak - self._start_traced) / BYTES_IN_MB
+        self.peak_rss_mb = peak_rss_mb()
+        if self.peak_rss_mb is not None and self._start_rss_mb is not None:
+            self.rss_growth_mb = self.peak_rss_mb - self._start_rss_mb
+        self._metrics.stages.append(self)
+        if self._profiler is not None:
+            self.profile_files = self._metrics.write_stage_profile(len(self._metrics.stages), self.name, self._profiler)
+            self._profiler = None
+
+    @property
+    def throughput(self):
+        """Элементов в секунду (None, если items не задан)."""
+        if not self.items or not self.wall_seconds: return None
+        return self.items / self.wall_seconds
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.finish()
+        return False
+
+    def to_dict(self) -> dict:
+        def rounded(value, digits):
+            return None if value is None else round(value, digits)
+        return {
+            'stage': self.name, 'wall_seconds': rounded(self.wall_seconds, 6), 'cpu_seconds': rounded(self.cpu_seconds, 6),
+            'peak_rss_mb': rounded(self.peak_rss_mb, 1), 'rss_growth_mb': rounded(self.rss_growth_mb, 1),
+            'traced_delta_mb': rounded(self.traced_delta_mb, 2), 'traced_peak_mb': rounded(self.traced_peak_mb, 2),
+            'items': self.items, 'unit': self.unit, 'items_per_second': rounded(self.throughput, 1),
+            'profile_files': self.profile_files,
+        }
+
+
+class PipelineMetrics:
+    """
+    Метрики одного запуска конвейера: замеры этапов (StageRecord) и счетчики результата
+    (задачи, run в документе, размер файлов). Этапы не вкладываются друг в друга.
+
+    profile_dir - директория профилей (режим --profile): каждый этап выполняется под cProfile и сохраняется как
+    NN_<этап>.pstats (для pstats, snakeviz) и NN_<этап>.collapsed (collapsed stacks для flamegraph.pl, speedscope).
+    """
+
+    def __init__(self, trace_memory: bool = False, profile_dir: str = None):
+        self.profile_dir = profile_dir
+        self.stages = []
+        self.counters = {}
+        self.started_at = datetime.datetime.now()
+        self._started = time.perf_counter()
+        self._started_cpu = time.process_time()
+        self._tracing_started_here = False
+        if trace_memory: self.start_memory_tracing()
+
+    def start_memory_tracing(self):
+        """Включает tracemalloc (заметно замедляет выделение памяти, поэтому только по настройке)."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing_started_here = True
+
+    def stop_memory_tracing(self):
+        if self._tracing_started_here:
+            tracemalloc.stop()
+            self._tracing_started_here = False
+
+    def stage(self, name: str, items=None, unit: str = None) -> StageRecord:
+        """Начинает замер этапа; завершается StageRecord.finish() или выходом из with."""
+        return StageRecord(name, items, unit, self)
+
+    def write_stage_profile(self, stage_number: int, stage_name: str, profiler: cProfile.Profile):
+        """Сохраняет профиль этапа. Возвращает пути к .pstats и .collapsed или None в случае ошибки."""
+        profile_base_path = os.path.join(self.profile_dir, f"{stage_number:02d}_{stage_name}")
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            profile_stats = pstats.Stats(profiler)
+            profile_stats.dump_stats(profile_base_path + ".pstats")
+            with open(profile_base_path + ".collapsed", 'w', encoding='utf-8') as f:
+                f.writelines(line + "\n" for line in collapsed_stacks(profile_stats, stage_name))
+        except OSError as e:
+            logger.error(f"Не удалось сохранить профиль этапа '{stage_name}' в {self.profile_dir}: {e}")
+            return None
+        logger.info(f"Профиль этапа '{stage_name}': {profile_base_path}.pstats, {profile_base_path}.collapsed")
+        return [profile_base_path + ".pstats", profile_base_path + ".collapsed"]
+
+    def add_counter(self, name: str, value):
+        """Суммирует числовой счетчик (None не учитывается)."""
+        if value is None: return
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self) -> dict:
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'total_wall_seconds': round(time.perf_counter() - self._started, 6),
+            'total_cpu_seconds': round(time.process_time() - self._started_cpu, 6),
+            'peak_rss_mb': None if peak_rss_mb() is None else round(peak_rss_mb(), 1),
+            'trace_memory': tracemalloc.is_tracing(),
+            'profile_dir': self.profile_dir,
+            'stages': [stage.to_dict() for stage in self.stages],
+            'counters': dict(self.counters),
+        }
+
+    def log_summary(self):
+        """Таблица этапов в лог."""
+        header = (f"{'этап':<22} {'время, с':>9} {'CPU, с':>8} {'пик RSS, МБ':>12} {'+RSS, МБ':>9} "
+                  f"{'tracemalloc, МБ':>16} {'скорость':>18}")
+        lines = ["Метрики этапов:", header]
+        for stage in self.stages:
+            traced = "-" if stage.traced_delta_mb is None else \
+                f"{stage.traced_delta_mb:+.1f} / {stage.traced_peak_mb:.1f}"
+            speed = "-" if stage.throughput is None else f"{stage.throughput:,.0f} {stage.unit or ''}/с".replace(',', ' ')
+            lines.append(f"{stage.name:<22} {stage.wall_seconds:>9.3f} {stage.cpu_seconds:>8.3f} "
+                         f"{'-' if stage.peak_rss_mb is None else f'{stage.peak_rss_mb:.1f}':>12} "
+                         f"{'-' if stage.rss_growth_mb is None else f'{stage.rss_growth_mb:.1f}':>9} "
+                         f"{traced:>16} {speed:>18}")
+        lines.append("Счетчики: " + (", ".join(f"{name}={value}" for name, value in self.counters.items()) or "нет"))
+        logger.info("\n".join(lines))
+
+    def write_json(self, output_path: str) -> bool:
+        """Сохраняет метрики в JSON. Возвращает True, если файл сохранен."""
+        try:
+            output_dir = os.path.dirname(output_path)
+            if output_dir: os.makedirs(output_dir, exist_ok=True)
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            logger.error(f"Не удалось сохранить метрики {output_path}: {e}")
+            return False
+        logger.info(f"Метрики сохранены: {output_path}")
+        return True
+
+
+def start_stage(metrics, name: str, items=None, unit: str = None) -> StageRecord:
+    """Замер этапа в metrics; если метрики не собираются (metrics is None) - запись-заглушка."""
+    if metrics is None: return StageRecord(name, items, unit)
+    return metrics.stage(name, items, unit)
@@ -0,0 +1,68 @@
+"""
+Общие данные тестов генерации DOCX: небольшая синтетическая выгрузка (benchmarks/jira_csv_generator.py),
+прошедшая этапы конвейера, и построение word/document.xml любым бэкендом.
+"""
+import itertools
+import os
+import sys
+import zipfile
+
+import pytest
+
+current_tests_dir = os.path.dirname(os.path.abspath(__file__))
+project_root_dir = os.path.dirname(current_tests_dir)
+if project_root_dir not in sys.path:
+    sys.path.insert(0, project_root_dir)
+
+from benchmarks import jira_csv_generator
+from src import config_loader
+from src import csv_parser
+from src import data_processor
+from src import report_pipeline
+
+REPORT_FIXTURE_ROWS = 120
+
+
+@pytest.fixture(scope="session")
+def project_configs():
+    """(main_cfg, fields_mapping, word_styles) из configs/ проекта."""
+    main_cfg, fields_cfg, styles_cfg = config_loader.get_all_configs()
+    assert main_cfg and fields_cfg and styles_cfg
+    return main_cfg, fields_cfg, styles_cfg
+
+
+@pytest.fixture(scope="session")
+def report_inputs(project_configs, tmp_path_factory):
+    """Аргументы generate_report_docx (без output_filename) для синтетической выгрузки из REPORT_FIXTURE_ROWS задач."""
+    main_cfg, fields_cfg, styles_cfg = project_configs
+    csv_path = str(tmp_path_factory.mktemp("report_inputs") / "jira_export.csv")
+    jira_csv_generator.generate_jira_csv(csv_path, rows=REPORT_FIXTURE_ROWS,
+                                         prefix_weights={prefix: 1 for prefix in main_cfg['microservice_prefix_mapping']},
+                                         setup_ratio=0.4, description_words=(3, 12), extra_columns=0, seed=7)
+    microservice_config = report_pipeline.build_microservice_config(main_cfg)
+    df_raw = csv_parser.load_csv_to_dataframe(csv_path)
+    version_index = data_processor.build_version_index(df_raw, microservice_config)
+    processed_df = data_processor.process_initial_data(df_raw, fields_cfg, microservice_config, main_cfg,
+                                                       version_index=version_index)
+    task_grouping = data_processor.build_task_grouping(processed_df, report_pipeline.build_sort_config(main_cfg),
+                                                       fields_cfg)
+    return {
+        'report_title_text': "Отчет по релизу версия 2.3.1", 'logo_full_path': None,
+        'microservice_versions_list': version_index.component_versions_list(), 'word_styles_config': styles_cfg,
+        'grouped_data_for_changes': task_grouping.changes_view(), 'grouped_data_for_setup': task_grouping.setup_view(),
+        'main_config_for_titles': main_cfg, 'fields_mapping_for_details': fields_cfg,
+    }
+
+
+@pytest.fixture
+def render_document_xml(tmp_path):
+    """Функция (модуль бэкенда, аргументы generate_report_docx) -> байты word/document.xml сохраненного отчета."""
+    file_numbers = itertools.count()
+
+    def render(docx_generator, **report_arguments) -> bytes:
+        output_filename = str(tmp_path / f"report_{next(file_numbers)}.docx")
+        docx_generator.generate_report_docx(output_filename=output_filename, **report_arguments)
+        with zipfile.ZipFile(output_filename) as docx_zip:
+            return docx_zip.read("word/document.xml")
+
+    return render
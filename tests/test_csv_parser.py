@@ -0,0 +1,85 @@
+"""
+Движок csv_engine 'pyarrow' дает тот же DataFrame, что и движок 'c' (pandas.read_csv с na_filter=False): значения,
+типы колонок и имена колонок. Тесты пропускаются, если пакет pyarrow не установлен.
+
+Запуск из корня проекта:
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+current_tests_dir = os.path.dirname(os.path.abspath(__file__))
+project_root_dir = os.path.dirname(current_tests_dir)
+if project_root_dir not in sys.path:
+    sys.path.insert(0, project_root_dir)
+
+from src import csv_parser
+
+pytest.importorskip("pyarrow")
+
+CSV_SAMPLES = {
+    "nan_inf_na_strings": (
+        "Issue key,Float-like,Words,With empty,Inf only,Numbers with nan\n"
+        "PHB-1,nan,NA,inf,inf,1\n"
+        "PHB-2,inf,N/A,,-inf,nan\n"
+        "PHB-3,-inf,null,NaN,Infinity,2\n"
+        "PHB-4,1.5,None,1,1.5,NA\n"
+    ),
+    "numbers": (
+        "Issue key,Int,Big int,Huge int,Negative huge,Float,Int with empty\n"
+        "PHB-1,1,9223372036854775807,99999999999999999999,-99999999999999999999,1.5,1\n"
+        "PHB-2,2,18446744073709551615,18446744073709551616,-9223372036854775809,2e3,\n"
+        "PHB-3,-3,1,1,1,-0.25,3\n"
+    ),
+    "booleans": (
+        "Issue key,Bool,Bool with empty,Bool mixed case,Bool and text\n"
+        "PHB-1,True,True,TRUE,True\n"
+        "PHB-2,False,,false,yes\n"
+        "PHB-3,True,False,True,False\n"
+    ),
+    "duplicate_headers": (
+        "Summary,Issue key,Fix Version/s,Fix Version/s,Fix Version/s,,\n"
+        "Исправить вход,PHB-1,IN 1.2.0,FR 2.0.0,2.3.2 (GLOBAL),x,y\n"
+        "Добавить отчет,PHB-2,,WF 3.1.0,,,\n"
+    ),
+    "short_rows": (
+        "Summary,Issue key,Fix Version/s,Custom field (Инструкция по установке)\n"
+        "Исправить вход,PHB-1,IN 1.2.0,Перезапустить\n"
+        "Добавить отчет,PHB-2\n"
+        "Обновить схему,PHB-3,FR 2.0.1\n"
+    ),
+    "quoted_multiline": (
+        'Summary,Issue key,Description\n'
+        '"Текст, с запятой",PHB-1,"Первая строка\nвторая строка"\n'
+        '"""В кавычках""",PHB-2,""\n'
+    ),
+    "header_only": "Summary,Issue key,Fix Version/s\n",
+}
+
+
+def read_with_engine(csv_path: str, engine: str, usecols=None):
+    return csv_parser.load_csv_to_dataframe(csv_path, usecols=usecols, engine=engine)
+
+
+@pytest.mark.parametrize("sample_name", sorted(CSV_SAMPLES))
+def test_pyarrow_engine_matches_c_engine(tmp_path, sample_name):
+    csv_path = str(tmp_path / f"{sample_name}.csv")
+    with open(csv_path, "w", encoding="utf-8", newline="") as f:
+        f.write(CSV_SAMPLES[sample_name])
+    expected_df = read_with_engine(csv_path, csv_parser.CSV_ENGINE_C)
+    assert expected_df is not None
+    pd.testing.assert_frame_equal(read_with_engine(csv_path, csv_parser.CSV_ENGINE_PYARROW), expected_df)
+
+
+def test_pyarrow_engine_matches_c_engine_with_column_projection(tmp_path):
+    csv_path = str(tmp_path / "duplicate_headers.csv")
+    with open(csv_path, "w", encoding="utf-8-sig", newline="") as f:
+        f.write(CSV_SAMPLES["duplicate_headers"])
+    for usecols in (csv_parser.ColumnProjection(["Issue key"], ["Fix Version/s"]),
+                    csv_parser.ColumnProjection(["Нет такой колонки"], [])):
+        expected_df = read_with_engine(csv_path, csv_parser.CSV_ENGINE_C, usecols)
+        pd.testing.assert_frame_equal(read_with_engine(csv_path, csv_parser.CSV_ENGINE_PYARROW, usecols),
+                                      expected_df)
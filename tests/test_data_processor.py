@@ -0,0 +1,345 @@
+"""
+Этапы data_processor не изменяют входные DataFrame (защитные .copy() между этапами убраны): исходные данные CSV и
+processed_df после каждого этапа совпадают со своими снимками. Векторные этапы дают тот же результат, что и
+построчные реализации, которые они заменили (эталоны - функции rowwise_* ниже).
+
+Запуск из корня проекта:
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+import pandas as pd
+import pytest
+from packaging.version import InvalidVersion
+from packaging.version import parse as parse_version
+
+current_tests_dir = os.path.dirname(os.path.abspath(__file__))
+project_root_dir = os.path.dirname(current_tests_dir)
+if project_root_dir not in sys.path:
+    sys.path.insert(0, project_root_dir)
+
+from src import config_loader
+from src import csv_parser
+from src import data_processor
+from src import field_schema
+
+MICROSERVICE_CONFIG = {
+    "microservice_source_field_csv": "Fix Version/s",
+    "microservice_prefix_mapping": {"IN": "phobos-integration", "FR": "phobos-front", "WF": "sc-workflow"},
+}
+SORT_CONFIG = {
+    "sort_microservices_by": "name_asc",
+    "sort_issue_types_order": ["Bug", "Story", "Task"],
+    "sort_tasks_within_group_by": "priority",
+    "priority_order": ["Highest", "High", "Medium", "Low", "Lowest"],
+}
+MAIN_APP_CONFIG = {"links_label_text": "реализовано в рамках", "task_text_engine": "vectorized"}
+
+
+def rowwise_extract_microservice_and_version(version_code_str, prefix_mapping: dict):
+    """Прежний разбор ячейки версии: первый подходящий префикс в порядке config.json."""
+    if not isinstance(version_code_str, str) or not version_code_str.strip():
+        return None, None
+    vc_str = version_code_str.strip()
+    for prefix, full_name in prefix_mapping.items():
+        if vc_str.upper().startswith(prefix.upper()):
+            return (full_name, vc_str[len(prefix):].strip()) if len(vc_str) > len(prefix) else (full_name, None)
+    return None, None
+
+
+def rowwise_scan_versions(df_raw: pd.DataFrame, microservice_config: dict):
+    """
+    Прежний построчный обход колонок версий (iterrows).
+
+    :return: (МС каждой строки, версии компонентов, глобальная версия релиза).
+    """
+    prefix_mapping = microservice_config["microservice_prefix_mapping"]
+    version_columns = sorted(col for col in df_raw.columns
+                             if col.startswith(microservice_config["microservice_source_field_csv"]))
+    row_services, component_versions, global_versions = [], {}, set()
+    for _, row in df_raw.iterrows():
+        current_row_services = set()
+        for v_col in version_columns:
+            version_code_str = str(row.get(v_col, ""))
+            service_name, version_str = rowwise_extract_microservice_and_version(version_code_str, prefix_mapping)
+            if service_name: current_row_services.add(service_name)
+            if service_name and version_str:
+                try:
+                    version_obj = parse_version(version_str.split(" ")[0].split("(")[0])
+                except InvalidVersion:
+                    version_obj = None
+                if version_obj is not None and (service_name not in component_versions or
+                                                version_obj > component_versions[service_name]):
+                    component_versions[service_name] = version_obj
+            stripped_value = version_code_str.strip()
+            if "(GLOBAL)" in stripped_value.upper():
+                version_part = stripped_value.upper().split("(GLOBAL)")[0].strip()
+                cleaned_version_part = version_part.replace('(', '').replace(')', '').strip()
+                if cleaned_version_part and any(char.isdigit() for char in cleaned_version_part):
+                    global_versions.add(cleaned_version_part)
+        row_services.append(sorted(current_row_services))
+    versions_list = sorted(({'microservice': name, 'version': str(version_obj)}
+                            for name, version_obj in component_versions.items()), key=lambda x: x['microservice'])
+    return row_services, versions_list, (sorted(global_versions)[0] if global_versions else None)
+
+
+
+def rowwise_group_and_sort_tasks(processed_df: pd.DataFrame, sort_config: dict) -> dict:
+    """Прежний group_and_sort_tasks (iterrows + list.sort) на ключах задач: МС -> тип задачи -> [issue_key]."""
+    temp_grouped = {}
+    for _, task_row in processed_df.iterrows():
+        for ms_name in task_row["identified_microservices"]:
+            temp_grouped.setdefault(ms_name, {}).setdefault(task_row["issue_type"], []).append(task_row.to_dict())
+    priority_map = {p.lower(): i for i, p in enumerate(sort_config["priority_order"])}
+    sort_field = sort_config["sort_tasks_within_group_by"]
+    for types_dict in temp_grouped.values():
+        for tasks_list in types_dict.values():
+            if sort_field == "priority":
+                tasks_list.sort(key=lambda t: priority_map.get(str(t["priority"]).lower(), len(priority_map)))
+            else:
+                tasks_list.sort(key=lambda t: str(t[sort_field]))
+    sorted_grouped_tasks = {}
+    microservice_names = sorted(temp_grouped, reverse=sort_config["sort_microservices_by"] == "name_desc")
+    for ms_name in microservice_names:
+        types_dict = temp_grouped[ms_name]
+        ordered_types = [t for t in sort_config["sort_issue_types_order"] if t in types_dict]
+        ordered_types += sorted(t for t in types_dict if t not in ordered_types)
+        sorted_grouped_tasks[ms_name] = {task_type: [task["issue_key"] for task in types_dict[task_type]]
+                                         for task_type in ordered_types}
+    return sorted_grouped_tasks
+
+@pytest.fixture(scope="module")
+def fields_schema():
+    fields_mapping = config_loader.load_json_config(os.path.join(project_root_dir, "configs", "fields_mapping.json"))
+    return field_schema.build_field_schema(fields_mapping)
+
+
+@pytest.fixture
+def df_raw():
+    """Выгрузка Jira в том виде, в каком ее возвращает csv_parser (повторяющиеся колонки версий - с суффиксами)."""
+    return pd.DataFrame({
+        "Summary": ["Исправить вход", "Добавить отчет", "Обновить схему", "Без версий"],
+        "Issue key": ["PHB-3", "PHB-1", "PHB-2", "PHB-4"],
+        "Issue Type": ["Bug", "Story", "Task", "Bug"],
+        "Priority": ["Medium", "High", "Highest", "Low"],
+        "Fix Version/s": ["IN 1.2.0", "FR 2.0.1", "WF 3.1.0", ""],
+        "Fix Version/s.1": ["FR 2.0.0", "2.3.2 (GLOBAL)", "IN 1.3.0", ""],
+        "Custom field (Description for the customer)": ["", "Описание для клиента", "", ""],
+        "Custom field (Инструкция по установке)": ["", "Перезапустить сервис", "Выполнить миграцию", ""],
+        "Inward issue link (Relates)": ["PHB-10", "", "", ""],
+    })
+
+
+@pytest.fixture
+def processed_df(df_raw, fields_schema):
+    return data_processor.process_initial_data(df_raw, fields_schema, MICROSERVICE_CONFIG, MAIN_APP_CONFIG)
+
+
+def test_version_stages_do_not_modify_df_raw(df_raw):
+    df_raw_snapshot = df_raw.copy()
+    version_index = data_processor.build_version_index(df_raw, MICROSERVICE_CONFIG)
+    assert data_processor.detect_global_release_version(df_raw, MICROSERVICE_CONFIG, version_index) == "2.3.2"
+    assert data_processor.detect_component_versions_from_data(df_raw, MICROSERVICE_CONFIG, version_index) == [
+        {'microservice': 'phobos-front', 'version': '2.0.1'},
+        {'microservice': 'phobos-integration', 'version': '1.3.0'},
+        {'microservice': 'sc-workflow', 'version': '3.1.0'},
+    ]
+    pd.testing.assert_frame_equal(df_raw, df_raw_snapshot)
+
+
+def test_process_initial_data_does_not_modify_df_raw(df_raw, fields_schema):
+    df_raw_snapshot = df_raw.copy()
+    version_index = data_processor.build_version_index(df_raw, MICROSERVICE_CONFIG)
+    processed_df = data_processor.process_initial_data(df_raw, fields_schema, MICROSERVICE_CONFIG, MAIN_APP_CONFIG,
+                                                       version_index=version_index)
+    pd.testing.assert_frame_equal(df_raw, df_raw_snapshot)
+    assert "identified_microservices" not in df_raw.columns
+    assert "task_report_text" not in df_raw.columns
+    assert list(processed_df["identified_microservices"]) == [
+        ["phobos-front", "phobos-integration"], ["phobos-front"], ["phobos-integration", "sc-workflow"], []]
+
+
+def test_grouping_stages_do_not_modify_processed_df(processed_df, fields_schema):
+    processed_df_snapshot = processed_df.copy()
+    task_grouping = data_processor.build_task_grouping(processed_df, SORT_CONFIG, fields_schema)
+    grouped_tasks = data_processor.group_and_sort_tasks(processed_df, SORT_CONFIG, fields_schema)
+    setup_tasks = data_processor.prepare_setup_instructions_data(processed_df, fields_schema, SORT_CONFIG)
+    pd.testing.assert_frame_equal(processed_df, processed_df_snapshot)
+
+    assert [[task["issue_key"] for task in tasks] for tasks in grouped_tasks["phobos-front"].values()] == [
+        ["PHB-3"], ["PHB-1"]]
+    assert {ms_name: [task["issue_key"] for task in tasks] for ms_name, tasks in setup_tasks.items()} == {
+        "phobos-front": ["PHB-1"], "phobos-integration": ["PHB-2"], "sc-workflow": ["PHB-2"]}
+    assert list(task_grouping.changes_view()) == list(grouped_tasks)
+    assert list(task_grouping.setup_view()) == list(setup_tasks)
+    # Раздел настроек ссылается на те же записи task_table, что и 'Перечень изменений'
+    assert all(task is task_grouping.task_table[pos] for ms_name, positions in task_grouping.setup_index.items()
+               for task, pos in zip(task_grouping.setup_view()[ms_name], positions))
+
+
+def test_version_index_subset_for_global_versions(df_raw):
+    version_index = data_processor.build_version_index(df_raw, MICROSERVICE_CONFIG)
+    assert version_index.rows_with_global_versions([" 2.3.2"]) == [1]
+    subset_index = version_index.subset([1], ["2.3.2"])
+    assert subset_index.row_services == [["phobos-front"]]
+    assert subset_index.global_version_candidates == {"2.3.2"}
+    assert subset_index.component_versions_list() == [{'microservice': 'phobos-front', 'version': '2.0.1'}]
+
+
+def test_task_records_read_like_task_dicts(processed_df, fields_schema):
+    grouped_tasks = data_processor.group_and_sort_tasks(processed_df, SORT_CONFIG, fields_schema)
+    task = grouped_tasks["phobos-front"]["Story"][0]
+    task_dict = task.copy()
+    assert isinstance(task_dict, dict) and task == task_dict
+    assert len(task) == len(task_dict) and list(task) == list(task_dict)
+    assert dict(task.items()) == task_dict and list(task.values()) == list(task_dict.values())
+    assert task_dict["issue_key"] == "PHB-1"
+    task_dict["issue_key"] = "PHB-100"
+    assert task["issue_key"] == "PHB-1"
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3])
+def test_chunked_processing_matches_whole_file(df_raw, fields_schema, tmp_path, chunk_size):
+    csv_path = str(tmp_path / "jira_export.csv")
+    df_raw.rename(columns=lambda name: name.split(".")[0]).to_csv(csv_path, index=False)
+    whole_df = csv_parser.load_csv_to_dataframe(csv_path)
+    whole_version_index = data_processor.build_version_index(whole_df, MICROSERVICE_CONFIG)
+    whole_processed_df = data_processor.process_initial_data(whole_df, fields_schema, MICROSERVICE_CONFIG,
+                                                             MAIN_APP_CONFIG, version_index=whole_version_index)
+
+    chunks = csv_parser.load_csv_in_chunks(csv_path, chunk_size=chunk_size)
+    processed_df, version_index, rows_total = data_processor.process_data_in_chunks(
+        chunks, fields_schema, MICROSERVICE_CONFIG, MAIN_APP_CONFIG)
+    assert rows_total == len(df_raw)
+    pd.testing.assert_frame_equal(processed_df, data_processor.select_reportable_tasks(
+        whole_processed_df, fields_schema, MAIN_APP_CONFIG.get('sort_tasks_within_group_by')))
+    assert "PHB-4" not in set(processed_df["issue_key"])  # Задача без МС в отчет не попадает
+    assert version_index.component_versions_list() == whole_version_index.component_versions_list()
+    assert version_index.global_version_candidates == whole_version_index.global_version_candidates
+
+
+def test_version_index_matches_rowwise_scan():
+    # Повторяющиеся колонки версий (в том числе не по порядку), пустые и пробельные ячейки, префиксы без версии,
+    # неизвестные префиксы, нечитаемые версии и несколько глобальных версий
+    df_raw = pd.DataFrame({
+        "Issue key": ["PHB-1", "PHB-2", "PHB-3", "PHB-4", "PHB-5", "PHB-6"],
+        "Fix Version/s.2": ["", "WF 3.1.0 (hotfix)", "in 1.3", "   ", "", "FR 2.0.1"],
+        "Fix Version/s": ["IN 1.2.0", "", " fr 2.0.1 ", "", "XX 9.9.9", "IN abc"],
+        "Fix Version/s.1": ["IN 1.2.0", "2.3.2 (GLOBAL)", "IN 1.3.0", "", "(GLOBAL)", "2.3.1 (global)"],
+        "Fix Version/s.10": ["FR", "", "", "", "WF 3.0.9", " (2.3.3) (GLOBAL)"],
+    })
+    row_services, versions_list, global_version = rowwise_scan_versions(df_raw, MICROSERVICE_CONFIG)
+    version_index = data_processor.build_version_index(df_raw, MICROSERVICE_CONFIG)
+    assert version_index.row_services == row_services
+    assert version_index.component_versions_list() == versions_list
+    assert data_processor.detect_global_release_version(df_raw, MICROSERVICE_CONFIG, version_index) == global_version
+    assert row_services[3] == [] and global_version == "2.3.1"
+
+
+def test_vectorized_task_texts_match_legacy_engine(df_raw, fields_schema):
+    # Описание есть / только Summary / ничего (и ссылки) / пробельные значения
+    df_raw = pd.concat([df_raw, pd.DataFrame({
+        "Summary": ["  Только пробелы в описании ", "", "   "],
+        "Issue key": ["PHB-5", "PHB-6", "PHB-7"],
+        "Custom field (Description for the customer)": ["   ", "", " Описание "],
+        "Inward issue link (Relates)": [" PHB-11, PHB-12 ", "PHB-13", "  "],
+    })], ignore_index=True).fillna("")
+    legacy_df = data_processor.process_initial_data(df_raw, fields_schema, MICROSERVICE_CONFIG,
+                                                    dict(MAIN_APP_CONFIG, task_text_engine="legacy"))
+    vectorized_df = data_processor.process_initial_data(df_raw, fields_schema, MICROSERVICE_CONFIG, MAIN_APP_CONFIG)
+    # apply() в pandas >= 3.0 возвращает строковый dtype, векторная версия - object: сравниваются значения
+    pd.testing.assert_series_equal(vectorized_df["task_report_text"], legacy_df["task_report_text"], check_dtype=False)
+    assert list(vectorized_df["task_report_text"])[4:] == [
+        "Только пробелы в описании (реализовано в рамках: PHB-11, PHB-12)",
+        "Нет описания. (реализовано в рамках: PHB-13)", "Описание"]
+
+
+def test_task_texts_match_row_function_for_non_string_values(fields_schema):
+    # Колонки не из CSV: пропуски, числа и числовая колонка ссылок (0 - "ложное" значение)
+    processed_df = pd.DataFrame({
+        "issue_key": ["PHB-1", "PHB-2", "PHB-3", "PHB-4"],
+        "summary": [None, float("nan"), "Summary", 0],
+        "description_for_customer": [0, 1.5, None, ""],
+        "links_text": [0, 12, float("nan"), 3],
+    })
+    expected_texts = processed_df.apply(
+        lambda row: data_processor.prepare_task_description_text(row, fields_schema, links_label="см."), axis=1)
+    pd.testing.assert_series_equal(
+        data_processor.build_task_report_texts(processed_df, fields_schema, links_label="см."), expected_texts,
+        check_dtype=False)
+
+
+@pytest.mark.parametrize("sort_config", [
+    SORT_CONFIG,
+    dict(SORT_CONFIG, sort_microservices_by="name_desc", sort_issue_types_order=["Task", "Bug"]),
+    dict(SORT_CONFIG, sort_tasks_within_group_by="summary"),
+])
+def test_grouping_matches_rowwise_sort(fields_schema, sort_config):
+    # Одинаковые приоритеты и Summary (проверка устойчивости), приоритеты и типы не из конфигурации
+    processed_df = pd.DataFrame({
+        "issue_key": [f"PHB-{n}" for n in (9, 2, 7, 4, 5, 1, 8, 3, 6, 10)],
+        "summary": ["Б", "А", "Б", "В", "А", "Б", "А", "В", "Б", "А"],
+        "issue_type": ["Bug", "Epic", "Bug", "Story", "Improvement", "Bug", "Epic", "Story", "Bug", "Task"],
+        "priority": ["Low", "High", "Low", "Unknown", "High", "Highest", "", "Low", "Low", "High"],
+        "identified_microservices": [["phobos-front"], ["phobos-front", "sc-workflow"], ["phobos-front"],
+                                     ["sc-workflow"], ["phobos-front"], ["phobos-front", "sc-workflow"],
+                                     ["phobos-front"], [], ["phobos-front", "sc-workflow"], ["sc-workflow"]],
+        "task_report_text": ["Текст"] * 10,
+    })
+    grouped_tasks = data_processor.group_and_sort_tasks(processed_df, sort_config, fields_schema)
+    grouped_keys = {ms_name: {task_type: [task["issue_key"] for task in tasks] for task_type, tasks in types.items()}
+                    for ms_name, types in grouped_tasks.items()}
+    expected_keys = rowwise_group_and_sort_tasks(processed_df, sort_config)
+    assert grouped_keys == expected_keys
+    assert [list(types) for types in grouped_keys.values()] == [list(types) for types in expected_keys.values()]
+    assert list(grouped_keys) == list(expected_keys)
+
+
+def test_grouping_issue_type_rank_and_stable_order(fields_schema):
+    processed_df = pd.DataFrame({
+        "issue_key": ["PHB-5", "PHB-3", "PHB-4", "PHB-1", "PHB-2"],
+        "summary": ["Задача"] * 5,
+        "issue_type": ["Improvement", "Bug", "Epic", "Bug", "Task"],
+        "priority": ["High", "Low", "High", "Low", "High"],
+        "identified_microservices": [["phobos-front"]] * 5,
+        "task_report_text": ["Текст"] * 5,
+    })
+    grouped_tasks = data_processor.group_and_sort_tasks(processed_df, SORT_CONFIG, fields_schema)["phobos-front"]
+    # Сначала типы из sort_issue_types_order (без отсутствующего Story), затем остальные по алфавиту
+    assert list(grouped_tasks) == ["Bug", "Task", "Epic", "Improvement"]
+    # Равные приоритеты: исходный порядок строк
+    assert [task["issue_key"] for task in grouped_tasks["Bug"]] == ["PHB-3", "PHB-1"]
+
+
+def test_prefix_matcher_longest_prefix_wins():
+    for prefix_mapping in ({"IN": "phobos-integration", "INT": "phobos-internal"},
+                           {"INT": "phobos-internal", "IN": "phobos-integration"}):
+        matcher = data_processor.PrefixMatcher(prefix_mapping)
+        assert matcher.match("INT 2.0.0") == ("phobos-internal", "2.0.0")
+        assert matcher.match("IN 1.2.0") == ("phobos-integration", "1.2.0")
+        assert matcher.match("INT") == ("phobos-internal", None)
+
+
+def test_prefix_matcher_is_anchored_and_case_insensitive():
+    matcher = data_processor.PrefixMatcher(MICROSERVICE_CONFIG["microservice_prefix_mapping"])
+    assert matcher.match("  in 1.2.0 ") == ("phobos-integration", "1.2.0")
+    assert matcher.match("XIN 1.2.0") == (None, None)
+    assert matcher.match("2.3.2 (GLOBAL) IN") == (None, None)
+    assert matcher.match("   ") == (None, None)
+    assert matcher.match(None) == (None, None)
+    assert data_processor.PrefixMatcher({}).match("IN 1.2.0") == (None, None)
+
+
+def test_prefix_matcher_reuses_cached_results():
+    matcher = data_processor.PrefixMatcher(MICROSERVICE_CONFIG["microservice_prefix_mapping"], max_cache_size=2)
+    first_result = matcher.match("FR 2.0.1")
+    assert matcher.match("FR 2.0.1") is first_result
+    assert matcher.cache_info() == {'hits': 1, 'misses': 1, 'size': 1}
+    for value in ("WF 3.1.0", "IN 1.2.0", "IN 1.2.0"):
+        matcher.match(value)
+    assert matcher.cache_info() == {'hits': 1, 'misses': 4, 'size': 2}  # Сверх max_cache_size не кэшируется
+    # Один скомпилированный экземпляр на маппинг: кэш общий для всех вызовов за процесс
+    prefix_mapping = dict(MICROSERVICE_CONFIG["microservice_prefix_mapping"])
+    assert data_processor.get_prefix_matcher(prefix_mapping) is \
+        data_processor.get_prefix_matcher(dict(prefix_mapping))
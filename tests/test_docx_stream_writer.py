@@ -0,0 +1,38 @@
+"""
+Потоковый бэкенд DOCX (docx_backend: "streaming") пишет тот же word/document.xml, что и python-docx бэкенд,
+в том числе при параллельной отрисовке блоков микросервисов (render_workers > 1).
+
+Запуск из корня проекта:
+    python -m pytest -q tests
+"""
+from collections import OrderedDict
+
+import pytest
+
+from src import docx_stream_writer
+from src import report_generator
+
+
+@pytest.mark.parametrize("use_named_styles", [False, True])
+def test_streaming_backend_matches_python_docx(report_inputs, render_document_xml, use_named_styles):
+    report_arguments = dict(report_inputs, word_styles_config=dict(report_inputs['word_styles_config'],
+                                                                    use_named_styles=use_named_styles))
+    expected_xml = render_document_xml(report_generator, **report_arguments)
+    assert expected_xml.count(b"<w:p>") + expected_xml.count(b"<w:p ") > 100  # Разделы действительно выведены
+    assert render_document_xml(docx_stream_writer, **report_arguments) == expected_xml
+
+
+def test_streaming_backend_matches_python_docx_without_tasks(report_inputs, render_document_xml):
+    # Пустые разделы: параграф "нет изменений" добавляется в базовый документ, а не в поток
+    report_arguments = dict(report_inputs, grouped_data_for_changes=OrderedDict(),
+                            grouped_data_for_setup=OrderedDict())
+    assert render_document_xml(docx_stream_writer, **report_arguments) == \
+        render_document_xml(report_generator, **report_arguments)
+
+
+@pytest.mark.parametrize("render_workers", [2, 3])
+def test_parallel_rendering_matches_single_process(report_inputs, render_document_xml, render_workers):
+    single_process_xml = render_document_xml(docx_stream_writer, render_workers=1, **report_inputs)
+    assert len(report_inputs['grouped_data_for_changes']) > render_workers  # Блоков МС больше, чем процессов
+    assert render_document_xml(docx_stream_writer, render_workers=render_workers, **report_inputs) == \
+        single_process_xml
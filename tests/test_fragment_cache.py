@@ -0,0 +1,101 @@
+"""
+Ключи кэша фрагментов (fragment_cache.FragmentCache) меняются при изменении всего, от чего зависит XML блока МС:
+значений выводимых полей задач, оформления (отпечаток плана) и имени МС. Отчет с теплым кэшем совпадает с отчетом
+без кэша.
+
+Запуск из корня проекта:
+    python -m pytest -q tests
+"""
+import copy
+from collections import OrderedDict
+
+import pytest
+from docx import Document
+
+from src import docx_stream_writer
+from src import field_schema
+from src import fragment_cache
+from src import report_generator
+
+
+def make_fragment_cache(cache_dir: str, styles_cfg: dict, fields_cfg) -> fragment_cache.FragmentCache:
+    render_plan = report_generator.RenderPlan(Document(), styles_cfg, field_schema.ensure_field_schema(fields_cfg))
+    return fragment_cache.FragmentCache(cache_dir, docx_stream_writer.XmlRenderPlan(render_plan))
+
+
+def replace_first_task(ms_content: OrderedDict, field_name: str, value) -> OrderedDict:
+    """Копия блока 'Перечня изменений', в которой у первой задачи изменено одно поле."""
+    changed_content = OrderedDict((issue_type, list(tasks_list)) for issue_type, tasks_list in ms_content.items())
+    first_type = next(iter(changed_content))
+    changed_content[first_type][0] = dict(changed_content[first_type][0].copy(), **{field_name: value})
+    return changed_content
+
+
+@pytest.fixture
+def first_changes_block(report_inputs):
+    return next(iter(report_inputs['grouped_data_for_changes'].items()))
+
+
+def test_fragment_key_is_stable_for_same_content(project_configs, tmp_path, first_changes_block):
+    _, fields_cfg, styles_cfg = project_configs
+    ms_name, ms_content = first_changes_block
+    cache = make_fragment_cache(str(tmp_path), styles_cfg, fields_cfg)
+    assert cache.fragment_key(field_schema.SECTION_CHANGES, ms_name, ms_content) == \
+        make_fragment_cache(str(tmp_path), copy.deepcopy(styles_cfg), fields_cfg).fragment_key(
+            field_schema.SECTION_CHANGES, ms_name, replace_first_task(ms_content, 'unused_field', "x"))
+
+
+def test_changed_field_value_misses(project_configs, tmp_path, first_changes_block):
+    _, fields_cfg, styles_cfg = project_configs
+    ms_name, ms_content = first_changes_block
+    cache = make_fragment_cache(str(tmp_path), styles_cfg, fields_cfg)
+    assert cache.fragment_key(field_schema.SECTION_CHANGES, ms_name, ms_content) != cache.fragment_key(
+        field_schema.SECTION_CHANGES, ms_name, replace_first_task(ms_content, 'task_report_text', "Новый текст"))
+
+
+def test_changed_word_style_misses(project_configs, tmp_path, first_changes_block):
+    _, fields_cfg, styles_cfg = project_configs
+    ms_name, ms_content = first_changes_block
+    changed_styles_cfg = copy.deepcopy(styles_cfg)
+    changed_styles_cfg['font_sizes']['task_item'] += 1
+    assert make_fragment_cache(str(tmp_path), styles_cfg, fields_cfg).fragment_key(
+        field_schema.SECTION_CHANGES, ms_name, ms_content) != \
+        make_fragment_cache(str(tmp_path), changed_styles_cfg, fields_cfg).fragment_key(
+            field_schema.SECTION_CHANGES, ms_name, ms_content)
+
+
+def test_changed_microservice_name_misses(project_configs, tmp_path, first_changes_block):
+    _, fields_cfg, styles_cfg = project_configs
+    ms_name, ms_content = first_changes_block
+    cache = make_fragment_cache(str(tmp_path), styles_cfg, fields_cfg)
+    assert cache.fragment_key(field_schema.SECTION_CHANGES, ms_name, ms_content) != \
+        cache.fragment_key(field_schema.SECTION_CHANGES, ms_name + "-renamed", ms_content)
+    assert cache.fragment_key(field_schema.SECTION_CHANGES, ms_name, ms_content) != \
+        cache.fragment_key(field_schema.SECTION_SETUP, ms_name, [])
+
+
+def test_warm_cache_matches_cold_render(report_inputs, render_document_xml, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "fragments")
+    uncached_xml = render_document_xml(docx_stream_writer, **report_inputs)
+    assert render_document_xml(docx_stream_writer, fragment_cache_dir=cache_dir, **report_inputs) == uncached_xml
+
+    # Теплый кэш: ни один блок МС не перерисовывается
+    with monkeypatch.context() as patched:
+        patched.setattr(docx_stream_writer.XmlRenderPlan, 'render_fragment',
+                        lambda *args: pytest.fail("блок перерисован при теплом кэше"))
+        assert render_document_xml(docx_stream_writer, fragment_cache_dir=cache_dir, **report_inputs) == \
+            uncached_xml
+
+    # Изменилась одна задача: перерисовывается только ее блок, результат - как без кэша
+    grouped_changes = OrderedDict(report_inputs['grouped_data_for_changes'])
+    ms_name, ms_content = next(iter(grouped_changes.items()))
+    grouped_changes[ms_name] = replace_first_task(ms_content, 'task_report_text', "Новый текст задачи")
+    changed_inputs = dict(report_inputs, grouped_data_for_changes=grouped_changes)
+    rendered_blocks = []
+    original_render_fragment = docx_stream_writer.XmlRenderPlan.render_fragment
+    with monkeypatch.context() as patched:
+        patched.setattr(docx_stream_writer.XmlRenderPlan, 'render_fragment', lambda plan, *args: (
+            rendered_blocks.append(args[:2]) or original_render_fragment(plan, *args)))
+        changed_cached_xml = render_document_xml(docx_stream_writer, fragment_cache_dir=cache_dir, **changed_inputs)
+    assert rendered_blocks == [(field_schema.SECTION_CHANGES, ms_name)]
+    assert changed_cached_xml == render_document_xml(docx_stream_writer, **changed_inputs) != uncached_xml
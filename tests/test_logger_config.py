@@ -0,0 +1,24 @@
+"""
+Уровни 'log_levels' действуют и для логгеров модулей, которые импортируются после загрузки конфигураций.
+
+Запуск из корня проекта:
+    python -m pytest -q tests
+"""
+import logging
+import os
+import sys
+
+current_tests_dir = os.path.dirname(os.path.abspath(__file__))
+project_root_dir = os.path.dirname(current_tests_dir)
+if project_root_dir not in sys.path:
+    sys.path.insert(0, project_root_dir)
+
+from src import logger_config
+
+
+def test_log_levels_apply_to_loggers_set_up_later():
+    logger_config.apply_log_levels({"tests.late_module": "INFO"})
+    late_logger = logger_config.setup_logger("tests.late_module")
+    assert late_logger.level == logging.INFO
+    assert not late_logger.isEnabledFor(logging.DEBUG)
+    assert logger_config.setup_logger("tests.other_module").isEnabledFor(logging.DEBUG)